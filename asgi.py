@@ -0,0 +1,537 @@
+"""
+ASGI (async) serving mode
+
+একই রুট এবং টেমপ্লেট, কিন্তু নেটওয়ার্ক I/O (Mongo, TMDB, Telegram, Shortener)
+non-blocking। ধীর আপস্ট্রিম থাকলেও ওয়ার্কার আটকে থাকে না।
+
+    uvicorn asgi:app --host 0.0.0.0 --port $PORT --workers 2
+
+হট রুটগুলো (home, movie detail, /api/shorten, webhook) এখানে async ভাবে
+ইমপ্লিমেন্ট করা; বাকি সব (admin ইত্যাদি) bot.py এর Flask অ্যাপে চলে যায়।
+WSGI এন্ট্রি: gunicorn --preload -w 4 'bot:create_app()'
+"""
+import asyncio
+import contextlib
+import time
+import urllib.parse
+from datetime import timedelta
+
+import httpx
+from bson.objectid import ObjectId
+from pymongo import AsyncMongoClient, ReturnDocument
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import MutableHeaders
+from starlette.responses import HTMLResponse, JSONResponse, PlainTextResponse, RedirectResponse, Response
+from starlette.routing import Mount, Route
+from werkzeug.datastructures import Authorization
+
+import bot
+
+# --- ASYNC CLIENTS (lifespan এ তৈরি হয়, প্রতি প্রসেসে একটি) ---
+state = {"mongo": None, "db": None, "http": None}
+_background_tasks = set()
+_compiled_templates = {}
+
+def amovies(): return state["db"]["movies"]
+def asettings(): return state["db"]["settings"]
+def acategories(): return state["db"]["categories"]
+def ahome_feed(): return state["db"]["home_feed"]
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    state["mongo"] = AsyncMongoClient(bot.MONGO_URI, **bot.MONGO_POOL_OPTIONS)
+    state["db"] = state["mongo"][bot.MONGO_DB_NAME]
+    state["http"] = httpx.AsyncClient(
+        timeout=httpx.Timeout(10.0, connect=5.0),
+        limits=httpx.Limits(max_connections=200, max_keepalive_connections=50),
+    )
+    # uvicorn ওয়ার্কার প্রসেস শুরু হওয়ার পর (ইমপোর্টে নয়) bot এর ব্যাকগ্রাউন্ড সার্ভিস
+    bot.start_services()
+    try:
+        yield
+    finally:
+        # শাটডাউনে বাতিল হওয়া অটো-ডিলিট টাস্কগুলো সুইপারের জন্য রেখে যাওয়া
+        try: await asyncio.to_thread(bot.persist_pending_deletes)
+        except Exception as e: print(f"⚠️ Pending deletes not saved: {e}")
+        await state["http"].aclose()
+        await state["mongo"].close()
+
+def spawn(coro):
+    """ fire-and-forget টাস্ক (রেফারেন্স রাখা হয় যাতে GC না হয়) """
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+# --- TEMPLATE RENDERING (Flask এর jinja_env শেয়ার করা হয়) ---
+def _render_sync(path, query_string, headers, base_url, template, context):
+    tpl = _compiled_templates.get(id(template))
+    if tpl is None:
+        tpl = _compiled_templates[id(template)] = bot.app.jinja_env.from_string(template)
+    # url_for / request.args / request.url টেমপ্লেটে কাজ করার জন্য Flask request context
+    with bot.app.test_request_context(path, query_string=query_string, headers=headers, base_url=base_url):
+        return tpl.render(**context)
+
+async def render(request, template, ad_settings, status_code=200, headers=None, **context):
+    ctx = bot.template_globals(ad_settings)
+    ctx.update(context)
+    base_url = f"{request.url.scheme}://{request.url.netloc}"
+    html = await run_in_threadpool(
+        _render_sync, request.url.path, request.url.query, list(request.headers.items()), base_url, template, ctx
+    )
+    return HTMLResponse(html, status_code=status_code, headers=headers)
+
+def is_not_modified(request, etag, last_modified):
+    return bot.not_modified(request.headers.get('if-none-match'), request.headers.get('if-modified-since'), etag, last_modified)
+
+async def site_settings():
+    return await asettings().find_one() or {}
+
+def is_admin(request):
+    return bot.check_credentials(Authorization.from_header(request.headers.get('authorization')))
+
+# --- ASYNC TELEGRAM ---
+async def guarded(name, send):
+    """ bot.breakers এর async ব্যবহার: ব্রেকার খোলা থাকলে সাথে সাথে CircuitOpenError """
+    breaker = bot.breakers[name]
+    if not breaker.allow():
+        raise bot.CircuitOpenError(f"{name} circuit is open")
+    try:
+        resp = await send(breaker.budget)
+    except Exception:
+        breaker.record(False)
+        raise
+    breaker.record(not bot.http_failed(resp.status_code))
+    return resp
+
+async def tg_call(method, payload):
+    resp = await guarded("telegram", lambda budget: state["http"].post(f"{bot.TELEGRAM_API_URL}/{method}", json=payload, timeout=budget))
+    return resp.json()
+
+async def delete_message_later(chat_id, message_id, delay):
+    # শাটডাউন পর্যন্ত ঘুমিয়ে থাকলে key থেকে যায়, lifespan সেটা scheduled_deletes এ রাখে
+    key = (chat_id, message_id)
+    bot.pending_deletes[key] = bot.utc_now() + timedelta(seconds=delay)
+    await asyncio.sleep(delay)
+    bot.pending_deletes.pop(key, None)
+    try:
+        await tg_call("deleteMessage", {"chat_id": chat_id, "message_id": message_id})
+    except Exception as e:
+        print(f"⚠️ Failed to delete message: {e}")
+
+# --- ASYNC TMDB ---
+async def tmdb_get(url):
+    """ bot.tmdb_get এর async সংস্করণ, একই রেসপন্স ক্যাশ শেয়ার করে """
+    key = bot.tmdb_cache_key(url)
+    cached = bot.tmdb_cache.get(key)
+    if cached is not None: return cached
+    resp = await guarded("tmdb", lambda budget: state["http"].get(url, timeout=budget))
+    if bot.http_failed(resp.status_code):
+        raise httpx.HTTPStatusError(f"TMDB returned {resp.status_code}", request=resp.request, response=resp)
+    try: data = resp.json()
+    except ValueError: data = None
+    bot.tmdb_cache_store(key, resp.status_code, data)
+    return resp.status_code, data
+
+_tmdb_inflight = {}
+
+async def resolve_title(item):
+    """ bot.get_tmdb_details এর মতো single-flight: একই নরমালাইজড লুকআপ চলতে থাকলে সেটার ফলাফলের অপেক্ষা """
+    key = (bot.normalize_title(item['search_title']) or item['search_title'], item['content_type'], item['search_year'])
+    future = _tmdb_inflight.get(key)
+    if future is not None:
+        bot.tmdb_flight.shared += 1
+        return await asyncio.shield(future)
+    future = _tmdb_inflight[key] = asyncio.get_running_loop().create_future()
+    try:
+        result = await fetch_title(item)
+        future.set_result(result)
+        return result
+    except BaseException as e:
+        future.set_exception(e)
+        future.exception()   # অপেক্ষমাণ কেউ না থাকলে "never retrieved" ওয়ার্নিং এড়াতে
+        raise
+    finally:
+        del _tmdb_inflight[key]
+
+async def fetch_title(item):
+    """ TMDB সার্চ, তারপর ডিটেইলস (bot.fetch_tmdb_details এর async সংস্করণ) """
+    search_title = item['search_title']
+    if bot.TMDB_API_KEY:
+        tmdb_type = "tv" if item['content_type'] == "series" else "movie"
+        try:
+            # লোকাল এক্সপোর্ট ইনডেক্সে মিললে সার্চ কল বাদ, শুধু ডিটেইলস
+            for tmdb_id in await run_in_threadpool(bot.local_tmdb_index.candidates, search_title, tmdb_type):
+                status, extra = await tmdb_get(bot.tmdb_details_url(tmdb_type, tmdb_id))
+                if status == 200 and extra and bot.tmdb_year_matches(extra, tmdb_type, item['search_year']):
+                    return bot.build_tmdb_details(extra, extra, tmdb_type)
+            _, data = await tmdb_get(bot.tmdb_search_url(search_title, tmdb_type, item['search_year']))
+            if data and data.get("results"):
+                res = data["results"][0]
+                _, extra = await tmdb_get(bot.tmdb_details_url(tmdb_type, res.get("id")))
+                return bot.build_tmdb_details(res, extra or {}, tmdb_type)
+        except Exception as e:
+            print(f"TMDB Error: {e}")
+            return {"title": search_title, "enrich_pending": True}
+    return {"title": search_title}
+
+# === ASYNC INGEST ===
+async def upsert_ingest(record):
+    """
+    bot.upsert_ingest এর async সংস্করণ: টাইটেল থাকলে এক find_one_and_update এ ফাইল যোগ।
+    না থাকলে তৈরিটা bot এর টাইটেল লক (থ্রেড লক + Mongo লিজ) দিয়ে, থ্রেডে
+    """
+    key = bot.ingest_key(record)
+    file_id = record['file_obj']['file_id']
+    if not bot.ingest_key_unique and await amovies().find_one({**key, "files.file_id": file_id}, {"_id": 1}):
+        return None, False
+    movie = await amovies().find_one_and_update({**key, "files.file_id": {"$ne": file_id}},
+                                                bot.ingest_update(record, ObjectId()), return_document=ReturnDocument.AFTER)
+    if movie: return movie, False
+    return await asyncio.to_thread(bot.upsert_ingest, record)
+
+async def refresh_episode_index(movie_id, files=None):
+    """ bot.refresh_episode_index এর async সংস্করণ (ফাইল সংখ্যা না বদলালে তবেই লেখে) """
+    if files is None:
+        movie = await amovies().find_one({"_id": movie_id}, {"files": 1})
+        if not movie: return
+        files = movie.get('files', [])
+    await amovies().update_one({"_id": movie_id, "files": {"$size": len(files)}},
+                               {"$set": {"episode_index": bot.build_episode_index(files)}})
+
+async def handle_channel_post(msg):
+    chat_id = str(msg.get('chat', {}).get('id'))
+    if bot.SOURCE_CHANNEL_ID and chat_id != str(bot.SOURCE_CHANNEL_ID):
+        return {'status': 'wrong_channel'}
+
+    item = bot.parse_channel_post(msg)
+    if not item: return {'status': 'no_file'}
+    if msg.get('media_group_id') and bot.MEDIA_GROUP_WINDOW > 0:
+        # অ্যালবাম: WSGI মোডের মতোই Mongo বাফার, একবারে ইনজেস্ট হয় bot এর থ্রেডে
+        return await asyncio.to_thread(bot.buffer_media_group, msg)
+
+    tmdb_data = await resolve_title(item)
+    record = bot.build_ingest_record(item, tmdb_data)
+
+    movie, is_new = await upsert_ingest(record)
+    if not movie: return {'status': 'duplicate'}
+    movie_id = movie['_id']
+    await refresh_episode_index(movie_id, movie.get('files'))
+    await asyncio.to_thread(bot.touch_home_feed, movie, is_new)
+    if is_new: bot.suggest_index.upsert(movie)
+
+    if bot.WEBSITE_URL:
+        direct_link, home_link = bot.website_links(movie_id)
+
+        async def edit_markup():
+            try: await tg_call("editMessageReplyMarkup", bot.build_reply_markup_edit(item, direct_link))
+            except Exception: pass
+
+        async def notify():
+            is_spamming = bot.in_notification_cooldown(movie.get("last_notified"))
+            if bot.PUBLIC_CHANNEL_ID and tmdb_data.get('poster') and not is_spamming:
+                try:
+                    data = await tg_call("sendPhoto", bot.build_notify_payload(record, tmdb_data, item, home_link))
+                    if data.get('ok'):
+                        await amovies().update_one({"_id": movie_id}, {"$set": {"last_notified": bot.utc_now()}})
+                except Exception: pass
+
+        await asyncio.gather(edit_markup(), notify())
+
+    return {'status': 'success'}
+
+async def handle_private_message(msg):
+    chat_id = msg.get('chat', {}).get('id')
+    text = msg.get('text', '')
+    reply = None
+
+    if text.startswith('/start'):
+        parts = text.split()
+        if len(parts) > 1:
+            code = parts[1]
+            movie = await amovies().find_one({"files.unique_code": code})
+            if movie:
+                target_file = next((f for f in movie['files'] if f['unique_code'] == code), None)
+                if target_file:
+                    method, payload = bot.build_file_delivery(movie, target_file, chat_id)
+                    try:
+                        resp_data = await tg_call(method, payload)
+                        if resp_data.get('ok'):
+                            bot.counters.download(movie['_id'])
+                            sent_msg_id = resp_data['result']['message_id']
+                            spawn(delete_message_later(chat_id, sent_msg_id, bot.DELETE_TIMEOUT))
+                        elif method != 'copyMessage' and bot.classify_file_response(resp_data.get('error_code', 200), resp_data)[0] == 'broken':
+                            await asyncio.to_thread(bot.mark_file_broken, movie['_id'], target_file['file_id'], resp_data.get('description'))
+                    except Exception as e:
+                        print(f"Error sending file: {e}")
+                else:
+                    reply = {'chat_id': chat_id, 'text': "❌ File expired or removed."}
+            else:
+                reply = {'chat_id': chat_id, 'text': "❌ Invalid Link."}
+        else:
+            reply = bot.welcome_payload(chat_id)
+
+    if reply:
+        # ব্রেকার খোলা (CircuitOpenError) বা নেটওয়ার্ক সমস্যা: আপডেট ব্যর্থ হলে Telegram বারবার পাঠাত
+        try:
+            await tg_call("sendMessage", reply)
+        except Exception as e:
+            print(f"Error sending reply: {e}")
+    return {'status': 'ok'}
+
+async def process_update(update):
+    if 'channel_post' in update:
+        return await handle_channel_post(update['channel_post'])
+    elif 'message' in update:
+        return await handle_private_message(update['message'])
+    return {'status': 'ok'}
+
+# ================================
+#        ASYNC ROUTES
+# ================================
+
+async def home(request):
+    curr_settings = await site_settings()
+    stealth = curr_settings.get('stealth_mode', False)
+    if stealth and not is_admin(request):
+        etag = bot.make_page_etag('fake', bot.TEMPLATE_VERSION)
+        headers = bot.cache_headers(etag, None, bot.LISTING_CACHE_CONTROL, vary='Authorization')
+        if is_not_modified(request, etag, None): return Response(status_code=304, headers=headers)
+        return await render(request, bot.fake_home_template, curr_settings, headers=headers)
+
+    args = request.query_params
+    page = int(args.get('page', 1))
+    query = args.get('q', '').strip()
+    cat_filter = args.get('cat', '').strip()
+    type_filter = args.get('type', '').strip()
+    sort_by = args.get('sort', '').strip()
+
+    cache_control = bot.PRIVATE_CACHE_CONTROL if stealth else bot.LISTING_CACHE_CONTROL
+    vary = 'Authorization' if stealth else None
+
+    # ডিফল্ট হোমপেজ: একটা ফিড ডকুমেন্ট রিড (বাসি বা না থাকলে থ্রেডে রিবিল্ড)
+    if bot.serves_from_feed(page, query, cat_filter, type_filter, sort_by):
+        feed = await ahome_feed().find_one({"_id": bot.HOME_FEED_ID})
+        if not bot.feed_is_fresh(feed):
+            feed = await asyncio.to_thread(bot.rebuild_home_feed)
+        if feed:
+            movie_list, has_next, slider_movies, cat_list, latest = bot.feed_page(feed, page, type_filter)
+            last_modified = bot.newest(latest, curr_settings.get('updated_at'))
+            etag = bot.make_page_etag('home-feed', bot.TEMPLATE_VERSION, bot.settings_version(curr_settings), page,
+                                      type_filter, feed['version'])
+            headers = bot.cache_headers(etag, last_modified, cache_control, vary=vary)
+            if is_not_modified(request, etag, last_modified): return Response(status_code=304, headers=headers)
+            return await render(request, bot.index_template, curr_settings, headers=headers, movies=movie_list,
+                                categories=cat_list, selected_cat='', query='', slider_movies=slider_movies, page=page,
+                                has_next=has_next)
+
+    db_query = bot.build_listing_query(query, cat_filter, type_filter)
+    show_slider = not query and not cat_filter and not type_filter and not sort_by
+    sort = bot.listing_sort(sort_by)
+
+    async def slider():
+        if not show_slider: return []
+        return await amovies().find(bot.SLIDER_QUERY, bot.HOME_CARD_FIELDS).sort(bot.SLIDER_SORT).limit(bot.SLIDER_SIZE).to_list(None)
+
+    # 304 চেক আগে (কাউন্ট + সর্বশেষ updated_at), তারপর দরকার হলে পুরো কুয়েরি
+    total_movies, latest, cat_list = await asyncio.gather(
+        amovies().count_documents(db_query),
+        amovies().find_one(db_query, {"updated_at": 1}, sort=sort),
+        acategories().find().to_list(None),
+    )
+    latest = latest or {}
+    last_modified = bot.newest(latest.get('updated_at'), curr_settings.get('updated_at'))
+    etag = bot.make_page_etag('home', bot.TEMPLATE_VERSION, bot.settings_version(curr_settings), page, query, cat_filter,
+                              type_filter, total_movies, latest.get('_id'), latest.get('updated_at'),
+                              [c.get('name') for c in cat_list], sort_by,
+                              await asyncio.to_thread(bot.trending_version) if sort is bot.TRENDING_SORT else None)
+    headers = bot.cache_headers(etag, last_modified, cache_control, vary=vary)
+    if is_not_modified(request, etag, last_modified): return Response(status_code=304, headers=headers)
+
+    movie_list, slider_movies = await asyncio.gather(
+        amovies().find(db_query, bot.HOME_CARD_FIELDS).sort(sort).skip((page-1)*bot.per_page).limit(bot.per_page).to_list(None),
+        slider(),
+    )
+    has_next = (page * bot.per_page) < total_movies
+
+    return await render(request, bot.index_template, curr_settings, headers=headers, movies=movie_list, categories=cat_list,
+                        selected_cat=cat_filter, query=query, slider_movies=slider_movies, page=page, has_next=has_next)
+
+async def view_movies(request):
+    return RedirectResponse('/?type=movie', status_code=302)
+
+async def view_series(request):
+    return RedirectResponse('/?type=series', status_code=302)
+
+async def movie_detail(request):
+    try:
+        movie_id = ObjectId(request.path_params['movie_id'])
+    except Exception:
+        return PlainTextResponse("Invalid ID", status_code=400)
+    stamp, curr_settings = await asyncio.gather(amovies().find_one({"_id": movie_id}, bot.DETAIL_STAMP_FIELDS), site_settings())
+    if not stamp: return PlainTextResponse("Content Removed or Not Found", status_code=404)
+    bot.counters.view(movie_id)
+    revision, changed_at = bot.content_stamp(stamp)
+    last_modified = bot.newest(changed_at, curr_settings.get('updated_at'))
+    etag = bot.make_page_etag('detail', bot.TEMPLATE_VERSION, bot.settings_version(curr_settings),
+                              request.path_params['movie_id'], revision)
+    headers = bot.cache_headers(etag, last_modified, bot.DETAIL_CACHE_CONTROL)
+    if is_not_modified(request, etag, last_modified): return Response(status_code=304, headers=headers)
+
+    movie = await amovies().find_one({"_id": movie_id}, bot.detail_projection(stamp))
+    if not movie: return PlainTextResponse("Content Removed or Not Found", status_code=404)
+    if stamp.get('episode_index'):
+        bot.merge_episode_view(movie, stamp)
+    else:
+        # পুরনো ডকুমেন্টে ইনডেক্স তৈরি (ব্লকিং Mongo লেখা) থ্রেডে
+        await asyncio.to_thread(bot.merge_episode_view, movie, stamp)
+    return await render(request, bot.detail_template, curr_settings, headers=headers, movie=movie,
+                        ADMIN_CONTACT_URL=bot.ADMIN_CONTACT_URL)
+
+async def shorten_link_proxy(request):
+    original_url = request.query_params.get('url')
+    api_key = request.query_params.get('api')
+    domain = request.query_params.get('domain')
+
+    if not original_url or not api_key or not domain:
+        return JSONResponse({'status': 'error', 'message': 'Missing parameters'})
+
+    api_url = bot.shortener_api_url(original_url, api_key, domain)
+    try:
+        resp = await guarded("shortener", lambda budget: state["http"].get(api_url, timeout=budget))
+    except Exception as e:
+        return JSONResponse({'status': 'success', 'shortenedUrl': original_url, 'fallback': True, 'message': str(e)})
+    try:
+        return JSONResponse(resp.json())
+    except ValueError:
+        return JSONResponse({'status': 'error', 'raw': resp.text})
+
+async def telegram_webhook(request):
+    if not bot.BOT_TOKEN or request.path_params['token'] != bot.BOT_TOKEN:
+        return PlainTextResponse("Not Found", status_code=404)
+    try:
+        update = await request.json()
+    except ValueError:
+        update = None
+    if not update: return JSONResponse({'status': 'ignored'})
+    return JSONResponse(await process_update(update))
+
+async def robots_txt(request):
+    return PlainTextResponse("User-agent: *\nDisallow: /")
+
+# --- ANTI-BAN: CRAWLER BLOCKER (ASGI middleware) ---
+class BlockBotsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            user_agent = dict(scope.get("headers") or []).get(b"user-agent", b"").decode("latin-1")
+            if bot.is_blocked_agent(user_agent):
+                await Response("Not Found", status_code=404)(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+# --- RATE LIMITING (ASGI middleware; Mount করা Flask রুটগুলো সহ সব এখানেই গোনা হয়) ---
+class RateLimitMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            path = scope["path"]
+            search_query = None
+            if path in bot.RATE_LIMIT_SEARCH_PATHS and scope.get("query_string"):
+                search_query = urllib.parse.parse_qs(scope["query_string"].decode("latin-1")).get("q", [None])[0]
+            forwarded_for = dict(scope.get("headers") or []).get(b"x-forwarded-for", b"").decode("latin-1")
+            limited = bot.rate_limit_check(path, search_query, forwarded_for, (scope.get("client") or (None,))[0])
+            if limited:
+                body, content_type, headers = bot.rate_limit_payload(path, *limited)
+                await Response(body, status_code=429, headers=headers, media_type=content_type)(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+# --- RESPONSE COMPRESSION (ASGI middleware; Flask রুটগুলো নিজেরাই কম্প্রেস করে আসে) ---
+class CompressionMiddleware:
+    def __init__(self, app):
+        self.app = app
+        self.available = ('br', 'gzip') if bot.brotli else ('gzip',)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept = dict(scope.get("headers") or []).get(b"accept-encoding", b"").decode("latin-1")
+        encoding = bot.pick_encoding(accept, self.available)
+        pending = {}
+        stream = {}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                pending["start"] = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more = message.get("more_body", False)
+
+            if "start" in pending:
+                start = pending.pop("start")
+                headers = MutableHeaders(raw=start["headers"])
+                eligible = start["status"] == 200 and "content-encoding" not in headers and bot.is_compressible(headers.get("content-type"))
+                if eligible:
+                    headers["vary"] = bot.merge_vary(headers.get("vary"), "Accept-Encoding")
+                if not eligible or encoding == 'identity' or (not more and len(body) < bot.COMPRESS_MIN_SIZE):
+                    stream["passthrough"] = True
+                    await send(start)
+                    await send(message)
+                    return
+                headers["content-encoding"] = encoding
+                if not more:
+                    out = bot.compress_cached(body, encoding, headers.get("etag"))
+                    headers["content-length"] = str(len(out))
+                    await send(start)
+                    await send({"type": "http.response.body", "body": out})
+                    return
+                # স্ট্রিমড বডি (একাধিক মেসেজ): চাঙ্ক বাই চাঙ্ক কম্প্রেস
+                if "content-length" in headers: del headers["content-length"]
+                stream["compress"], stream["flush"] = bot.make_compressor(encoding)
+                stream["in"] = stream["out"] = 0
+                stream["cpu"] = 0.0
+                await send(start)
+
+            if stream.get("passthrough"):
+                await send(message)
+                return
+
+            started = time.thread_time()
+            out = stream["compress"](body) if body else b""
+            if not more:
+                out += stream["flush"]()
+            stream["cpu"] += time.thread_time() - started
+            stream["in"] += len(body)
+            stream["out"] += len(out)
+            if not more:
+                bot.compression_stats.record(encoding, stream["in"], stream["out"], stream["cpu"])
+            await send({"type": "http.response.body", "body": out, "more_body": more})
+
+        await self.app(scope, receive, send_wrapper)
+
+routes = [
+    Route('/', home),
+    Route('/movies', view_movies),
+    Route('/series', view_series),
+    Route('/movie/{movie_id}', movie_detail),
+    Route('/api/shorten', shorten_link_proxy),
+    Route('/webhook/{token}', telegram_webhook, methods=['POST']),
+    Route('/robots.txt', robots_txt),
+    # বাকি সব রুট (admin, dmca, report ...) আগের Flask অ্যাপে
+    Mount('/', app=WSGIMiddleware(bot.create_app(), workers=10)),
+]
+
+app = BlockBotsMiddleware(RateLimitMiddleware(CompressionMiddleware(Starlette(routes=routes, lifespan=lifespan))))
@@ -0,0 +1,107 @@
+function smartFetch() {
+    let query = document.getElementById('smartInput').value.trim();
+    const resultDiv = document.getElementById('tmdbResults');
+
+    if(!query) {
+        resultDiv.innerHTML = '<div class="text-warning text-center">Please paste a link or type a name.</div>';
+        return;
+    }
+
+    resultDiv.innerHTML = '<div class="text-center py-3"><div class="spinner-border text-primary" role="status"></div><br>Searching...</div>';
+
+    fetch('/admin/api/tmdb?q=' + encodeURIComponent(query))
+    .then(r => r.json())
+    .then(data => {
+        if(data.error) {
+            resultDiv.innerHTML = '<div class="alert alert-danger small">'+data.error+'</div>';
+            return;
+        }
+        if(!data.results || data.results.length === 0) {
+             resultDiv.innerHTML = '<div class="alert alert-warning small">No results found. Try using TMDB Link.</div>';
+             return;
+        }
+
+        let html = '<div class="list-group list-group-flush">';
+        data.results.forEach(item => {
+            let title = item.title || item.name;
+            let date = item.release_date || item.first_air_date || 'N/A';
+            let type = item.media_type || 'movie';
+            let poster = item.poster_path ? 'https://image.tmdb.org/t/p/w92' + item.poster_path : 'https://via.placeholder.com/92x138?text=No+Img';
+
+            let cleanItem = JSON.stringify(item).replace(/'/g, "&#39;").replace(/"/g, "&quot;");
+
+            html += `<button type="button" class="list-group-item list-group-item-action d-flex align-items-center gap-2 p-2" onclick='fillForm(${cleanItem})'>
+                <img src="${poster}" style="width:45px; height:65px; object-fit:cover; border-radius:4px;">
+                <div style="overflow:hidden; width:100%;">
+                    <div class="fw-bold text-truncate">${title}</div>
+                    <div class="d-flex justify-content-between small text-muted">
+                        <span>${date.substring(0,4)}</span>
+                        <span class="badge bg-secondary">${type.toUpperCase()}</span>
+                    </div>
+                </div>
+            </button>`;
+        });
+        html += '</div>';
+        resultDiv.innerHTML = html;
+    });
+}
+
+function fillForm(data) {
+    document.querySelector('input[name="title"]').value = data.title || data.name;
+    document.querySelector('textarea[name="overview"]').value = data.overview || '';
+    document.querySelector('input[name="release_date"]').value = data.release_date || data.first_air_date || '';
+    document.querySelector('input[name="vote_average"]').value = data.vote_average || '';
+
+    if(data.poster_path) {
+        // ডেটাবেসে শুধু TMDB পাথ কি রাখা হয়, সাইজ সাইট নিজে বেছে নেয়
+        document.querySelector('input[name="poster"]').value = data.poster_path;
+        document.querySelector('.poster-preview').src = 'https://image.tmdb.org/t/p/w342' + data.poster_path;
+    }
+    if(data.backdrop_path) {
+        document.querySelector('input[name="backdrop"]').value = data.backdrop_path;
+    }
+
+    let typeSelect = document.querySelector('select[name="type"]');
+    if(data.media_type === 'tv') {
+        typeSelect.value = 'series';
+    } else {
+        typeSelect.value = 'movie';
+    }
+
+    let adultSelect = document.querySelector('select[name="is_adult"]');
+    if(data.adult === true) {
+        adultSelect.value = 'true';
+    }
+
+    if(data.original_language) {
+         let langMap = {'en': 'English', 'hi': 'Hindi', 'bn': 'Bengali', 'ko': 'Korean', 'ja': 'Japanese', 'ta': 'Tamil', 'te': 'Telugu', 'es': 'Spanish', 'fr': 'French'};
+         let fullLang = langMap[data.original_language] || data.original_language.toUpperCase();
+         document.querySelector('input[name="language"]').value = fullLang;
+    }
+
+    const resDiv = document.getElementById('tmdbResults');
+    resDiv.innerHTML = '<div class="alert alert-success mt-2 text-center"><i class="fas fa-check-circle"></i> Data Applied!<br>Please check fields and click <b>Update</b>.</div>';
+}
+
+// --- Bulk actions (dashboard) ---
+function toggleAll(box) {
+    document.querySelectorAll('.bulk-check').forEach(c => c.checked = box.checked);
+}
+
+function bulkValueField(action) {
+    document.querySelectorAll('.bulk-value').forEach(el => {
+        let active = el.dataset.for === action;
+        el.hidden = !active;
+        el.disabled = !active;
+    });
+}
+
+function confirmBulk(form) {
+    let action = form.elements['action'].value;
+    if(form.elements['scope'].value === 'selected' && !document.querySelector('.bulk-check:checked')) {
+        alert('Select at least one item.');
+        return false;
+    }
+    let target = form.elements['scope'].value === 'filter' ? 'ALL items matching the current filter' : 'the checked items';
+    return confirm('Run "' + action + '" on ' + target + '?');
+}
@@ -0,0 +1,63 @@
+async function processLink(btn, originalUrl, apiKey, domain) {
+    // বাটন লোডিং স্টেট
+    const originalText = btn.innerHTML;
+    btn.innerHTML = '<i class="fas fa-spinner fa-spin"></i> Please Wait...';
+    btn.style.opacity = "0.7";
+    btn.disabled = true;
+
+    try {
+        // FIX: Call our own server-side proxy instead of external API directly to avoid CORS
+        const proxyUrl = `/api/shorten?api=${apiKey}&domain=${domain}&url=${encodeURIComponent(originalUrl)}`;
+
+        const response = await fetch(proxyUrl);
+        const data = await response.json();
+
+        // Check for various response formats (shortenedUrl, link, short, etc.)
+        let finalLink = null;
+
+        if (data.status === 'success' || data.shortenedUrl) {
+            finalLink = data.shortenedUrl || data.link || data.short;
+        } else if (data.shortenedUrl) {
+            finalLink = data.shortenedUrl;
+        }
+
+        if (finalLink) {
+            // সফল হলে শর্ট লিংকে রিডাইরেক্ট
+            window.location.href = finalLink;
+        } else {
+            // ফেইল হলে অরিজিনাল লিংকে
+            console.error("API returned error or unknown format:", data);
+            // alert("Shortener Error! Redirecting to original link...");
+            window.location.href = originalUrl;
+        }
+    } catch (error) {
+        console.error("Fetch Error:", error);
+        // কোন এরর হলে অরিজিনাল লিংকে রিডাইরেক্ট
+        window.location.href = originalUrl;
+    } finally {
+        // যদি পেজ রিডাইরেক্ট না হয়, বাটন ঠিক করা
+        setTimeout(() => {
+            btn.innerHTML = originalText;
+            btn.style.opacity = "1";
+            btn.disabled = false;
+        }, 3000);
+    }
+}
+
+// সিজন খুললে সেই সিজনের এপিসোড সার্ভার থেকে লোড হয় (একবারই)
+document.querySelectorAll('details.season-group').forEach(group => {
+    group.addEventListener('toggle', async () => {
+        if (!group.open || group.dataset.loaded) return;
+        group.dataset.loaded = '1';
+        const body = group.querySelector('.season-body');
+        body.innerHTML = '<div class="season-loading"><i class="fas fa-spinner fa-spin"></i> Loading episodes...</div>';
+        try {
+            const response = await fetch(group.dataset.url);
+            if (!response.ok) throw new Error(response.status);
+            body.innerHTML = await response.text();
+        } catch (error) {
+            delete group.dataset.loaded;
+            body.innerHTML = '<div class="season-loading">Failed to load episodes. Close and open again to retry.</div>';
+        }
+    });
+});
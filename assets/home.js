@@ -0,0 +1,84 @@
+var swiper = new Swiper(".mySwiper", {
+    spaceBetween: 15,
+    centeredSlides: true,
+    autoplay: { delay: 3500, disableOnInteraction: false },
+    pagination: { el: ".swiper-pagination", clickable: true, dynamicBullets: true },
+    loop: true
+});
+
+const toggle = document.getElementById('adultToggle');
+const label = document.getElementById('adult-label');
+const body = document.body;
+
+if (localStorage.getItem('adult_enabled') === 'true') {
+    body.classList.remove('hide-adult');
+    toggle.checked = true;
+    label.innerText = "18+ ON";
+    label.style.color = "#E50914";
+} else {
+    body.classList.add('hide-adult');
+    toggle.checked = false;
+    label.innerText = "18+ OFF";
+    label.style.color = "#4caf50";
+}
+
+toggle.addEventListener('change', function() {
+    if(this.checked) {
+        if(confirm("Are you over 18 years old? This will show adult content.")) {
+            body.classList.remove('hide-adult');
+            localStorage.setItem('adult_enabled', 'true');
+            label.innerText = "18+ ON";
+            label.style.color = "#E50914";
+        } else {
+            this.checked = false;
+        }
+    } else {
+        body.classList.add('hide-adult');
+        localStorage.setItem('adult_enabled', 'false');
+        label.innerText = "18+ OFF";
+        label.style.color = "#4caf50";
+    }
+});
+
+// --- Search typeahead (/api/suggest) ---
+const searchBox = document.querySelector('.big-search-box');
+const searchInput = searchBox && searchBox.querySelector('input[name="q"]');
+if (searchInput) {
+    const list = document.createElement('div');
+    list.className = 'suggest-list';
+    searchBox.parentNode.appendChild(list);
+    searchInput.setAttribute('autocomplete', 'off');
+    let timer = null, lastQuery = '';
+
+    function hideSuggest() { list.innerHTML = ''; list.style.display = 'none'; }
+
+    function renderSuggest(items) {
+        const hideAdult = body.classList.contains('hide-adult');
+        list.innerHTML = '';
+        items.filter(item => !(hideAdult && item.is_adult)).forEach(item => {
+            const a = document.createElement('a');
+            a.href = '/movie/' + item.id;
+            a.textContent = item.title + (item.year ? ' (' + item.year + ')' : '');
+            const badge = document.createElement('span');
+            badge.textContent = item.type === 'series' ? 'Series' : 'Movie';
+            a.appendChild(badge);
+            list.appendChild(a);
+        });
+        list.style.display = list.children.length ? 'block' : 'none';
+    }
+
+    searchInput.addEventListener('input', function() {
+        const q = this.value.trim();
+        clearTimeout(timer);
+        if (!q) { lastQuery = ''; hideSuggest(); return; }
+        timer = setTimeout(() => {
+            lastQuery = q;
+            fetch('/api/suggest?q=' + encodeURIComponent(q))
+                .then(r => r.ok ? r.json() : { items: [] })
+                .then(data => { if (data.q === lastQuery) renderSuggest(data.items); })
+                .catch(hideSuggest);
+        }, 120);
+    });
+    searchInput.addEventListener('keydown', e => { if (e.key === 'Escape') hideSuggest(); });
+    document.addEventListener('click', e => { if (!searchBox.parentNode.contains(e.target)) hideSuggest(); });
+}
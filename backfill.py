@@ -0,0 +1,233 @@
+"""
+Backfill importer for exported Telegram channel history
+
+নতুন ডিপ্লয় বা ডেটাবেস হারানোর পর সব ফাইল আবার চ্যানেলে ফরোয়ার্ড না করে,
+ডিস্কে রাখা চ্যানেল হিস্ট্রি থেকে সরাসরি ডেটাবেস ভরাট করে।
+
+Usage:
+    python backfill.py export/result.json                    # Telegram Desktop JSON এক্সপোর্ট
+    python backfill.py updates.ndjson --workers 16           # raw update (webhook/getUpdates) এর NDJSON
+    python backfill.py result.json --batch 2000 --restart    # চেকপয়েন্ট উপেক্ষা করে শুরু থেকে
+
+- পার্সিং webhook এর মতোই (bot.parse_channel_post / bot.build_ingest_record)।
+- একই (টাইটেল, টাইপ, সাল) একবারই TMDB তে খোঁজা হয়; ব্যাচের নতুন টাইটেলগুলো থ্রেড পুলে একসাথে।
+- লেখা হয় unordered bulk upsert দিয়ে, ইনজেস্টের ইউনিক ইনডেক্স (title_key, tmdb_id) ফাইল ডুপ্লিকেট আটকায়,
+  তাই একই ফাইল দুইবার চালালেও সমস্যা নেই।
+- প্রতি ব্যাচের পর <source>.checkpoint.json এ অগ্রগতি লেখা হয়; আবার চালালে সেখান থেকে শুরু।
+- কোনো চ্যানেল নোটিফিকেশন বা reply markup এডিট হয় না।
+
+Telegram Desktop এক্সপোর্টে file_id থাকে না। সেসব ফাইল "export:<chat>:<message>" আইডি পায় এবং
+ডেলিভারির সময় সোর্স চ্যানেল থেকে copyMessage দিয়ে পাঠানো হয় (বটকে চ্যানেলে অ্যাডমিন থাকতে হবে)।
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+import bot
+
+DUPLICATE_KEY = 11000
+DESKTOP_MISSING_FILE = "(File not included"
+
+
+# ================================
+#        SOURCES
+# ================================
+
+def desktop_text(text):
+    """ Desktop এক্সপোর্টের text হয় স্ট্রিং, নয়তো এন্টিটির লিস্ট """
+    if isinstance(text, list):
+        return "".join(part if isinstance(part, str) else part.get("text", "") for part in text)
+    return text or ""
+
+def desktop_message_to_post(message, chat_id):
+    """ এক্সপোর্টের একটা মেসেজকে webhook এর channel_post এর মতো করে সাজায় (ফাইল না থাকলে None) """
+    if message.get("type") != "message": return None
+    path = message.get("file")
+    file_name = message.get("file_name") or (os.path.basename(path) if path and not path.startswith(DESKTOP_MISSING_FILE) else None)
+    if not file_name and not path: return None
+
+    media = {"file_id": f"{bot.EXPORT_FILE_PREFIX}{chat_id}:{message['id']}",
+             "file_name": file_name or "Unknown", "file_size": message.get("file_size") or 0}
+    kind = "video" if message.get("media_type") in ("video_file", "animation") else "document"
+    caption = desktop_text(message.get("text"))
+    post = {"message_id": message["id"], "chat": {"id": chat_id}, "date": int(message.get("date_unixtime") or 0), kind: media}
+    if caption: post["caption"] = caption
+    return post
+
+def read_desktop_export(path):
+    with open(path, encoding="utf-8") as f:
+        export = json.load(f)
+    # Desktop চ্যানেল আইডি -100 প্রিফিক্স ছাড়া লেখে
+    chat_id = int(f"-100{export['id']}") if export.get("id") and export["id"] > 0 else export.get("id")
+    for message in export.get("messages", []):
+        yield desktop_message_to_post(message, chat_id)
+
+def read_update_ndjson(path):
+    """ প্রতি লাইনে একটা Update ({"channel_post": ...}) অথবা সরাসরি মেসেজ অবজেক্ট """
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line: continue
+            update = json.loads(line)
+            yield update.get("channel_post") or update.get("edited_channel_post") or (update if "message_id" in update else None)
+
+def read_source(path, fmt="auto"):
+    # Desktop এক্সপোর্ট একটা বড় .json অবজেক্ট, NDJSON এ প্রতি লাইনে আলাদা অবজেক্ট
+    if fmt == "auto":
+        fmt = "desktop" if path.endswith(".json") else "ndjson"
+    return read_desktop_export(path) if fmt == "desktop" else read_update_ndjson(path)
+
+
+# ================================
+#        PIPELINE
+# ================================
+
+def title_lookup_key(item):
+    return item["search_title"], item["content_type"], item["search_year"]
+
+def resolve_titles(keys, pool):
+    """ ইউনিক (টাইটেল, টাইপ, সাল) গুলো একসাথে TMDB তে খোঁজে; bot এর রেসপন্স ক্যাশ/সার্কিট ব্রেকার সহ """
+    return dict(zip(keys, pool.map(lambda key: bot.get_tmdb_details(*key), keys)))
+
+def ingest_op(record):
+    file_id = record["file_obj"]["file_id"]
+    key = bot.ingest_key(record)
+    # TMDB ছাড়া রেকর্ড: একই টাইটেল আগে থেকে থাকলে upsert নয় (ফাইল আগেই থাকলে কিছুই বদলায় না)
+    return UpdateOne({**key, "files.file_id": {"$ne": file_id}},
+                     bot.ingest_update(record, bot.ObjectId()), upsert=bot.ingest_upsert_allowed(key))
+
+def write_batch(records):
+    """
+    unordered bulk upsert; DuplicateKeyError হওয়া অপারেশন একবার আবার চালানো হয়
+    (একই ব্যাচে নতুন টাইটেলের দুই ফাইল থাকলে দ্বিতীয়টা প্রথমবার টাইটেল তৈরিতে আটকে যেতে পারে)।
+    রিটার্ন: (created, added, duplicates, conflicts)
+    """
+    created = added = 0
+    pending = records
+    for attempt in range(2):
+        if not pending: break
+        try:
+            result = bot.movies.bulk_write([ingest_op(r) for r in pending], ordered=False).bulk_api_result
+            failed = []
+        except BulkWriteError as e:
+            result = e.details
+            errors = result.get("writeErrors", [])
+            if any(err.get("code") != DUPLICATE_KEY for err in errors):
+                raise
+            failed = [pending[err["index"]] for err in errors]
+        created += result.get("nUpserted", 0)
+        added += result.get("nModified", 0)
+        pending = failed
+    # দুবার DuplicateKeyError অথচ ফাইলটা কোথাও নেই: ডুপ্লিকেট নয়, লেখা হয়নি (conflict)
+    stored = set()
+    if pending:
+        ids = [r["file_obj"]["file_id"] for r in pending]
+        for doc in bot.movies.find({"files.file_id": {"$in": ids}}, {"files.file_id": 1}):
+            stored.update(f.get("file_id") for f in doc.get("files", []))
+    conflicts = [r for r in pending if r["file_obj"]["file_id"] not in stored]
+    for record in conflicts:
+        print(f"⚠️ Not written (key conflict): {record['final_title']} / {record['file_obj']['filename']}")
+    # বাকি সব ডুপ্লিকেট: ফাইল আগেই আছে, অথবা upsert ছাড়া অপারেশন যা কিছু মেলেনি
+    return created, added, len(records) - created - added - len(conflicts), len(conflicts)
+
+def refresh_indexes(records):
+    """ ব্যাচে ছোঁয়া টাইটেলগুলোর এপিসোড ইনডেক্স নতুন করে বানায় """
+    keys = {tuple(sorted(bot.ingest_key(r).items())) for r in records}
+    for start in range(0, len(keys), 200):
+        chunk = [dict(k) for k in list(keys)[start:start + 200]]
+        for doc in bot.movies.find({"$or": chunk}, {"files": 1}):
+            bot.refresh_episode_index(doc["_id"], doc.get("files", []))
+
+def parse_posts(posts):
+    """ (item, মূল পোস্টের সময়) লিস্ট; সোর্স চ্যানেল না মিললে বা ফাইল না থাকলে বাদ """
+    items = []
+    for post in posts:
+        if not post: continue
+        if bot.SOURCE_CHANNEL_ID and str(post.get("chat", {}).get("id")) != str(bot.SOURCE_CHANNEL_ID): continue
+        item = bot.parse_channel_post(post)
+        if not item: continue
+        posted_at = datetime.fromtimestamp(post["date"], timezone.utc).replace(tzinfo=None) if post.get("date") else None
+        items.append((item, posted_at))
+    return items
+
+def run(args):
+    if not bot.ensure_ingest_index():
+        print("❌ Ingest key index missing (duplicate titles in the database). Run /admin/cleanup first.")
+        return 1
+
+    ckpt = bot.checkpoint_path(args.source, args.checkpoint)
+    state = None if args.restart else bot.load_checkpoint(ckpt, args.source)
+    done = state["done"] if state else 0
+    stats = state["stats"] if state else {"messages": 0, "files": 0, "created": 0, "added": 0, "duplicates": 0, "conflicts": 0, "lookups": 0}
+    if done: print(f"↩️  Resuming after {done} messages ({ckpt})")
+
+    resolved = {}
+    started = time.perf_counter()
+    batch, seen, resumed_from = [], 0, stats["messages"]
+
+    def flush():
+        nonlocal batch
+        items = parse_posts(batch)
+        keys = list({title_lookup_key(item) for item, _ in items} - resolved.keys())
+        resolved.update(resolve_titles(keys, pool))
+        records = [bot.build_ingest_record(item, resolved[title_lookup_key(item)], posted_at) for item, posted_at in items]
+        created, added, duplicates, conflicts = write_batch(records)
+        refresh_indexes(records)
+
+        stats["messages"] += len(batch)
+        stats["files"] += len(records)
+        stats["lookups"] += len(keys)
+        stats["created"] += created
+        stats["added"] += added
+        stats["duplicates"] += duplicates
+        stats["conflicts"] = stats.get("conflicts", 0) + conflicts
+        bot.save_checkpoint(ckpt, args.source, seen, stats)
+        rate = (stats["messages"] - resumed_from) / max(time.perf_counter() - started, 1e-9)
+        print(f"  {seen} msgs | {stats['files']} files | +{stats['created']} titles | {stats['duplicates']} dup | "
+              f"{stats['lookups']} TMDB | {rate:.0f} msg/s", flush=True)
+        batch = []
+
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        for post in read_source(args.source, args.format):
+            seen += 1
+            if seen <= done: continue
+            batch.append(post)
+            if len(batch) >= args.batch: flush()
+        if batch: flush()
+
+    elapsed = time.perf_counter() - started
+    if stats["created"] or stats["added"]:
+        bot.rebuild_home_feed()
+        # পুরনো পোস্টের updated_at watermark এর আগে পড়ে, তাই সাজেস্ট ইনডেক্স পুরো রিবিল্ড
+        bot.request_suggest_rebuild()
+    print(f"✅ Backfill done in {elapsed:.1f}s: {stats['files']} files from {stats['messages']} messages, "
+          f"{stats['created']} new titles, {stats['added']} files added, {stats['duplicates']} duplicates, {stats.get('conflicts', 0)} conflicts, "
+          f"{stats['lookups']} TMDB lookups ({(stats['messages'] - resumed_from) / max(elapsed, 1e-9):.0f} msg/s)")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import exported Telegram channel history into the database")
+    parser.add_argument("source", help="Telegram Desktop result.json or NDJSON of raw updates")
+    parser.add_argument("--format", choices=["auto", "desktop", "ndjson"], default="auto",
+                        help="auto: .json = Telegram Desktop export, anything else = NDJSON")
+    parser.add_argument("--workers", type=int, default=8, help="parallel TMDB lookups")
+    parser.add_argument("--batch", type=int, default=500, help="messages per bulk write / checkpoint")
+    parser.add_argument("--checkpoint", default=None, help="checkpoint file (default: <source>.checkpoint.json)")
+    parser.add_argument("--restart", action="store_true", help="ignore an existing checkpoint")
+    args = parser.parse_args(argv)
+    code = run(args)
+    sys.stdout.flush()
+    # bot.py এর ব্যাকগ্রাউন্ড থ্রেডগুলোর (scheduler ইত্যাদি) জন্য অপেক্ষা না করে বের হওয়া
+    os._exit(code)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,5 @@
+import time
+PROCESS_STARTED = time.perf_counter()   # কোল্ড স্টার্ট মাপার জন্য, বাকি ইমপোর্টের আগে
 import os
 import sys
 import re
@@ -6,13 +8,44 @@ import json
 import uuid
 import math
 import threading
-import time
+import socket
+import atexit
+import contextlib
 import urllib.parse
-from flask import Flask, render_template_string, request, redirect, url_for, Response, jsonify, abort
-from pymongo import MongoClient
+import hashlib
+import base64
+import gzip
+import mimetypes
+import zlib
+import io
+import mmap
+import struct
+import difflib
+import bisect
+import heapq
+import unicodedata
+from array import array
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from functools import partial
+from flask import Flask, render_template_string, request, redirect, url_for, Response, jsonify, abort, g, make_response
+from markupsafe import Markup
+from werkzeug.http import parse_etags, parse_date, quote_etag, http_date
+from pymongo import MongoClient, UpdateOne, DeleteOne, ReplaceOne, ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+from bson import json_util
 from bson.objectid import ObjectId
 from dotenv import load_dotenv
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+
+try:
+    import orjson  # ঐচ্ছিক: দ্রুত JSON এনকোডার (না থাকলে স্ট্যান্ডার্ড json)
+except ImportError:
+    orjson = None
+try:
+    import brotli  # ঐচ্ছিক: না থাকলে শুধু gzip ভ্যারিয়েন্ট তৈরি হবে
+except ImportError:
+    brotli = None
 
 # --- কনফিগারেশন লোড ---
 load_dotenv()
@@ -28,7 +61,14 @@ BOT_USERNAME = os.getenv("BOT_USERNAME")
 PUBLIC_CHANNEL_ID = os.getenv("PUBLIC_CHANNEL_ID")
 SOURCE_CHANNEL_ID = os.getenv("SOURCE_CHANNEL_ID") # রিপোর্ট এখানে আসবে
 WEBSITE_URL = os.getenv("WEBSITE_URL")
-TELEGRAM_API_URL = f"https://api.telegram.org/bot{BOT_TOKEN}"
+# webhook (ডিফল্ট) | polling (আপডেট আসে poller.py থেকে, python bot.py webhook সেট করে না)
+TELEGRAM_UPDATES = os.getenv("TELEGRAM_UPDATES", "webhook").lower()
+
+# আপস্ট্রিম API বেস URL (লোড টেস্টে লোকাল ফেক সার্ভারে পয়েন্ট করা যায়)
+TELEGRAM_API_BASE = os.getenv("TELEGRAM_API_BASE", "https://api.telegram.org").rstrip('/')
+TMDB_API_URL = os.getenv("TMDB_API_URL", "https://api.themoviedb.org/3").rstrip('/')
+SHORTENER_SCHEME = os.getenv("SHORTENER_SCHEME", "https")
+TELEGRAM_API_URL = f"{TELEGRAM_API_BASE}/bot{BOT_TOKEN}"
 
 # আপনার টেলিগ্রাম অ্যাডমিন ইউজারনেম (রিকোয়েস্ট বাটন এর জন্য)
 # এটি পরিবর্তন করে আপনার ইউজারনেম দিন (যেমন: https://t.me/RahimAdmin)
@@ -44,17 +84,61 @@ NOTIFICATION_COOLDOWN = 1800
 ADMIN_USER = os.getenv("ADMIN_USERNAME", "admin")
 ADMIN_PASS = os.getenv("ADMIN_PASSWORD", "admin")
 
-# --- ডেটাবেস কানেকশন ---
-try:
-    client = MongoClient(MONGO_URI)
-    db = client["moviezone_db"]
-    movies = db["movies"]
-    settings = db["settings"]
-    categories = db["categories"] 
-    print("✅ MongoDB Connected Successfully!")
-except Exception as e:
-    print(f"❌ MongoDB Connection Error: {e}")
-    sys.exit(1)
+# --- ডেটাবেস কানেকশন (lazy, প্রতি প্রসেসে একটা ক্লায়েন্ট) ---
+# MongoClient fork-safe না: gunicorn --preload এ মাস্টারে ইমপোর্টের সময় ক্লায়েন্ট তৈরি হলে ওয়ার্কাররা
+# কপি হওয়া সকেট আর লক পায়। তাই ইমপোর্টে কোনো কানেকশন হয় না; প্রথম ব্যবহারে বর্তমান PID এর জন্য তৈরি হয়।
+MONGO_DB_NAME = os.getenv("MONGO_DB_NAME", "moviezone_db")
+MONGO_POOL_OPTIONS = {
+    "maxPoolSize": int(os.getenv("MONGO_MAX_POOL_SIZE", 50)),
+    "minPoolSize": int(os.getenv("MONGO_MIN_POOL_SIZE", 0)),
+    "maxIdleTimeMS": int(os.getenv("MONGO_MAX_IDLE_MS", 300000)),
+    "serverSelectionTimeoutMS": int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000)),
+    "connectTimeoutMS": int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", 5000)),
+    "socketTimeoutMS": int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", 30000)),
+}
+_mongo = {"pid": None, "client": None}
+_mongo_lock = threading.Lock()
+
+def get_client():
+    pid = os.getpid()
+    if _mongo["pid"] != pid:
+        with _mongo_lock:
+            if _mongo["pid"] != pid:
+                # fork এর আগের (মাস্টারের) ক্লায়েন্ট এখানে close করা হয় না, ওটা মাস্টারের
+                _mongo["client"] = MongoClient(MONGO_URI, **MONGO_POOL_OPTIONS)
+                _mongo["pid"] = pid
+                print(f"✅ MongoDB client ready (pid {pid}, pool {MONGO_POOL_OPTIONS['minPoolSize']}-{MONGO_POOL_OPTIONS['maxPoolSize']})")
+    return _mongo["client"]
+
+def get_db():
+    return get_client()[MONGO_DB_NAME]
+
+class LazyCollection:
+    """ movies / settings ইত্যাদি নাম আগের মতোই থাকে; আসল কালেকশন এই প্রসেসের ক্লায়েন্ট থেকে প্রথম ব্যবহারে """
+    def __init__(self, name):
+        self.name = name
+        self._pid = None
+        self._collection = None
+
+    def _target(self):
+        if self._pid != os.getpid():
+            self._collection, self._pid = get_db()[self.name], os.getpid()
+        return self._collection
+
+    def __getattr__(self, attr):
+        return getattr(self._target(), attr)
+
+movies = LazyCollection("movies")
+settings = LazyCollection("settings")
+categories = LazyCollection("categories")
+admin_jobs = LazyCollection("admin_jobs")
+home_feed = LazyCollection("home_feed")
+locks = LazyCollection("locks")
+reports = LazyCollection("reports")
+rate_limits = LazyCollection("rate_limits")
+movie_stats = LazyCollection("movie_stats")
+media_groups = LazyCollection("media_groups")
+scheduled_deletes = LazyCollection("scheduled_deletes")
 
 # === Helper Functions ===
 
@@ -69,6 +153,15 @@ def clean_filename(filename):
     name = re.sub(r'\s+', ' ', name).strip()
     return name
 
+TITLE_WORD_RE = re.compile(r'[^\W_]+')
+
+def normalize_title(title):
+    """ তুলনার জন্য টাইটেল: ছোট হাতের, অ্যাকসেন্ট ছাড়া, শুধু অক্ষর/সংখ্যা আর একক স্পেস """
+    text = (title or '').lower()
+    if not text.isascii():
+        text = ''.join(ch for ch in unicodedata.normalize('NFKD', text) if not unicodedata.combining(ch))
+    return ' '.join(TITLE_WORD_RE.findall(text))
+
 def get_file_quality(filename):
     filename = filename.lower()
     if "4k" in filename or "2160p" in filename: return "4K UHD"
@@ -123,6 +216,71 @@ def get_episode_label(filename):
     if season: return f"Season {int(match_s.group(2))}"
     return None
 
+# --- EPISODE INDEX (series) ---
+# ইনজেস্টের সময় তৈরি হয়ে ডকুমেন্টে থাকে: season -> episode -> qualities, সংখ্যা অনুযায়ী সাজানো
+LABEL_SEASON_RE = re.compile(r'\b(?:S|Season\s*)(\d+)', re.IGNORECASE)
+LABEL_EPISODE_RE = re.compile(r'(?:\bE|\bEpisode\s*)(\d+)', re.IGNORECASE)
+INDEX_FILE_FIELDS = ("unique_code", "filename", "quality", "episode_label", "size", "file_type", "health")
+
+def quality_class(quality):
+    """ কোয়ালিটি ব্যাজের CSS ক্লাস (আগে টেমপ্লেটের set ব্লকে হিসাব হত) """
+    quality = quality or ''
+    if '1080p' in quality: return 'q-1080p'
+    if '720p' in quality: return 'q-720p'
+    if '4K' in quality: return 'q-4k'
+    return 'q-480p'
+
+def quality_rank(quality):
+    return {'q-480p': 0, 'q-720p': 1, 'q-1080p': 2, 'q-4k': 3}[quality_class(quality)]
+
+def episode_position(label):
+    """ এপিসোড লেবেল থেকে (season, episode); সিজন না থাকলে 1, কিছুই না মিললে (None, None) """
+    season = LABEL_SEASON_RE.search(label or '')
+    episode = LABEL_EPISODE_RE.search(label or '')
+    if not season and not episode: return None, None
+    return (int(season.group(1)) if season else 1), (int(episode.group(1)) if episode else None)
+
+def build_episode_index(files):
+    """
+    files -> [{season, label, count, episodes: [{episode, label, files: [...]}]}]; সিরিজ না হলে []।
+    সিজন ছোট থেকে বড় ("Other Files" = 0 সবার আগে), তাই সর্বশেষ সিজন সবসময় লিস্টের শেষে।
+    """
+    if not any(f.get('episode_label') for f in files): return []
+    seasons = {}
+    for f in files:
+        season_no, episode_no = episode_position(f.get('episode_label'))
+        season = seasons.setdefault(season_no or 0, {})
+        key = (episode_no is None, episode_no or 0, f.get('episode_label') if episode_no is None else '')
+        entry = season.setdefault(key, {"episode": episode_no, "label": f.get('episode_label') or "Other", "files": []})
+        entry["files"].append(dict({k: f.get(k) for k in INDEX_FILE_FIELDS}, q_class=quality_class(f.get('quality'))))
+
+    index = []
+    for season_no in sorted(seasons):
+        episodes = [seasons[season_no][key] for key in sorted(seasons[season_no])]
+        for entry in episodes:
+            entry["files"].sort(key=lambda f: quality_rank(f.get('quality')))
+        index.append({
+            "season": season_no,
+            "label": f"Season {season_no}" if season_no else "Other Files",
+            "count": len(episodes),
+            "episodes": episodes,
+        })
+    return index
+
+def refresh_episode_index(movie_id, files=None):
+    """
+    ফাইল যোগ হওয়ার পর ইনডেক্স নতুন করে বানায়। ফাইল সংখ্যা না বদলালে তবেই লেখে,
+    যাতে একসাথে দুইটা আপলোড এলে পুরনো ইনডেক্স নতুনটাকে ওভাররাইট না করে।
+    files (আপডেটের পোস্ট-ইমেজ থেকে) দিলে আবার পড়তে হয় না।
+    """
+    if files is None:
+        movie = movies.find_one({"_id": movie_id}, {"files": 1})
+        if not movie: return None
+        files = movie.get('files', [])
+    index = build_episode_index(files)
+    movies.update_one({"_id": movie_id, "files": {"$size": len(files)}}, {"$set": {"episode_index": index}})
+    return index
+
 def is_adult_content(title, genres=[]):
     """ টাইটেল এবং কিওয়ার্ড চেক করে ১৮+ ডিটেক্ট করে """
     adult_keywords = ['18+', 'adult', 'uncut', 'erotic', 'hot', 'sex', 'nude', 'romance', 'thriller', 'porn', 'xxx']
@@ -139,13 +297,52 @@ def extract_youtube_id(url):
     return match.group(1) if match else None
 
 # --- BACKGROUND DELETE FUNCTION ---
-def delete_message_later(chat_id, message_id, delay):
-    time.sleep(delay)
+# ঘুমিয়ে থাকা ডিলিটগুলো (chat_id, message_id) -> due_at। os._exit এ বের হওয়া প্রসেস (poller) বন্ধের আগে
+# persist_pending_deletes() দিয়ে এগুলো scheduled_deletes এ রাখে, start_delete_sweeper সময় হলে মুছে দেয়।
+DELETE_SWEEP_INTERVAL = 30
+pending_deletes = {}
+
+def delete_message(chat_id, message_id):
+    """ নেটওয়ার্ক/ব্রেকার এরর হলে False (Telegram এর 'not found' এর মতো উত্তর সফল ধরা হয়) """
     try:
-        del_url = f"{TELEGRAM_API_URL}/deleteMessage"
-        requests.post(del_url, json={"chat_id": chat_id, "message_id": message_id})
+        tg_post("deleteMessage", {"chat_id": chat_id, "message_id": message_id})
+        return True
     except Exception as e:
         print(f"⚠️ Failed to delete message: {e}")
+        return False
+
+def delete_message_later(chat_id, message_id, delay):
+    key = (chat_id, message_id)
+    pending_deletes[key] = utc_now() + timedelta(seconds=delay)
+    try:
+        time.sleep(delay)
+        delete_message(chat_id, message_id)
+    finally:
+        pending_deletes.pop(key, None)
+
+def persist_pending_deletes():
+    """ শাটডাউনের আগে: যেগুলোর সময় এখনো হয়নি সেগুলো Mongo তে, সুইপার পরে মুছবে """
+    items = list(pending_deletes.items())
+    if not items: return 0
+    scheduled_deletes.bulk_write([
+        UpdateOne({"_id": f"{chat_id}:{message_id}"},
+                  {"$set": {"chat_id": chat_id, "message_id": message_id, "due_at": due_at}}, upsert=True)
+        for (chat_id, message_id), due_at in items], ordered=False)
+    return len(items)
+
+def start_delete_sweeper():
+    """ আগের প্রসেস বন্ধ হওয়ার সময় বাকি থাকা অটো-ডিলিট """
+    scheduled_deletes.create_index("due_at")
+    while True:
+        time.sleep(DELETE_SWEEP_INTERVAL)
+        try:
+            if not singleton_active(): continue
+            for job in scheduled_deletes.find({"due_at": {"$lte": utc_now()}}).sort("due_at", 1).limit(200):
+                # ব্রেকার খোলা বা নেটওয়ার্ক সমস্যা: বাকিগুলো পরের রাউন্ডে
+                if not delete_message(job["chat_id"], job["message_id"]): break
+                scheduled_deletes.delete_one({"_id": job["_id"]})
+        except Exception as e:
+            print(f"Delete Sweep Error: {e}")
 
 # --- AUTO IMPORT FUNCTION (DUPLICATE PROOF) ---
 def auto_import_movies():
@@ -157,8 +354,8 @@ def auto_import_movies():
     print("🔄 Auto-Import Started: Fetching Trending & Now Playing...")
     
     api_urls = [
-        f"https://api.themoviedb.org/3/movie/now_playing?api_key={TMDB_API_KEY}&language=en-US&page=1",
-        f"https://api.themoviedb.org/3/trending/movie/day?api_key={TMDB_API_KEY}"
+        f"{TMDB_API_URL}/movie/now_playing?api_key={TMDB_API_KEY}&language=en-US&page=1",
+        f"{TMDB_API_URL}/trending/movie/day?api_key={TMDB_API_KEY}"
     ]
 
     count = 0
@@ -175,11 +372,11 @@ def auto_import_movies():
 
                     if not title: continue
 
-                    # ডুপ্লিকেট চেক: টাইটেল অথবা TMDB ID মিললে স্কিপ করবে
+                    # ডুপ্লিকেট চেক: নরমালাইজড টাইটেল অথবা TMDB ID মিললে স্কিপ করবে
                     existing = movies.find_one({
                         "$or": [
                             {"tmdb_id": tmdb_id},
-                            {"title": title}
+                            {"title_key": normalize_title(title)}
                         ]
                     })
                     
@@ -190,9 +387,10 @@ def auto_import_movies():
                     new_movie = {
                         "tmdb_id": tmdb_id,
                         "title": title,
+                        "title_key": normalize_title(title),
                         "overview": item.get("overview"),
-                        "poster": f"https://image.tmdb.org/t/p/w500{item.get('poster_path')}" if item.get('poster_path') else None,
-                        "backdrop": f"https://image.tmdb.org/t/p/w1280{item.get('backdrop_path')}" if item.get('backdrop_path') else None,
+                        "poster": item.get('poster_path'),
+                        "backdrop": item.get('backdrop_path'),
                         "release_date": item.get("release_date"),
                         "vote_average": item.get("vote_average"),
                         "genres": [],
@@ -205,12 +403,14 @@ def auto_import_movies():
                         "updated_at": now_utc
                     }
                     
-                    movies.insert_one(new_movie)
+                    try: movies.insert_one(new_movie)
+                    except DuplicateKeyError: continue
                     count += 1
         except Exception as e:
             print(f"❌ Auto-Import Error: {e}")
             
     if count > 0:
+        rebuild_home_feed()
         print(f"✅ Auto-Import Finished! Added {count} new movies.")
     else:
         print("✅ Auto-Import Checked: No new movies found.")
@@ -219,67 +419,561 @@ def start_scheduler():
     """ প্রতি ৬ ঘণ্টা পর পর অটোমেটিক মুভি চেক করবে """
     while True:
         try:
-            auto_import_movies()
+            if singleton_active(): auto_import_movies()
         except Exception as e:
             print(f"Scheduler Error: {e}")
         time.sleep(21600) # 21600 সেকেন্ড = ৬ ঘণ্টা
 
+# --- TMDB IMAGE SIZES ---
+# ডেটাবেসে শুধু TMDB পাথ কি ("/abc.jpg") রাখা হয়; কোন সাইজ লাগবে সেটা রেন্ডারের সময় ঠিক হয়
+TMDB_IMAGE_BASE = os.getenv("TMDB_IMAGE_BASE", "https://image.tmdb.org/t/p")
+TMDB_IMAGE_RE = re.compile(r'^https?://image\.tmdb\.org/t/p/[^/]+(/[^/?#]+)$')
+
+# context -> (ডিফল্ট src সাইজ, srcset এর [(সাইজ, পিক্সেল প্রস্থ)], sizes অ্যাট্রিবিউট)
+IMAGE_CONTEXTS = {
+    "grid": ("w342", [("w154", 154), ("w185", 185), ("w342", 342), ("w500", 500)],
+             "(min-width: 900px) 20vw, (min-width: 600px) 33vw, 50vw"),
+    "slider": ("w780", [("w300", 300), ("w780", 780), ("w1280", 1280)], "100vw"),
+    "slider_poster": ("w500", [("w342", 342), ("w500", 500), ("w780", 780)], "100vw"),
+    "detail": ("w342", [("w185", 185), ("w342", 342), ("w500", 500)], "(min-width: 768px) 180px, 140px"),
+    "backdrop": ("w780", [("w300", 300), ("w780", 780), ("w1280", 1280)], "100vw"),
+    "cast": ("w185", [("w45", 45), ("w185", 185)], "80px"),
+}
+
+def image_key(value):
+    """ পুরনো ফুল TMDB URL থেকে পাথ কি বের করে; অন্য কোনো URL হলে যেমন আছে তেমনই ফেরত দেয় """
+    if not value: return None
+    value = value.strip()
+    match = TMDB_IMAGE_RE.match(value)
+    return match.group(1) if match else value
+
+def tmdb_image(value, size="w500"):
+    """ পাথ কি (বা পুরনো URL) থেকে নির্দিষ্ট সাইজের ছবির URL """
+    key = image_key(value)
+    if not key: return None
+    if key.startswith("/"): return f"{TMDB_IMAGE_BASE}/{size}{key}"
+    return key
+
+def responsive_img(value, context, fallback=None):
+    """ <img> ট্যাগের src/srcset/sizes অ্যাট্রিবিউট; TMDB ছাড়া অন্য ছবির জন্য শুধু src """
+    key = image_key(value)
+    if not key:
+        return Markup('src="%s"') % fallback if fallback else Markup('')
+    if not key.startswith("/"):
+        return Markup('src="%s"') % key
+    default_size, widths, sizes = IMAGE_CONTEXTS[context]
+    srcset = ", ".join(f"{TMDB_IMAGE_BASE}/{size}{key} {width}w" for size, width in widths)
+    return Markup('src="%s" srcset="%s" sizes="%s"') % (tmdb_image(key, default_size), srcset, sizes)
+
+def image_key_updates(movie):
+    """ একটা ডকুমেন্টের পুরনো ফুল URL গুলোকে পাথ কি তে বদলানোর $set (কিছু বদলানোর না থাকলে খালি) """
+    changes = {}
+    for field in ("poster", "backdrop"):
+        value = movie.get(field)
+        if value and image_key(value) != value:
+            changes[field] = image_key(value)
+    cast = movie.get("cast") or []
+    if any(actor.get("img") and image_key(actor["img"]) != actor["img"] for actor in cast):
+        changes["cast"] = [dict(actor, img=image_key(actor.get("img"))) for actor in cast]
+    return changes
+
+def migrate_image_keys(batch_size=500):
+    """ পুরো ডেটাবেসের poster/backdrop/cast ছবি URL থেকে পাথ কি তে রূপান্তর (একাধিকবার চালানো নিরাপদ) """
+    query = {"$or": [
+        {"poster": TMDB_IMAGE_RE},
+        {"backdrop": TMDB_IMAGE_RE},
+        {"cast.img": TMDB_IMAGE_RE}
+    ]}
+    ops, updated = [], 0
+    for movie in movies.find(query, {"poster": 1, "backdrop": 1, "cast": 1}):
+        changes = image_key_updates(movie)
+        if changes:
+            ops.append(UpdateOne({"_id": movie["_id"]}, {"$set": changes}))
+        if len(ops) >= batch_size:
+            updated += movies.bulk_write(ops, ordered=False).modified_count
+            ops = []
+    if ops:
+        updated += movies.bulk_write(ops, ordered=False).modified_count
+    return updated
+
+# --- CIRCUIT BREAKERS (TMDB / Telegram / Shortener) ---
+# প্রতিটা বাইরের সার্ভিসের নিজস্ব লেটেন্সি বাজেট (টাইমআউট) আছে। পরপর কয়েকবার ফেইল করলে ব্রেকার
+# খুলে যায় (open) এবং কিছুক্ষণ কল না করেই সাথে সাথে ফেইল করে; তারপর একটা ট্রায়াল কল (half-open)
+TMDB_TIMEOUT = float(os.getenv("TMDB_TIMEOUT", 4))
+TELEGRAM_TIMEOUT = float(os.getenv("TELEGRAM_TIMEOUT", 5))
+SHORTENER_TIMEOUT = float(os.getenv("SHORTENER_TIMEOUT", 4))
+BREAKER_THRESHOLD = int(os.getenv("BREAKER_THRESHOLD", 5))
+BREAKER_RESET = float(os.getenv("BREAKER_RESET", 30))
+
+class CircuitOpenError(Exception):
+    pass
+
+class CircuitBreaker:
+    """ closed -> (পরপর threshold বার ফেইল) -> open -> (reset_timeout পর) -> half-open -> সফল হলে closed """
+
+    def __init__(self, name, budget, failure_threshold=BREAKER_THRESHOLD, reset_timeout=BREAKER_RESET):
+        self.name = name
+        self.budget = budget
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+        self.successes = 0
+        self.failures = 0
+        self.fast_fails = 0
+        self.transitions = deque(maxlen=20)
+        self.lock = threading.Lock()
+
+    def _move(self, new_state):
+        self.transitions.append({"at": utc_now(), "from": self.state, "to": new_state})
+        print(f"⚡ Circuit [{self.name}] {self.state} -> {new_state}")
+        self.state = new_state
+        if new_state == "open": self.opened_at = time.monotonic()
+
+    def allow(self):
+        with self.lock:
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self._move("half_open")
+            if self.state == "closed":
+                return True
+            if self.state == "half_open" and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return True
+            self.fast_fails += 1
+            return False
+
+    def record(self, ok):
+        with self.lock:
+            self.trial_in_flight = False
+            if ok:
+                self.successes += 1
+                self.consecutive_failures = 0
+                if self.state != "closed": self._move("closed")
+            else:
+                self.failures += 1
+                self.consecutive_failures += 1
+                if self.state == "half_open" or (self.state == "closed" and self.consecutive_failures >= self.failure_threshold):
+                    self._move("open")
+
+    def call(self, fn, *args, **kwargs):
+        """ fn(*args, timeout=budget) চালায়; 5xx/429 বা এক্সেপশন হলে ফেইল হিসেবে গণনা """
+        if not self.allow():
+            raise CircuitOpenError(f"{self.name} circuit is open")
+        try:
+            resp = fn(*args, timeout=self.budget, **kwargs)
+        except Exception:
+            self.record(False)
+            raise
+        self.record(not http_failed(resp.status_code))
+        return resp
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "name": self.name, "state": self.state, "budget_ms": int(self.budget * 1000),
+                "consecutive_failures": self.consecutive_failures, "successes": self.successes,
+                "failures": self.failures, "fast_fails": self.fast_fails, "transitions": list(self.transitions),
+            }
+
+def http_failed(status_code):
+    return status_code >= 500 or status_code == 429
+
+breakers = {
+    "tmdb": CircuitBreaker("tmdb", TMDB_TIMEOUT),
+    "telegram": CircuitBreaker("telegram", TELEGRAM_TIMEOUT),
+    "shortener": CircuitBreaker("shortener", SHORTENER_TIMEOUT),
+}
+
+def tg_post(method, payload):
+    """ Telegram Bot API কল (ব্রেকার ও লেটেন্সি বাজেট সহ) """
+    return breakers["telegram"].call(requests.post, f"{TELEGRAM_API_URL}/{method}", json=payload)
+
+# --- TMDB RESPONSE CACHE ---
+# এডমিন সার্চ, ইনজেস্ট আর রি-এনরিচ সবাই একই ক্যাশ ব্যবহার করে; কোনো TMDB কল টাইমআউট ছাড়া নয়
+TMDB_LOOKUP_DEADLINE = float(os.getenv("TMDB_LOOKUP_DEADLINE", 5))
+TMDB_CACHE_TTL = int(os.getenv("TMDB_CACHE_TTL", 6 * 3600))
+TMDB_CACHE_MISS_TTL = 600
+TMDB_CACHE_SIZE = 2000
+
+class TmdbCache:
+    """ TMDB রেসপন্সের TTL সহ LRU ক্যাশ। ভ্যালু শেয়ার্ড, তাই কেউ যেন এগুলো মডিফাই না করে """
+
+    def __init__(self, max_items):
+        self.max_items = max_items
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            entry = self.items.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                self.misses += 1
+                return None
+            self.items.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value, ttl):
+        with self.lock:
+            self.items[key] = (time.monotonic() + ttl, value)
+            self.items.move_to_end(key)
+            while len(self.items) > self.max_items:
+                self.items.popitem(last=False)
+
+tmdb_cache = TmdbCache(TMDB_CACHE_SIZE)
+tmdb_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="tmdb")
+
+def tmdb_cache_key(url):
+    return re.sub(r'api_key=[^&]*&?', '', url)
+
+def tmdb_cache_store(key, status, data):
+    """ 200 লম্বা সময়, 404 অল্প সময় ক্যাশ হয়; বাকিগুলো (5xx, 429) ক্যাশ হয় না """
+    if status == 200: tmdb_cache.put(key, (status, data), TMDB_CACHE_TTL)
+    elif status == 404: tmdb_cache.put(key, (status, data), TMDB_CACHE_MISS_TTL)
+
+def tmdb_get(url):
+    """ ক্যাশ হয়ে TMDB GET; রিটার্ন (status_code, json বা None)। ব্রেকার খোলা থাকলে CircuitOpenError """
+    key = tmdb_cache_key(url)
+    cached = tmdb_cache.get(key)
+    if cached is not None: return cached
+    resp = breakers["tmdb"].call(requests.get, url)
+    if http_failed(resp.status_code):
+        raise requests.HTTPError(f"TMDB returned {resp.status_code}")
+    try: data = resp.json()
+    except ValueError: data = None
+    tmdb_cache_store(key, resp.status_code, data)
+    return resp.status_code, data
+
+# --- TMDB LOOKUP CHAIN (admin search) ---
+# প্রতিটা লুকআপ একটা পেলোড (dict) দেয় অথবা None (মানে এই পথে কিছু পাওয়া যায়নি)
+def tmdb_lookup_by_id(m_type, m_id):
+    status, data = tmdb_get(f"{TMDB_API_URL}/{m_type}/{m_id}?api_key={TMDB_API_KEY}")
+    if status == 200 and data:
+        return {'results': [dict(data, media_type=m_type)]}
+    return None
+
+def tmdb_lookup_imdb(imdb_id):
+    status, data = tmdb_get(f"{TMDB_API_URL}/find/{imdb_id}?api_key={TMDB_API_KEY}&external_source=imdb_id")
+    if status != 200 or not data: return None
+    results = [dict(item, media_type='movie') for item in data.get('movie_results') or []]
+    results += [dict(item, media_type='tv') for item in data.get('tv_results') or []]
+    return {'results': results} if results else None
+
+def tmdb_lookup_multi(query):
+    status, data = tmdb_get(f"{TMDB_API_URL}/search/multi?api_key={TMDB_API_KEY}&query={requests.utils.quote(query)}")
+    return data if status == 200 and data is not None else None
+
+def tmdb_lookup_candidates(query):
+    """
+    কুয়েরি থেকে অগ্রাধিকার অনুযায়ী লুকআপের ধাপ: TMDB লিংক > IMDb ID > নিউমেরিক ID (movie, তারপর tv),
+    আর শেষ ধাপে মাল্টি-সার্চ। সরাসরি লুকআপ খাটলে মাল্টি-সার্চ শুধু সেগুলো খালি এলে চলে।
+    """
+    direct = []
+    tmdb_url_match = re.search(r'themoviedb\.org/(movie|tv)/(\d+)', query)
+    imdb_match = re.search(r'(tt\d+)', query)
+    if tmdb_url_match:
+        direct.append(partial(tmdb_lookup_by_id, tmdb_url_match.group(1), tmdb_url_match.group(2)))
+    elif imdb_match:
+        direct.append(partial(tmdb_lookup_imdb, imdb_match.group(1)))
+    elif query.isdigit():
+        direct += [partial(tmdb_lookup_by_id, 'movie', query), partial(tmdb_lookup_by_id, 'tv', query)]
+    fallback = [partial(tmdb_lookup_multi, query)]
+    return [direct, fallback] if direct else [fallback]
+
+def first_sufficient(stages, deadline=TMDB_LOOKUP_DEADLINE):
+    """
+    ধাপে ধাপে লুকআপ, একই ধাপের গুলো একসাথে চলে। অগ্রাধিকারে সবচেয়ে আগের যে লুকআপ ফলাফল দেয় সেটাই
+    ফেরত যায়, নিচের গুলোর জন্য অপেক্ষা করা হয় না; পুরো ধাপ খালি এলে পরের ধাপ। ডেডলাইন সব ধাপ মিলিয়ে,
+    পার হলে ততক্ষণে যা পাওয়া গেছে তার মধ্যে সেরাটা।
+    """
+    end = time.monotonic() + deadline
+    for candidates in stages:
+        futures = [tmdb_pool.submit(fn) for fn in candidates]
+        for index, future in enumerate(futures):
+            try:
+                result = future.result(timeout=max(end - time.monotonic(), 0))
+            except FutureTimeout:
+                for later in futures[index + 1:]:
+                    if later.done() and not later.exception() and later.result() is not None:
+                        return later.result()
+                return None
+            except Exception:
+                continue
+            if result is not None:
+                return result
+    return None
+
+# --- LOCAL TMDB TITLE INDEX (daily ID exports) ---
+# TMDB প্রতিদিন সব movie/tv এর (id, original_title/original_name, popularity) gzip NDJSON এক্সপোর্ট দেয়।
+# সেখান থেকে ডিস্কে সাজানো ইনডেক্স বানানো হয়: <kind>.keys এ নরমালাইজড টাইটেলগুলো পরপর, <kind>.recs এ
+# (অফসেট, দৈর্ঘ্য, tmdb_id, popularity) রেকর্ড টাইটেল অনুযায়ী সাজানো। দুটোই mmap করে পড়া হয়, তাই মেমরিতে
+# লোড হয় না। টাইটেল -> tmdb_id লোকালি মিলে গেলে সার্চ কল লাগে না, শুধু ডিটেইলস কল নেটওয়ার্কে যায়।
+#     python bot.py tmdb-index refresh [MM_DD_YYYY]     (cron এ দিনে একবার)
+TMDB_INDEX_DIR = os.getenv("TMDB_INDEX_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "tmdb_index"))
+TMDB_EXPORT_URL = "http://files.tmdb.org/p/exports/{name}_ids_{date}.json.gz"
+TMDB_EXPORT_NAMES = {"movie": "movie", "tv": "tv_series"}
+TMDB_EXPORT_TITLE_FIELD = {"movie": "original_title", "tv": "original_name"}
+TMDB_INDEX_RECORD = struct.Struct('<IIIf')   # key অফসেট, key দৈর্ঘ্য, tmdb_id, popularity
+TMDB_INDEX_CANDIDATES = 3        # এতগুলো প্রার্থীর ডিটেইলস দেখে সাল মেলানো হয়
+TMDB_INDEX_FUZZY_SCAN = 2000     # fuzzy ম্যাচে সর্বোচ্চ এতগুলো টাইটেল তুলনা
+TMDB_INDEX_FUZZY_RATIO = 0.88
+TMDB_INDEX_RELOAD_INTERVAL = 300
+
+def tmdb_index_path(kind, ext, out_dir=None):
+    return os.path.join(out_dir or TMDB_INDEX_DIR, f"{kind}.{ext}")
+
+def build_tmdb_index(kind, lines, out_dir=None, source=None):
+    """ এক্সপোর্টের NDJSON লাইন থেকে <kind>.keys/.recs লেখে (tmp ফাইলে লিখে os.replace), শেষে manifest """
+    out_dir = out_dir or TMDB_INDEX_DIR
+    title_field = TMDB_EXPORT_TITLE_FIELD[kind]
+    entries = []
+    for line in lines:
+        try: item = json.loads(line)
+        except ValueError: continue
+        key = normalize_title(item.get(title_field)).encode()
+        if key and item.get("id"):
+            entries.append((key, -float(item.get("popularity") or 0), int(item["id"])))
+    # একই টাইটেলের মধ্যে বেশি জনপ্রিয়টা আগে
+    entries.sort()
+
+    os.makedirs(out_dir, exist_ok=True)
+    keys_path, recs_path = tmdb_index_path(kind, "keys", out_dir), tmdb_index_path(kind, "recs", out_dir)
+    offset = 0
+    with open(keys_path + ".tmp", "wb") as keys_file, open(recs_path + ".tmp", "wb") as recs_file:
+        for key, neg_popularity, tmdb_id in entries:
+            keys_file.write(key)
+            recs_file.write(TMDB_INDEX_RECORD.pack(offset, len(key), tmdb_id, -neg_popularity))
+            offset += len(key)
+    os.replace(keys_path + ".tmp", keys_path)
+    os.replace(recs_path + ".tmp", recs_path)
+
+    manifest_path = os.path.join(out_dir, "manifest.json")
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f: manifest = json.load(f)
+    manifest[kind] = {"count": len(entries), "key_bytes": offset, "source": source, "built_at": time.time()}
+    with open(manifest_path + ".tmp", "w") as f: json.dump(manifest, f)
+    os.replace(manifest_path + ".tmp", manifest_path)
+    return len(entries)
+
+def tmdb_export_lines(kind, date=None):
+    """ এক্সপোর্ট ফাইল স্ট্রিম করে ডাউনলোড + gunzip, লাইন ধরে (পুরো ফাইল মেমরিতে আসে না) """
+    date = date or (datetime.now(timezone.utc) - timedelta(days=1)).strftime("%m_%d_%Y")
+    url = TMDB_EXPORT_URL.format(name=TMDB_EXPORT_NAMES[kind], date=date)
+    with requests.get(url, stream=True, timeout=60) as resp:
+        resp.raise_for_status()
+        with gzip.GzipFile(fileobj=resp.raw) as gz:
+            yield from io.TextIOWrapper(gz, encoding="utf-8")
+
+def refresh_tmdb_index(date=None, out_dir=None):
+    counts = {}
+    for kind in TMDB_EXPORT_NAMES:
+        counts[kind] = build_tmdb_index(kind, tmdb_export_lines(kind, date), out_dir, source=date or "latest")
+    return counts
+
+class LocalTmdbIndex:
+    def __init__(self, path=None):
+        self.path = path or TMDB_INDEX_DIR
+        self.lock = threading.Lock()
+        self.tables = {}        # kind -> (keys mmap, recs mmap, রেকর্ড সংখ্যা)
+        self.loaded_mtime = None
+        self.checked_at = 0
+
+    def _load(self):
+        """ manifest বদলালে নতুন ফাইলগুলো mmap করে; পুরনো mmap চলমান লুকআপ শেষ হলে GC তে বন্ধ হয় """
+        now = time.time()
+        if now - self.checked_at < TMDB_INDEX_RELOAD_INTERVAL: return self.tables
+        with self.lock:
+            if now - self.checked_at < TMDB_INDEX_RELOAD_INTERVAL: return self.tables
+            self.checked_at = now
+            try: mtime = os.stat(os.path.join(self.path, "manifest.json")).st_mtime
+            except OSError: mtime = None
+            if mtime == self.loaded_mtime: return self.tables
+            tables = {}
+            for kind in TMDB_EXPORT_NAMES:
+                try:
+                    with open(tmdb_index_path(kind, "keys", self.path), "rb") as kf, \
+                         open(tmdb_index_path(kind, "recs", self.path), "rb") as rf:
+                        count = os.fstat(rf.fileno()).st_size // TMDB_INDEX_RECORD.size
+                        if not count: continue
+                        keys = mmap.mmap(kf.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(kf.fileno()).st_size else b""
+                        tables[kind] = (keys, mmap.mmap(rf.fileno(), 0, access=mmap.ACCESS_READ), count)
+                except (OSError, ValueError):
+                    continue
+            self.tables, self.loaded_mtime = tables, mtime
+            return tables
+
+    @staticmethod
+    def _record(table, i):
+        return TMDB_INDEX_RECORD.unpack_from(table[1], i * TMDB_INDEX_RECORD.size)
+
+    @staticmethod
+    def _key(table, i):
+        offset, length, _, _ = TMDB_INDEX_RECORD.unpack_from(table[1], i * TMDB_INDEX_RECORD.size)
+        return table[0][offset:offset + length]
+
+    def _range(self, table, lo_key, hi_key):
+        entries, key = range(table[2]), partial(self._key, table)
+        return bisect.bisect_left(entries, lo_key, key=key), bisect.bisect_left(entries, hi_key, key=key)
+
+    def candidates(self, title, kind="movie", limit=TMDB_INDEX_CANDIDATES):
+        """
+        হুবহু (নরমালাইজড) মিল থাকলে সেগুলো popularity অনুযায়ী; না থাকলে একই প্রথম শব্দ দিয়ে শুরু
+        হওয়া টাইটেলগুলোর মধ্যে fuzzy মিল (ratio, তারপর popularity)। রিটার্ন tmdb_id লিস্ট।
+        """
+        query = normalize_title(title).encode()
+        table = self._load().get(kind) if query else None
+        if not table: return []
+
+        lo, hi = self._range(table, query, query + b'\x00')
+        # query এর পরে b'\x00' কোনো key তে থাকে না, তাই [lo, hi) = ঠিক query এর সমান key গুলো
+        if hi > lo:
+            return [self._record(table, i)[2] for i in range(lo, min(hi, lo + limit))]
+
+        # প্রথম শব্দের রেঞ্জ বড় হলে query যেখানে বসত তার আশেপাশের টাইটেলগুলো (সাজানো ক্রমে কাছের)
+        position = lo
+        first_word = query.split(b' ')[0]
+        lo, hi = self._range(table, first_word, first_word + b'\xff')
+        if hi - lo > TMDB_INDEX_FUZZY_SCAN:
+            lo = min(max(lo, position - TMDB_INDEX_FUZZY_SCAN // 2), hi - TMDB_INDEX_FUZZY_SCAN)
+            hi = lo + TMDB_INDEX_FUZZY_SCAN
+        matcher = difflib.SequenceMatcher(None, b=query.decode())
+        scored = []
+        for i in range(lo, hi):
+            matcher.set_seq1(self._key(table, i).decode())
+            if matcher.real_quick_ratio() < TMDB_INDEX_FUZZY_RATIO or matcher.quick_ratio() < TMDB_INDEX_FUZZY_RATIO: continue
+            ratio = matcher.ratio()
+            if ratio >= TMDB_INDEX_FUZZY_RATIO:
+                _, _, tmdb_id, popularity = self._record(table, i)
+                scored.append((ratio, popularity, tmdb_id))
+        return [tmdb_id for _, _, tmdb_id in heapq.nlargest(limit, scored)]
+
+    def snapshot(self):
+        tables = self._load()
+        return {kind: table[2] for kind, table in tables.items()}
+
+local_tmdb_index = LocalTmdbIndex()
+
+def tmdb_year_matches(extra, tmdb_type, year):
+    """ এক্সপোর্টে সাল থাকে না, তাই ডিটেইলস থেকে মেলানো হয় (±১ বছর)। সিরিজে সাল দেখা হয় না (সার্চেও না) """
+    if not year or tmdb_type == "tv": return True
+    released = (extra.get("release_date") or "")[:4]
+    return not released.isdigit() or abs(int(released) - int(year)) <= 1
+
+def local_tmdb_details(title, tmdb_type, year=None):
+    """ লোকাল ইনডেক্সের প্রার্থীদের ডিটেইলস কল করে প্রথম যেটার সাল মেলে; কিছু না মিললে None (রিমোট সার্চ হবে) """
+    for tmdb_id in local_tmdb_index.candidates(title, tmdb_type):
+        status, extra = tmdb_get(tmdb_details_url(tmdb_type, tmdb_id))
+        if status == 200 and extra and tmdb_year_matches(extra, tmdb_type, year):
+            return build_tmdb_details(extra, extra, tmdb_type)
+    return None
+
 # --- TMDB FUNCTION ---
+def tmdb_search_url(title, tmdb_type, year=None):
+    query_str = requests.utils.quote(title)
+    search_url = f"{TMDB_API_URL}/search/{tmdb_type}?api_key={TMDB_API_KEY}&query={query_str}"
+    if year and tmdb_type == "movie":
+        search_url += f"&year={year}"
+    return search_url
+
+def tmdb_details_url(tmdb_type, m_id):
+    return f"{TMDB_API_URL}/{tmdb_type}/{m_id}?api_key={TMDB_API_KEY}&append_to_response=credits,videos"
+
+def build_tmdb_details(res, extra, tmdb_type):
+    """ সার্চ রেজাল্ট (res) এবং ডিটেইলস (extra) থেকে ডেটাবেসের ফরম্যাটে ডেটা সাজায় """
+    trailer_key = None
+    if extra.get('videos', {}).get('results'):
+        for vid in extra['videos']['results']:
+            if vid['type'] == 'Trailer' and vid['site'] == 'YouTube':
+                trailer_key = vid['key']
+                break
+
+    cast_list = []
+    if extra.get('credits', {}).get('cast'):
+        for actor in extra['credits']['cast'][:6]:
+            cast_list.append({
+                'name': actor['name'],
+                'img': actor.get('profile_path')
+            })
+
+    genres = [g['name'] for g in extra.get('genres', [])]
+    runtime = extra.get("runtime") or (extra.get("episode_run_time")[0] if extra.get("episode_run_time") else None)
+
+    poster = res.get('poster_path')
+    backdrop = res.get('backdrop_path')
+    is_adult_tmdb = res.get("adult", False)
+
+    return {
+        "tmdb_id": res.get("id"),
+        "title": res.get("name") if tmdb_type == "tv" else res.get("title"),
+        "overview": res.get("overview"),
+        "poster": poster,
+        "backdrop": backdrop,
+        "release_date": res.get("first_air_date") if tmdb_type == "tv" else res.get("release_date"),
+        "vote_average": res.get("vote_average"),
+        "genres": genres,
+        "runtime": runtime,
+        "trailer": trailer_key,
+        "cast": cast_list,
+        "adult": is_adult_tmdb
+    }
+
+class SingleFlight:
+    """
+    একই key এর সমসাময়িক কলগুলো একটা কলের ফলাফল শেয়ার করে (প্রসেসের ভিতরে)।
+    সিরিজের ১০টা এপিসোড একসাথে এলে TMDB তে একটাই লুকআপ যায়, বাকিরা অপেক্ষা করে।
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.shared = 0
+
+    def do(self, key, fn):
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader: call = self.calls[key] = {"done": threading.Event()}
+            else: self.shared += 1
+        if not leader:
+            call["done"].wait()
+            if "error" in call: raise call["error"]
+            return call["result"]
+        try:
+            call["result"] = fn()
+            return call["result"]
+        except Exception as e:
+            call["error"] = e
+            raise
+        finally:
+            with self.lock: del self.calls[key]
+            call["done"].set()
+
+tmdb_flight = SingleFlight()
+
 def get_tmdb_details(title, content_type="movie", year=None):
+    """ নরমালাইজড (টাইটেল, টাইপ, সাল) অনুযায়ী single-flight; ফলাফল শেয়ার্ড, মডিফাই করা যাবে না """
+    return tmdb_flight.do((normalize_title(title) or title, content_type, year),
+                          lambda: fetch_tmdb_details(title, content_type, year))
+
+def fetch_tmdb_details(title, content_type="movie", year=None):
     if not TMDB_API_KEY: return {"title": title}
     tmdb_type = "tv" if content_type == "series" else "movie"
     try:
-        query_str = requests.utils.quote(title)
-        search_url = f"https://api.themoviedb.org/3/search/{tmdb_type}?api_key={TMDB_API_KEY}&query={query_str}"
-        if year and tmdb_type == "movie":
-            search_url += f"&year={year}"
-
-        data = requests.get(search_url, timeout=5).json()
-        if data.get("results"):
+        local = local_tmdb_details(title, tmdb_type, year)
+        if local: return local
+        _, data = tmdb_get(tmdb_search_url(title, tmdb_type, year))
+        if data and data.get("results"):
             res = data["results"][0]
-            m_id = res.get("id")
-            
-            details_url = f"https://api.themoviedb.org/3/{tmdb_type}/{m_id}?api_key={TMDB_API_KEY}&append_to_response=credits,videos"
-            extra = requests.get(details_url, timeout=5).json()
-
-            trailer_key = None
-            if extra.get('videos', {}).get('results'):
-                for vid in extra['videos']['results']:
-                    if vid['type'] == 'Trailer' and vid['site'] == 'YouTube':
-                        trailer_key = vid['key']
-                        break
-            
-            cast_list = []
-            if extra.get('credits', {}).get('cast'):
-                for actor in extra['credits']['cast'][:6]:
-                    cast_list.append({
-                        'name': actor['name'],
-                        'img': f"https://image.tmdb.org/t/p/w185{actor['profile_path']}" if actor.get('profile_path') else None
-                    })
-
-            genres = [g['name'] for g in extra.get('genres', [])]
-            runtime = extra.get("runtime") or (extra.get("episode_run_time")[0] if extra.get("episode_run_time") else None)
-
-            poster = f"https://image.tmdb.org/t/p/w500{res['poster_path']}" if res.get('poster_path') else None
-            backdrop = f"https://image.tmdb.org/t/p/w1280{res['backdrop_path']}" if res.get('backdrop_path') else None
-            is_adult_tmdb = res.get("adult", False)
-
-            return {
-                "tmdb_id": res.get("id"),
-                "title": res.get("name") if tmdb_type == "tv" else res.get("title"),
-                "overview": res.get("overview"),
-                "poster": poster,
-                "backdrop": backdrop,
-                "release_date": res.get("first_air_date") if tmdb_type == "tv" else res.get("release_date"),
-                "vote_average": res.get("vote_average"),
-                "genres": genres,        
-                "runtime": runtime, 
-                "trailer": trailer_key,  
-                "cast": cast_list,
-                "adult": is_adult_tmdb
-            }
+            _, extra = tmdb_get(tmdb_details_url(tmdb_type, res.get("id")))
+            return build_tmdb_details(res, extra or {}, tmdb_type)
     except Exception as e:
+        # TMDB ডাউন: প্লেসহোল্ডার টাইটেল দিয়ে ইনজেস্ট হবে, পরে retry_pending_enrichment আবার চেষ্টা করবে
         print(f"TMDB Error: {e}")
+        return {"title": title, "enrich_pending": True}
     return {"title": title}
 
 def escape_markdown(text):
@@ -287,29 +981,219 @@ def escape_markdown(text):
     chars = r'_*[]()~`>#+-=|{}.!'
     return re.sub(f'([{re.escape(chars)}])', r'\\\1', text)
 
+def check_credentials(auth):
+    """ Basic Auth (werkzeug Authorization অবজেক্ট) এডমিন কিনা চেক করে """
+    return bool(auth and auth.username == ADMIN_USER and auth.password == ADMIN_PASS)
+
 def check_auth():
-    auth = request.authorization
-    if not auth or not (auth.username == ADMIN_USER and auth.password == ADMIN_PASS):
-        return False
-    return True
+    return check_credentials(request.authorization)
 
-@app.context_processor
-def inject_globals():
-    ad_codes = settings.find_one() or {}
+def template_globals(ad_codes):
+    """ সব টেমপ্লেটে যে ভেরিয়েবলগুলো লাগে (WSGI ও ASGI দুই মোডেই ব্যবহার হয়) """
     return dict(
         ad_settings=ad_codes, 
         BOT_USERNAME=BOT_USERNAME, 
         site_name="MovieZone",
-        quote=urllib.parse.quote 
+        quote=urllib.parse.quote,
+        asset_url=asset_url,
+        quality_class=quality_class,
+        img=responsive_img,
+        tmdb_image=tmdb_image,
+        HIDE_BROKEN_FILES=FILE_HEALTH_HIDE_BROKEN
     )
 
+def get_site_settings():
+    """ সাইট সেটিংস রিকোয়েস্ট প্রতি একবারই ডেটাবেস থেকে পড়া হয় """
+    if 'site_settings' not in g:
+        g.site_settings = settings.find_one() or {}
+    return g.site_settings
+
+@app.context_processor
+def inject_globals():
+    return template_globals(get_site_settings())
+
+# --- RATE LIMITING (প্রতি IP, প্রতি রুট) ---
+# sliding window counter: বর্তমান উইন্ডোর কাউন্ট + আগের উইন্ডোর কাউন্ট (বাকি অংশের অনুপাতে)।
+# ফাস্ট পাথে শুধু একটা dict আপডেট; রুল না মিললে (বেশিরভাগ রিকোয়েস্ট) কিছুই হয় না।
+# RATE_LIMIT_BACKEND=mongo হলে প্রতিটা প্রসেস তার কাউন্ট RATE_LIMIT_SYNC_INTERVAL পর পর rate_limits
+# কালেকশনে যোগ করে আর সব প্রসেসের মোট পড়ে নেয়, তাই লিমিট সব gunicorn ওয়ার্কার মিলিয়ে (~১ সেকেন্ড দেরিতে)।
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") != "0"
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory").lower()
+RATE_LIMIT_SYNC_INTERVAL = float(os.getenv("RATE_LIMIT_SYNC_INTERVAL", 1))
+RATE_LIMIT_SWEEP_INTERVAL = 60
+# Render/Heroku এর মতো একটা রিভার্স প্রক্সির পেছনে; সরাসরি এক্সপোজড হলে 0 দিতে হবে (নইলে হেডার জাল করা যায়)
+TRUSTED_PROXY_COUNT = int(os.getenv("TRUSTED_PROXY_COUNT", 1))
+
+def parse_rate_limits(spec):
+    """ "shorten=20/60,search=30/60" -> {"shorten": (20, 60), "search": (30, 60)} """
+    limits = {}
+    for part in filter(None, (p.strip() for p in spec.split(','))):
+        name, _, value = part.partition('=')
+        count, _, window = value.partition('/')
+        limits[name.strip()] = (int(count), int(window or 60))
+    return limits
+
+RATE_LIMITS = {
+    # রুল: (রিকোয়েস্ট, উইন্ডো সেকেন্ড)
+    "shorten": (20, 60),
+    "report": (5, 600),
+    "dmca": (3, 3600),
+    "search": (30, 60),
+    "suggest": (120, 60),
+    **parse_rate_limits(os.getenv("RATE_LIMITS", "")),
+}
+RATE_LIMIT_PATHS = (("/api/shorten", "shorten"), ("/report/broken/", "report"), ("/dmca/report/", "dmca"),
+                    ("/api/v1/search", "search"), ("/api/suggest", "suggest"))
+RATE_LIMIT_SEARCH_PATHS = frozenset(("/", "/movies", "/series", "/api/v1/titles"))
+
+def rate_limit_rule(path, search_query=None):
+    """ পাথ থেকে রুলের নাম; লিস্টিং পেজগুলো শুধু সার্চ কুয়েরি থাকলে (q=) লিমিটেড """
+    if path in RATE_LIMIT_SEARCH_PATHS:
+        return "search" if search_query else None
+    for prefix, rule in RATE_LIMIT_PATHS:
+        if path.startswith(prefix): return rule
+    return None
+
+def client_ip(forwarded_for, remote_addr):
+    """ প্রক্সির পেছনে আসল ক্লায়েন্ট: X-Forwarded-For এর ডান দিক থেকে TRUSTED_PROXY_COUNT তম ঠিকানা """
+    if TRUSTED_PROXY_COUNT and forwarded_for:
+        hops = [hop.strip() for hop in forwarded_for.split(',') if hop.strip()]
+        if len(hops) >= TRUSTED_PROXY_COUNT:
+            return hops[-TRUSTED_PROXY_COUNT]
+    return remote_addr or "unknown"
+
+class RateLimiter:
+    def __init__(self, limits, shared=False):
+        self.limits = limits
+        self.shared = shared
+        self.lock = threading.Lock()
+        self.counts = {}      # (rule, key, window_no) -> এই প্রসেসের কাউন্ট (memory ব্যাকএন্ড)
+        self.pending = {}     # mongo: এখনো পাঠানো হয়নি এমন কাউন্ট
+        self.remote = {}      # mongo: শেষ sync এ পড়া সব প্রসেসের মোট
+        self.active = {}      # mongo: (rule, key) -> শেষ হিট, কোনগুলোর মোট পড়তে হবে
+        self.limited = 0
+        self.swept_at = time.monotonic()
+
+    def _count(self, slot):
+        if self.shared:
+            return self.remote.get(slot, 0) + self.pending.get(slot, 0)
+        return self.counts.get(slot, 0)
+
+    def hit(self, rule, key, now=None):
+        """ একটা রিকোয়েস্ট গোনে; লিমিট পার হলে কত সেকেন্ড পরে আবার চেষ্টা করা যাবে, না হলে 0 """
+        limit, window = self.limits[rule]
+        now = time.time() if now is None else now
+        window_no, elapsed = divmod(now, window)
+        window_no, elapsed = int(window_no), elapsed / window
+        slot = (rule, key, window_no)
+        with self.lock:
+            curr, prev = self._count(slot), self._count((rule, key, window_no - 1))
+            if prev * (1 - elapsed) + curr >= limit:
+                self.limited += 1
+                # কখন অনুমান limit এর নিচে নামবে: এই উইন্ডোতেই (prev কমে) নাকি পরের উইন্ডোতে (curr কমে)
+                if curr >= limit:
+                    wait = (1 - elapsed) * window + window * (1 - limit / curr)
+                else:
+                    wait = window * (1 - (limit - curr) / prev - elapsed)
+                return max(math.ceil(wait), 1)
+            target = self.pending if self.shared else self.counts
+            target[slot] = target.get(slot, 0) + 1
+            if self.shared: self.active[(rule, key)] = now
+            if time.monotonic() - self.swept_at > RATE_LIMIT_SWEEP_INTERVAL: self._sweep(now)
+        return 0
+
+    def _sweep(self, now):
+        """ আগের উইন্ডোর চেয়েও পুরনো কাউন্ট ফেলে দেয় (লক ধরা অবস্থায় ডাকা হয়) """
+        self.swept_at = time.monotonic()
+        self.counts = {s: n for s, n in self.counts.items() if s[2] >= now // self.limits[s[0]][1] - 1}
+        self.active = {k: t for k, t in self.active.items() if now - t < 2 * self.limits[k[0]][1]}
+
+    @staticmethod
+    def _doc_id(slot):
+        return f"{slot[0]}|{slot[1]}|{slot[2]}"
+
+    def sync(self):
+        """ mongo ব্যাকএন্ড: জমা কাউন্ট $inc করে সক্রিয় কী গুলোর (বর্তমান + আগের উইন্ডো) মোট পড়ে আনে """
+        with self.lock:
+            pending, self.pending = self.pending, {}
+            active = list(self.active)
+        try:
+            if pending:
+                ops = []
+                for slot, n in pending.items():
+                    window = self.limits[slot[0]][1]
+                    expires = datetime.fromtimestamp((slot[2] + 2) * window, timezone.utc).replace(tzinfo=None)
+                    ops.append(UpdateOne({"_id": self._doc_id(slot)}, {"$inc": {"n": n}, "$setOnInsert": {"expires_at": expires}}, upsert=True))
+                rate_limits.bulk_write(ops, ordered=False)
+        except Exception:
+            # পরের sync এ আবার চেষ্টা; ততক্ষণ লোকাল কাউন্ট দিয়েই লিমিট চলে
+            with self.lock:
+                for slot, n in pending.items(): self.pending[slot] = self.pending.get(slot, 0) + n
+            raise
+        now = time.time()
+        ids = []
+        for rule, key in active:
+            window_no = int(now // self.limits[rule][1])
+            ids += [self._doc_id((rule, key, window_no)), self._doc_id((rule, key, window_no - 1))]
+        remote = {}
+        for start in range(0, len(ids), 1000):
+            for doc in rate_limits.find({"_id": {"$in": ids[start:start + 1000]}}):
+                rule, key, window_no = doc["_id"].rsplit("|", 2)
+                remote[(rule, key, int(window_no))] = doc["n"]
+        with self.lock:
+            self.remote = remote
+
+    def snapshot(self):
+        return {'backend': 'mongo' if self.shared else 'memory', 'limited': self.limited,
+                'keys': len(self.active if self.shared else self.counts), 'limits': self.limits}
+
+rate_limiter = RateLimiter(RATE_LIMITS, shared=RATE_LIMIT_BACKEND == "mongo")
+
+def start_rate_limit_sync():
+    if not rate_limiter.shared: return
+    rate_limits.create_index("expires_at", expireAfterSeconds=0)
+    while True:
+        time.sleep(RATE_LIMIT_SYNC_INTERVAL)
+        try:
+            rate_limiter.sync()
+        except Exception as e:
+            print(f"Rate Limit Sync Error: {e}")
+
+def rate_limit_check(path, search_query, forwarded_for, remote_addr):
+    """ (রুল, retry_after) অথবা None; WSGI আর ASGI দুই জায়গা থেকেই ডাকা হয় """
+    if not RATE_LIMIT_ENABLED: return None
+    rule = rate_limit_rule(path, search_query)
+    if rule is None: return None
+    retry_after = rate_limiter.hit(rule, client_ip(forwarded_for, remote_addr))
+    return (rule, retry_after) if retry_after else None
+
+def rate_limit_payload(path, rule, retry_after):
+    """ 429 এর (body, content type, headers) """
+    limit, window = RATE_LIMITS[rule]
+    headers = {'Retry-After': str(retry_after), 'X-RateLimit-Limit': f"{limit};w={window}", 'Cache-Control': 'no-store'}
+    if path.startswith('/api/'):
+        return json.dumps({'error': 'Too many requests', 'retry_after': retry_after}), 'application/json', headers
+    return f"Too many requests. Try again in {retry_after} seconds.", 'text/plain; charset=utf-8', headers
+
+@app.before_request
+def apply_rate_limit():
+    # ASGI মোডে (a2wsgi দিয়ে আসা রিকোয়েস্ট) মিডলওয়্যার আগেই গুনে ফেলেছে
+    if 'asgi.scope' in request.environ: return None
+    limited = rate_limit_check(request.path, request.args.get('q'), request.headers.get('X-Forwarded-For'), request.remote_addr)
+    if limited:
+        body, content_type, headers = rate_limit_payload(request.path, *limited)
+        return Response(body, 429, headers, content_type=content_type)
+
 # --- ANTI-BAN: CRAWLER BLOCKER ---
+BLOCKED_BOTS = ['googlebot', 'bingbot', 'ahrefsbot', 'semrushbot', 'mj12bot', 'dotbot', 'petalbot', 'bytespider', 'dmca', 'copyright', 'monitor', 'internet-archive']
+
+def is_blocked_agent(user_agent):
+    user_agent = (user_agent or '').lower()
+    return any(bot in user_agent for bot in BLOCKED_BOTS)
+
 @app.before_request
 def block_bots():
-    user_agent = request.headers.get('User-Agent', '').lower()
-    blocked_bots = ['googlebot', 'bingbot', 'ahrefsbot', 'semrushbot', 'mj12bot', 'dotbot', 'petalbot', 'bytespider', 'dmca', 'copyright', 'monitor', 'internet-archive']
-    
-    if any(bot in user_agent for bot in blocked_bots):
+    if is_blocked_agent(request.headers.get('User-Agent', '')):
         abort(404)
 
 # --- ROBOTS.TXT (Stop Indexing) ---
@@ -318,246 +1202,824 @@ def robots_txt():
     return Response("User-agent: *\nDisallow: /", mimetype="text/plain")
 
 
-# === TELEGRAM WEBHOOK ===
-@app.route(f'/webhook/{BOT_TOKEN}', methods=['POST'])
-def telegram_webhook():
-    update = request.get_json()
-    if not update: return jsonify({'status': 'ignored'})
+# === INGEST HELPERS (Webhook / ASGI দুই জায়গায় ব্যবহার হয়) ===
+MY_CHANNEL_LINK = "https://t.me/MovieZone_Official" 
+
+def utc_now():
+    return datetime.now(datetime.UTC) if hasattr(datetime, 'UTC') else datetime.utcnow()
+
+def parse_channel_post(msg):
+    """ চ্যানেল পোস্ট থেকে ফাইল ইনফো, সার্চ টাইটেল, সাল এবং কনটেন্ট টাইপ বের করে। ফাইল না থাকলে None """
+    file_id = None
+    file_name = "Unknown"
+    file_size_mb = 0
+    file_type = "document"
+
+    if 'video' in msg:
+        video = msg['video']
+        file_id = video['file_id']
+        file_name = video.get('file_name', msg.get('caption', 'Unknown Video'))
+        file_size_mb = video.get('file_size', 0) / (1024 * 1024)
+        file_type = "video"
+    elif 'document' in msg:
+        doc = msg['document']
+        file_id = doc['file_id']
+        file_name = doc.get('file_name', 'Unknown Document')
+        file_size_mb = doc.get('file_size', 0) / (1024 * 1024)
+        file_type = "document"
 
-    MY_CHANNEL_LINK = "https://t.me/MovieZone_Official" 
+    if not file_id: return None
 
-    if 'channel_post' in update:
-        msg = update['channel_post']
-        chat_id = str(msg.get('chat', {}).get('id'))
-        
-        if SOURCE_CHANNEL_ID and chat_id != str(SOURCE_CHANNEL_ID):
-            return jsonify({'status': 'wrong_channel'})
+    raw_caption = msg.get('caption')
+    raw_input = raw_caption if raw_caption else file_name
+    
+    search_title = clean_filename(raw_input) 
+    year_match = re.search(r'\b(19|20)\d{2}\b', raw_input)
+    search_year = year_match.group(0) if year_match else None
+    
+    content_type = "movie"
+    if re.search(r'(S\d+|Season|Episode|Ep\s*\d+|Combined|E\d+-E\d+)', file_name, re.IGNORECASE) or re.search(r'(S\d+|Season)', str(raw_caption), re.IGNORECASE):
+        content_type = "series"
+
+    return {
+        "chat_id": str(msg.get('chat', {}).get('id')),
+        "message_id": msg.get('message_id'),
+        "file_id": file_id,
+        "file_name": file_name,
+        "file_size_mb": file_size_mb,
+        "file_type": file_type,
+        "raw_caption": raw_caption,
+        "raw_input": raw_input,
+        "search_title": search_title,
+        "search_year": search_year,
+        "content_type": content_type,
+    }
 
-        file_id = None
-        file_name = "Unknown"
-        file_size_mb = 0
-        file_type = "document"
+def build_ingest_record(item, tmdb_data, current_time=None):
+    """
+    পার্স করা পোস্ট + TMDB ডেটা থেকে ফাইল অবজেক্ট এবং নতুন মুভি ডকুমেন্ট তৈরি করে।
+    current_time: ব্যাকফিলে মূল পোস্টের সময় (না দিলে এখনকার সময়)
+    """
+    final_title = tmdb_data.get('title', item['search_title'])
+    quality = get_file_quality(item['file_name'])
+    
+    is_adult = tmdb_data.get('adult', False)
+    if not is_adult:
+        is_adult = is_adult_content(final_title)
+
+    episode_label = get_episode_label(item['file_name'])
+    if item['content_type'] == "series" and not episode_label:
+        clean_part = item['file_name'].replace(item['search_title'], "").replace(".", " ").strip()
+        if len(clean_part) > 3:
+            episode_label = clean_part[:25]
+
+    language = detect_language(item['raw_input'])
+    current_time = current_time or utc_now()
+
+    file_obj = {
+        "file_id": item['file_id'],
+        "unique_code": str(uuid.uuid4())[:8],
+        "filename": item['file_name'],
+        "quality": quality,
+        "episode_label": episode_label,
+        "size": f"{item['file_size_mb']:.2f} MB",
+        "file_type": item['file_type'],
+        "source_chat_id": item.get('chat_id'),
+        "source_message_id": item.get('message_id'),
+        "added_at": current_time
+    }
 
-        if 'video' in msg:
-            video = msg['video']
-            file_id = video['file_id']
-            file_name = video.get('file_name', msg.get('caption', 'Unknown Video'))
-            file_size_mb = video.get('file_size', 0) / (1024 * 1024)
-            file_type = "video"
-        elif 'document' in msg:
-            doc = msg['document']
-            file_id = doc['file_id']
-            file_name = doc.get('file_name', 'Unknown Document')
-            file_size_mb = doc.get('file_size', 0) / (1024 * 1024)
-            file_type = "document"
-
-        if not file_id: return jsonify({'status': 'no_file'})
-
-        raw_caption = msg.get('caption')
-        raw_input = raw_caption if raw_caption else file_name
-        
-        search_title = clean_filename(raw_input) 
-        year_match = re.search(r'\b(19|20)\d{2}\b', raw_input)
-        search_year = year_match.group(0) if year_match else None
-        
-        content_type = "movie"
-        if re.search(r'(S\d+|Season|Episode|Ep\s*\d+|Combined|E\d+-E\d+)', file_name, re.IGNORECASE) or re.search(r'(S\d+|Season)', str(raw_caption), re.IGNORECASE):
-            content_type = "series"
+    new_movie = {
+        "tmdb_id": tmdb_data.get('tmdb_id'), # ID সেভ করা হচ্ছে
+        "title": final_title,
+        "title_key": normalize_title(final_title),
+        "overview": tmdb_data.get('overview'),
+        "poster": tmdb_data.get('poster'),
+        "backdrop": tmdb_data.get('backdrop'),
+        "release_date": tmdb_data.get('release_date'),
+        "vote_average": tmdb_data.get('vote_average'),
+        "genres": tmdb_data.get('genres'),
+        "runtime": tmdb_data.get('runtime'),
+        "trailer": tmdb_data.get('trailer'),
+        "cast": tmdb_data.get('cast'),
+        "language": language,
+        "type": item['content_type'],
+        "category": "Uncategorized",
+        "is_adult": is_adult,
+        "files": [file_obj],
+        "created_at": current_time,
+        "updated_at": current_time
+    }
+    if tmdb_data.get('enrich_pending'):
+        new_movie["needs_enrich"] = True
+    new_movie["episode_index"] = build_episode_index(new_movie["files"])
+
+    return {
+        "final_title": final_title,
+        "file_obj": file_obj,
+        "new_movie": new_movie,
+        "language": language,
+        "quality": quality,
+        "episode_label": episode_label,
+        "current_time": current_time,
+    }
 
-        tmdb_data = get_tmdb_details(search_title, content_type, search_year)
-        final_title = tmdb_data.get('title', search_title)
-        quality = get_file_quality(file_name)
-        
-        is_adult = tmdb_data.get('adult', False)
-        if not is_adult:
-            is_adult = is_adult_content(final_title)
-
-        episode_label = get_episode_label(file_name)
-        if content_type == "series" and not episode_label:
-            clean_part = file_name.replace(search_title, "").replace(".", " ").strip()
-            if len(clean_part) > 3:
-                episode_label = clean_part[:25]
-
-        language = detect_language(raw_input)
-        unique_code = str(uuid.uuid4())[:8]
-
-        current_time = datetime.now(datetime.UTC) if hasattr(datetime, 'UTC') else datetime.utcnow()
-
-        file_obj = {
-            "file_id": file_id,
-            "unique_code": unique_code,
-            "filename": file_name,
-            "quality": quality,
-            "episode_label": episode_label,
-            "size": f"{file_size_mb:.2f} MB",
-            "file_type": file_type,
-            "added_at": current_time
-        }
+# --- INGEST UPSERT (normalized title key) ---
+# (title_key, tmdb_id, type) তে ইউনিক ইনডেক্স; একটা find_one_and_update এ টাইটেল তৈরি/ফাইল যোগ দুটোই হয়।
+# ফাইল আগে থেকেই থাকলে ফিল্টার মেলে না, upsert ইনসার্ট করতে গিয়ে DuplicateKeyError পায় -> ডুপ্লিকেট।
+# type কী এর অংশ: একই নামের মুভি আর সিরিজের প্লেসহোল্ডার (tmdb_id null) আলাদা থাকতে পারে, আর TMDB এর
+# movie/tv আইডি একই সংখ্যা হলেও মেশে না।
+INGEST_INDEX_NAME = "ingest_key"
+INGEST_INDEX_KEYS = [("title_key", 1), ("tmdb_id", 1), ("type", 1)]
+ingest_key_unique = False   # ensure_ingest_index সফল হলে True; তার আগে ইনজেস্ট আলাদা করে ডুপ্লিকেট চেক করে
+
+def ingest_key(record):
+    """ TMDB আইডি পাওয়া গেলে (title_key, tmdb_id, type); TMDB ডাউন থাকলে (title_key, type) — একই টাইপের যেকোনো মিল """
+    key = {"title_key": record['new_movie']['title_key']}
+    if record['new_movie'].get('tmdb_id') is not None:
+        key["tmdb_id"] = record['new_movie']['tmdb_id']
+    key["type"] = record['new_movie']['type']
+    return key
+
+def ingest_upsert_allowed(key):
+    """
+    TMDB আইডি ছাড়া কী দিয়ে নতুন (প্লেসহোল্ডার) ডকুমেন্ট শুধু তখনই, যখন এই title_key আর টাইপের কোনো টাইটেল নেই।
+    থাকলে (আসল tmdb_id সহ হলেও) ফাইল সেখানেই যায়; ফিল্টার না মিললে ফাইলটা আগেই আছে।
+    ইউনিক ইনডেক্স এটা ধরে না, কারণ (key, None, type) আর (key, 123, type) আলাদা।
+    """
+    return "tmdb_id" in key or not movies.find_one(key, {"_id": 1})
+
+def ingest_update(record, new_id, file_objs=None):
+    """ file_objs: অ্যালবামের সব ফাইল একসাথে (না দিলে শুধু record এর ফাইল) """
+    on_insert = {k: v for k, v in record['new_movie'].items() if k not in ("files", "updated_at")}
+    on_insert["_id"] = new_id   # পোস্ট-ইমেজের _id মিলে গেলে বোঝা যায় ডকুমেন্টটা এইমাত্র তৈরি হলো
+    push = {"$each": file_objs} if file_objs else record['file_obj']
+    # $max: ব্যাকফিলের পুরনো পোস্ট টাইটেলের updated_at পিছিয়ে দেয় না (লিস্টিং ক্রম), কিন্তু ফাইল যোগ হলেই
+    # content_rev/revised_at বদলায়, যাতে ডিটেইল পেজের ETag আর কম্প্রেসড ক্যাশ পুরনো না থাকে
+    revision = content_revision(utc_now())
+    return {"$setOnInsert": on_insert, "$push": {"files": push}, "$inc": revision["$inc"],
+            "$max": {"updated_at": record['current_time'], **revision["$max"]}}
+
+INGEST_LOCK_TTL = 30      # লিজধারী মারা গেলে এর পর অন্যরা নিতে পারে
+INGEST_LOCK_WAIT = 10     # এর বেশি অপেক্ষা না করে ইউনিক ইনডেক্সের উপর ভরসা করে লেখা
+
+class KeyedLocks:
+    """ key প্রতি একটা threading.Lock; কেউ ধরে না থাকলে মুছে যায় """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.locks = {}
+
+    @contextlib.contextmanager
+    def hold(self, key):
+        with self.lock:
+            entry = self.locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]: yield
+        finally:
+            with self.lock:
+                entry[1] -= 1
+                if not entry[1]: del self.locks[key]
 
-        # ডেটাবেস চেক: মুভি আগে থেকেই আছে কি না (Auto Import বা আগের আপলোড)
-        existing_movie = movies.find_one({"title": final_title})
-        movie_id = None
-        should_notify = False
+title_locks = KeyedLocks()
 
-        if existing_movie:
-            is_duplicate = False
-            for f in existing_movie.get('files', []):
-                if f.get('file_id') == file_id:
-                    is_duplicate = True
-                    break
-            if not is_duplicate:
-                movies.update_one(
-                    {"_id": existing_movie['_id']},
-                    {"$push": {"files": file_obj}, "$set": {"updated_at": current_time}}
-                )
-                movie_id = existing_movie['_id']
-                should_notify = True
-        else:
-            should_notify = True
-            new_movie = {
-                "tmdb_id": tmdb_data.get('tmdb_id'), # ID সেভ করা হচ্ছে
-                "title": final_title,
-                "overview": tmdb_data.get('overview'),
-                "poster": tmdb_data.get('poster'),
-                "backdrop": tmdb_data.get('backdrop'),
-                "release_date": tmdb_data.get('release_date'),
-                "vote_average": tmdb_data.get('vote_average'),
-                "genres": tmdb_data.get('genres'),
-                "runtime": tmdb_data.get('runtime'),
-                "trailer": tmdb_data.get('trailer'),
-                "cast": tmdb_data.get('cast'),
-                "language": language,
-                "type": content_type,
-                "category": "Uncategorized",
-                "is_adult": is_adult,
-                "files": [file_obj],
-                "created_at": current_time,
-                "updated_at": current_time
-            }
-            res = movies.insert_one(new_movie)
-            movie_id = res.inserted_id
+@contextlib.contextmanager
+def title_creation_lock(title_key):
+    """
+    নতুন টাইটেল তৈরির সময় একই title_key এ একজনই: প্রসেসের ভিতরে থ্রেড লক, প্রসেস/ওয়ার্কারগুলোর মধ্যে
+    locks কালেকশনে স্বল্পমেয়াদি লিজ। পরে যে আসে সে লেখার আগে তৈরি হওয়া ডকুমেন্টটাই পায়।
+    """
+    with title_locks.hold(title_key):
+        lease = MongoLease(f"ingest:{title_key}", ttl=INGEST_LOCK_TTL)
+        deadline = time.monotonic() + INGEST_LOCK_WAIT
+        while not lease.acquire():
+            if time.monotonic() >= deadline:
+                print(f"⚠️ Ingest lock wait timed out for {title_key!r}")
+                break
+            time.sleep(0.1)
+        try:
+            yield
+        finally:
+            lease.release()
 
-        if movie_id and WEBSITE_URL:
-            direct_link = f"{WEBSITE_URL.rstrip('/')}/movie/{str(movie_id)}"
-            home_link = WEBSITE_URL.rstrip('/')
-            
-            edit_payload = {
-                'chat_id': chat_id,
-                'message_id': msg['message_id'],
-                'reply_markup': json.dumps({
-                    "inline_keyboard": [[{"text": "▶️ Check on Website", "url": direct_link}]]
-                })
-            }
-            try: requests.post(f"{TELEGRAM_API_URL}/editMessageReplyMarkup", json=edit_payload)
-            except: pass
+def adopt_placeholder(update):
+    """ ইনজেস্ট আপডেটের $setOnInsert এর TMDB মেটাডেটা প্লেসহোল্ডারে $set হিসেবে """
+    on_insert = update["$setOnInsert"]
+    fields = {k: on_insert[k] for k in ("title", *TMDB_REFRESH_FIELDS) if k in on_insert}
+    rest = {op: value for op, value in update.items() if op != "$setOnInsert"}
+    return {**rest, "$set": fields, "$unset": {"needs_enrich": ""}}
 
-            current_movie = movies.find_one({"_id": movie_id})
-            last_notified = current_movie.get("last_notified")
-            
-            is_spamming = False
-            if last_notified:
-                now = datetime.now(datetime.UTC) if hasattr(datetime, 'UTC') else datetime.utcnow()
-                if hasattr(datetime, 'UTC') and last_notified.tzinfo is None:
-                    last_notified = last_notified.replace(tzinfo=datetime.UTC)
-                
-                time_diff = (now - last_notified).total_seconds()
-                if time_diff < NOTIFICATION_COOLDOWN:
-                    is_spamming = True
+class IngestConflict(Exception):
+    """ টাইটেল তৈরি ইউনিক ইনডেক্সে আটকে গেল অথচ ফাইলটা ডেটাবেসে নেই (ডুপ্লিকেট নয়, ফাইল হারাত) """
 
-            if PUBLIC_CHANNEL_ID and should_notify and tmdb_data.get('poster') and not is_spamming:
-                notify_caption = f"🎬 *{escape_markdown(final_title)}*\n"
-                if episode_label: notify_caption += f"📌 {escape_markdown(episode_label)}\n"
-                
-                notify_caption += f"\n⭐ Rating: {tmdb_data.get('vote_average', 'N/A')}\n"
-                notify_caption += f"📅 Year: {(tmdb_data.get('release_date') or 'N/A')[:4]}\n"
-                notify_caption += f"🔊 Language: {language}\n"
-                notify_caption += f"💿 Quality: {quality}\n"
-                notify_caption += f"📦 Size: {file_size_mb:.2f} MB\n\n"
-                notify_caption += f"🔗 *Download Now:* [Click Here]({home_link})"
+def ingest_write(key, file_ids, update_for):
+    """
+    update_for(new_id) -> আপডেট। টাইটেল আগে থেকে থাকলে (সাধারণ ক্ষেত্র) লক ছাড়াই ফাইল যোগ;
+    না মিললে টাইটেল লক নিয়ে upsert। রিটার্ন: (পোস্ট-ইমেজ, নতুন টাইটেল কি না); ফাইল আগেই থাকলে (None, False)।
+    দুবার DuplicateKeyError অথচ ফাইল কোথাও নেই হলে IngestConflict, যাতে "duplicate" বলে ফাইলটা চুপচাপ না হারায়।
+    """
+    query = {**key, "files.file_id": {"$nin": file_ids}}
+    movie = movies.find_one_and_update(query, update_for(ObjectId()), return_document=ReturnDocument.AFTER)
+    if movie: return movie, False
+    error = None
+    with title_creation_lock(key["title_key"]):
+        # দ্বিতীয় চেষ্টা: একই সময়ে অন্য আপলোড টাইটেলটা তৈরি করে ফেললে এবার সেটাতেই ফাইল যোগ হবে
+        for _ in range(2):
+            if not ingest_upsert_allowed(key):
+                # টাইটেল আছে (এর মধ্যে অন্য কেউ তৈরি করে থাকতে পারে): শুধু ফাইল যোগ, না মিললে ফাইলটা আগেই আছে
+                movie = movies.find_one_and_update(query, update_for(ObjectId()), return_document=ReturnDocument.AFTER)
+                return movie, False
+            placeholder = {"title_key": key["title_key"], "type": key["type"], "tmdb_id": None}
+            if "tmdb_id" in key and movies.find_one(placeholder, {"_id": 1}) and not movies.find_one(key, {"_id": 1}):
+                # TMDB ফেরার পর প্রথম আপলোড: আলাদা ডকুমেন্ট না বানিয়ে প্লেসহোল্ডারটাই আসল টাইটেল হয়ে যায়
+                movie = movies.find_one_and_update({**placeholder, "files.file_id": {"$nin": file_ids}},
+                                                   adopt_placeholder(update_for(ObjectId())), return_document=ReturnDocument.AFTER)
+                return movie, False
+            new_id = ObjectId()
+            try:
+                movie = movies.find_one_and_update(query, update_for(new_id), upsert=True, return_document=ReturnDocument.AFTER)
+                return movie, movie["_id"] == new_id
+            except DuplicateKeyError as e:
+                error = e
+    if movies.find_one({"title_key": key["title_key"], "files.file_id": {"$in": file_ids}}, {"_id": 1}):
+        return None, False
+    print(f"⚠️ Ingest conflict for {key}: {error}")
+    raise IngestConflict(f"{key}: {error}")
+
+def upsert_ingest(record):
+    """ রিটার্ন: (পোস্ট-ইমেজ, নতুন টাইটেল কি না); ফাইলটা আগেই থাকলে (None, False) """
+    key = ingest_key(record)
+    file_id = record['file_obj']['file_id']
+    if not ingest_key_unique and movies.find_one({**key, "files.file_id": file_id}, {"_id": 1}):
+        return None, False
+    return ingest_write(key, [file_id], lambda new_id: ingest_update(record, new_id))
+
+def upsert_ingest_group(records):
+    """
+    একই টাইটেলের কয়েকটা ফাইল এক find_one_and_update এ ($push $each)।
+    আগে থেকে থাকা ফাইল বাদ দিয়ে বাকিগুলো লেখা হয়; রিটার্ন upsert_ingest এর মতো, সাথে লেখা রেকর্ডগুলো
+    """
+    key = ingest_key(records[0])
+    # আবার চেষ্টা: এর মধ্যে অন্য আপলোড কোনো ফাইল যোগ করে ফেললে $nin ফিল্টার মেলে না
+    for _ in range(2):
+        existing = movies.find_one({**key, "files.file_id": {"$in": [r['file_obj']['file_id'] for r in records]}}, {"files.file_id": 1})
+        known = {f.get('file_id') for f in (existing or {}).get('files', [])}
+        fresh = [r for r in records if r['file_obj']['file_id'] not in known]
+        if not fresh: return None, False, []
+        movie, is_new = ingest_write(key, [r['file_obj']['file_id'] for r in fresh],
+                                     lambda new_id: ingest_update(fresh[0], new_id, [r['file_obj'] for r in fresh]))
+        if movie: return movie, is_new, fresh
+    return None, False, []
+
+def ensure_ingest_index(batch_size=500):
+    """ পুরনো ডকুমেন্টে title_key বসায়, তারপর ইউনিক ইনডেক্স তৈরি করে (ডুপ্লিকেট থাকলে /admin/cleanup লাগবে) """
+    global ingest_key_unique
+    ops = []
+    for doc in movies.find({"title_key": {"$exists": False}}, {"title": 1}):
+        ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"title_key": normalize_title(doc.get("title"))}}))
+        if len(ops) >= batch_size:
+            movies.bulk_write(ops, ordered=False)
+            ops = []
+    if ops: movies.bulk_write(ops, ordered=False)
+    try:
+        current = movies.index_information().get(INGEST_INDEX_NAME)
+        if current and [tuple(k) for k in current["key"]] != INGEST_INDEX_KEYS:
+            # পুরনো (title_key, tmdb_id) ইনডেক্স: একই নামের মুভি আর সিরিজ প্লেসহোল্ডার একসাথে থাকতে দিত না
+            ingest_key_unique = False
+            movies.drop_index(INGEST_INDEX_NAME)
+        movies.create_index(INGEST_INDEX_KEYS, unique=True, name=INGEST_INDEX_NAME)
+        ingest_key_unique = True
+    except OperationFailure as e:
+        ingest_key_unique = False
+        print(f"⚠️ Ingest key index not created (duplicate titles?), run /admin/cleanup: {e}")
+    return ingest_key_unique
+
+def watch_ingest_index(interval=60):
+    """ ইনডেক্স তৈরি করে লিজধারী প্রসেস; বাকি প্রসেস সেটা দেখা পর্যন্ত আলাদা ডুপ্লিকেট চেক চালিয়ে যায় """
+    global ingest_key_unique
+    while not ingest_key_unique:
+        try:
+            ingest_key_unique = bool(movies.index_information().get(INGEST_INDEX_NAME, {}).get("unique"))
+        except Exception as e:
+            print(f"Ingest Index Check Error: {e}")
+        if not ingest_key_unique: time.sleep(interval)
+
+def website_links(movie_id):
+    home_link = WEBSITE_URL.rstrip('/')
+    return f"{home_link}/movie/{str(movie_id)}", home_link
+
+def build_reply_markup_edit(item, direct_link):
+    return {
+        'chat_id': item['chat_id'],
+        'message_id': item['message_id'],
+        'reply_markup': json.dumps({
+            "inline_keyboard": [[{"text": "▶️ Check on Website", "url": direct_link}]]
+        })
+    }
 
-                pub_keyboard = [
-                    [{"text": "📥 Download / Watch Online", "url": home_link}],
-                    [{"text": "📢 Join Our Channel", "url": MY_CHANNEL_LINK}]
-                ]
+def in_notification_cooldown(last_notified):
+    if not last_notified: return False
+    now = utc_now()
+    if hasattr(datetime, 'UTC') and last_notified.tzinfo is None:
+        last_notified = last_notified.replace(tzinfo=datetime.UTC)
+    return (now - last_notified).total_seconds() < NOTIFICATION_COOLDOWN
+
+def build_notify_payload(record, tmdb_data, item, home_link):
+    """ পাবলিক চ্যানেলে নতুন আপলোডের পোস্টার নোটিফিকেশন """
+    notify_caption = f"🎬 *{escape_markdown(record['final_title'])}*\n"
+    if record['episode_label']: notify_caption += f"📌 {escape_markdown(record['episode_label'])}\n"
+    
+    notify_caption += f"\n⭐ Rating: {tmdb_data.get('vote_average', 'N/A')}\n"
+    notify_caption += f"📅 Year: {(tmdb_data.get('release_date') or 'N/A')[:4]}\n"
+    notify_caption += f"🔊 Language: {record['language']}\n"
+    notify_caption += f"💿 Quality: {record['quality']}\n"
+    notify_caption += f"📦 Size: {item['file_size_mb']:.2f} MB\n\n"
+    notify_caption += f"🔗 *Download Now:* [Click Here]({home_link})"
+
+    pub_keyboard = [
+        [{"text": "📥 Download / Watch Online", "url": home_link}],
+        [{"text": "📢 Join Our Channel", "url": MY_CHANNEL_LINK}]
+    ]
 
-                notify_payload = {
-                    'chat_id': PUBLIC_CHANNEL_ID,
-                    'parse_mode': 'Markdown',
-                    'reply_markup': json.dumps({"inline_keyboard": pub_keyboard}),
-                    'photo': tmdb_data.get('poster'),
-                    'caption': notify_caption
-                }
+    return {
+        'chat_id': PUBLIC_CHANNEL_ID,
+        'parse_mode': 'Markdown',
+        'reply_markup': json.dumps({"inline_keyboard": pub_keyboard}),
+        'photo': tmdb_image(tmdb_data.get('poster')),
+        'caption': notify_caption
+    }
 
-                try: 
-                    resp = requests.post(f"{TELEGRAM_API_URL}/sendPhoto", json=notify_payload)
-                    if resp.json().get('ok'):
-                        now_utc = datetime.now(datetime.UTC) if hasattr(datetime, 'UTC') else datetime.utcnow()
-                        movies.update_one({"_id": movie_id}, {"$set": {"last_notified": now_utc}})
-                except: pass
+EXPORT_FILE_PREFIX = "export:"   # Telegram Desktop এক্সপোর্ট থেকে আসা ফাইল (file_id নেই), backfill.py দেখুন
 
-        return jsonify({'status': 'success'})
+def build_file_delivery(movie, target_file, chat_id):
+    """ /start কোড দিয়ে ফাইল পাঠানোর জন্য (method, payload) """
+    caption = f"🎬 *{escape_markdown(movie['title'])}*\n"
+    if target_file.get('episode_label'):
+        caption += f"📌 {escape_markdown(target_file['episode_label'])}\n"
+    caption += f"💿 Quality: {target_file['quality']}\n"
+    caption += f"📦 Size: {target_file['size']}\n\n"
+    caption += f"⚠️ *File will be deleted in 10 minutes! Forward it now!*"
+    
+    file_keyboard = {
+        "inline_keyboard": [
+            [{"text": "📢 Join Update Channel", "url": MY_CHANNEL_LINK}]
+        ]
+    }
 
-    elif 'message' in update:
-        msg = update['message']
-        chat_id = msg.get('chat', {}).get('id')
-        text = msg.get('text', '')
-
-        if text.startswith('/start'):
-            parts = text.split()
-            if len(parts) > 1:
-                code = parts[1]
-                movie = movies.find_one({"files.unique_code": code})
-                if movie:
-                    target_file = next((f for f in movie['files'] if f['unique_code'] == code), None)
-                    if target_file:
-                        caption = f"🎬 *{escape_markdown(movie['title'])}*\n"
-                        if target_file.get('episode_label'):
-                            caption += f"📌 {escape_markdown(target_file['episode_label'])}\n"
-                        caption += f"💿 Quality: {target_file['quality']}\n"
-                        caption += f"📦 Size: {target_file['size']}\n\n"
-                        caption += f"⚠️ *File will be deleted in 10 minutes! Forward it now!*"
-                        
-                        file_keyboard = {
-                            "inline_keyboard": [
-                                [{"text": "📢 Join Update Channel", "url": MY_CHANNEL_LINK}]
-                            ]
-                        }
-
-                        payload = {
-                            'chat_id': chat_id, 
-                            'caption': caption, 
-                            'parse_mode': 'Markdown',
-                            'reply_markup': json.dumps(file_keyboard)
-                        }
-                        
-                        method = 'sendVideo' if target_file['file_type'] == 'video' else 'sendDocument'
-                        if target_file['file_type'] == 'video': payload['video'] = target_file['file_id']
-                        else: payload['document'] = target_file['file_id']
+    payload = {
+        'chat_id': chat_id, 
+        'caption': caption, 
+        'parse_mode': 'Markdown',
+        'reply_markup': json.dumps(file_keyboard)
+    }
+    
+    if target_file['file_id'].startswith(EXPORT_FILE_PREFIX):
+        # এক্সপোর্টে file_id থাকে না; সোর্স চ্যানেলের মূল মেসেজটাই কপি করে পাঠানো হয়
+        payload.update({'from_chat_id': target_file['source_chat_id'], 'message_id': target_file['source_message_id']})
+        return 'copyMessage', payload
+
+    method = 'sendVideo' if target_file['file_type'] == 'video' else 'sendDocument'
+    if target_file['file_type'] == 'video': payload['video'] = target_file['file_id']
+    else: payload['document'] = target_file['file_id']
+    return method, payload
+
+def welcome_payload(chat_id):
+    welcome_kb = {
+        "inline_keyboard": [[{"text": "📢 Join Our Channel", "url": MY_CHANNEL_LINK}]]
+    }
+    return {
+        'chat_id': chat_id, 
+        'text': "👋 Welcome! Use the website to download movies.",
+        'reply_markup': json.dumps(welcome_kb)
+    }
+
+
+# === TELEGRAM WEBHOOK ===
+def summarize_records(records, items):
+    """ কয়েকটা ফাইলের (অ্যালবাম) নোটিফিকেশনের জন্য একটা record/item: কোয়ালিটি আর এপিসোড একসাথে, সাইজ যোগফল """
+    if len(records) == 1: return records[0], items[0]
+    labels = [r['episode_label'] for r in records if r['episode_label']]
+    record = {**records[0], 'quality': ", ".join(dict.fromkeys(r['quality'] for r in records)),
+              'episode_label': (f"{labels[0]} – {labels[-1]}" if len(labels) > 1 else labels[0] if labels else None)}
+    item = {**items[0], 'file_size_mb': sum(i['file_size_mb'] for i in items)}
+    return record, item
+
+def publish_ingest(movie, is_new, records, items, tmdb_data):
+    """ ইনজেস্ট লেখার পরের কাজ: ইনডেক্স, ফিড, চ্যানেল বাটন এবং একটাই পাবলিক নোটিফিকেশন """
+    movie_id = movie['_id']
+    refresh_episode_index(movie_id, movie.get('files'))
+    touch_home_feed(movie, is_new=is_new)
+    if is_new: suggest_index.upsert(movie)
+
+    if WEBSITE_URL:
+        direct_link, home_link = website_links(movie_id)
+        # অ্যালবামে শুধু প্রথম মেসেজে বাটন
+        try: tg_post("editMessageReplyMarkup", build_reply_markup_edit(items[0], direct_link))
+        except: pass
+
+        is_spamming = in_notification_cooldown(movie.get("last_notified"))
+
+        if PUBLIC_CHANNEL_ID and tmdb_data.get('poster') and not is_spamming:
+            record, item = summarize_records(records, items)
+            try: 
+                resp = tg_post("sendPhoto", build_notify_payload(record, tmdb_data, item, home_link))
+                if resp.json().get('ok'):
+                    movies.update_one({"_id": movie_id}, {"$set": {"last_notified": utc_now()}})
+            except: pass
+
+def handle_channel_post(msg):
+    chat_id = str(msg.get('chat', {}).get('id'))
+    if SOURCE_CHANNEL_ID and chat_id != str(SOURCE_CHANNEL_ID):
+        return {'status': 'wrong_channel'}
+
+    item = parse_channel_post(msg)
+    if not item: return {'status': 'no_file'}
+    if msg.get('media_group_id') and MEDIA_GROUP_WINDOW > 0:
+        return buffer_media_group(msg)
+
+    tmdb_data = get_tmdb_details(item['search_title'], item['content_type'], item['search_year'])
+    record = build_ingest_record(item, tmdb_data)
+
+    # এক রাউন্ড ট্রিপ: টাইটেল না থাকলে তৈরি, থাকলে ফাইল যোগ (Auto Import বা আগের আপলোড)
+    movie, is_new = upsert_ingest(record)
+    if not movie: return {'status': 'duplicate'}
+    publish_ingest(movie, is_new, [record], [item], tmdb_data)
+    return {'status': 'success'}
+
+# --- MEDIA GROUP (ALBUM) INGEST ---
+# অ্যালবামের প্রতিটা আইটেম আলাদা channel_post হয়ে আসে (একই media_group_id), হয়তো আলাদা ওয়ার্কারে।
+# পোস্টগুলো Mongo তে media_groups ডকুমেন্টে জমা হয়; যে রিকোয়েস্ট ডকুমেন্টটা তৈরি করেছে সে-ই মালিক,
+# শেষ আইটেমের পর MEDIA_GROUP_WINDOW সেকেন্ড চুপ থাকলে ডকুমেন্টটা তুলে নিয়ে একবারে ইনজেস্ট করে।
+# মালিক প্রসেস মাঝপথে মারা গেলে সিঙ্গেলটন সুইপার MEDIA_GROUP_STALE পর বাকি গ্রুপগুলো শেষ করে।
+MEDIA_GROUP_WINDOW = float(os.getenv("MEDIA_GROUP_WINDOW", 2))
+MEDIA_GROUP_STALE = 60
+MEDIA_GROUP_MAX_WAIT = 30    # আইটেম আসতেই থাকলেও এর পর মালিক আর অপেক্ষা করে না
+
+def buffer_media_group(msg):
+    group_id = f"{msg.get('chat', {}).get('id')}:{msg['media_group_id']}"
+    now = utc_now()
+    result = media_groups.update_one({"_id": group_id},
+                                     {"$push": {"posts": msg}, "$set": {"last_at": now}, "$setOnInsert": {"first_at": now}},
+                                     upsert=True)
+    if result.upserted_id is not None:
+        threading.Thread(target=flush_media_group_later, args=(group_id,), daemon=True).start()
+    return {'status': 'buffered'}
+
+def claim_media_group(group_id, quiet_for, force=False):
+    """ গ্রুপটা এক প্রসেসই পায় (find_one_and_delete); অন্য কেউ নিয়ে নিলে None """
+    query = {"_id": group_id}
+    if not force: query["last_at"] = {"$lte": utc_now() - timedelta(seconds=quiet_for)}
+    return media_groups.find_one_and_delete(query)
+
+def flush_media_group_later(group_id):
+    waited = 0
+    try:
+        while True:
+            time.sleep(MEDIA_GROUP_WINDOW)
+            waited += MEDIA_GROUP_WINDOW
+            group = claim_media_group(group_id, MEDIA_GROUP_WINDOW, force=waited >= MEDIA_GROUP_MAX_WAIT)
+            if group: return ingest_media_group(group['posts'])
+            if not media_groups.find_one({"_id": group_id}, {"_id": 1}): return
+    except Exception as e:
+        print(f"Media Group Ingest Error ({group_id}): {e}")
+
+def media_group_titles(items):
+    """
+    অ্যালবামে সাধারণত শুধু প্রথম আইটেমে ক্যাপশন থাকে; থাকলে সব ফাইল সেই টাইটেলের (একটাই TMDB লুকআপ)।
+    ক্যাপশন না থাকলে ফাইলনেম থেকে পাওয়া (টাইটেল, টাইপ, সাল) অনুযায়ী ভাগ।
+    """
+    lead = next((i for i in items if i['raw_caption']), None)
+    if lead:
+        content_type = "series" if any(i['content_type'] == "series" for i in items) else lead['content_type']
+        items = [{**i, 'search_title': lead['search_title'], 'search_year': lead['search_year'], 'content_type': content_type}
+                 for i in items]
+    groups = {}
+    for item in items:
+        groups.setdefault((item['search_title'], item['content_type'], item['search_year']), []).append(item)
+    return groups
+
+def ingest_media_group(posts):
+    items, seen = [], set()
+    for post in sorted(posts, key=lambda p: p.get('message_id') or 0):
+        item = parse_channel_post(post)
+        if item and item['file_id'] not in seen:
+            seen.add(item['file_id'])
+            items.append(item)
+
+    results = []
+    for lookup, group_items in media_group_titles(items).items():
+        tmdb_data = get_tmdb_details(*lookup)
+        current_time = utc_now()
+        records = [build_ingest_record(item, tmdb_data, current_time) for item in group_items]
+        try:
+            movie, is_new, written = upsert_ingest_group(records)
+        except IngestConflict:
+            # লগ হয়ে গেছে; বাকি টাইটেলগুলো তবুও ইনজেস্ট হোক
+            results.append('conflict')
+            continue
+        if not movie:
+            results.append('duplicate')
+            continue
+        written_ids = {r['file_obj']['file_id'] for r in written}
+        publish_ingest(movie, is_new, written, [i for i in group_items if i['file_id'] in written_ids], tmdb_data)
+        results.append('success')
+    return results
+
+def start_media_group_sweeper():
+    """ মালিক প্রসেস রিস্টার্ট/ক্র্যাশ হলে আটকে থাকা অ্যালবাম """
+    media_groups.create_index("last_at")
+    while True:
+        time.sleep(MEDIA_GROUP_STALE)
+        try:
+            if not singleton_active(): continue
+            cutoff = utc_now() - timedelta(seconds=MEDIA_GROUP_STALE)
+            for group in media_groups.find({"last_at": {"$lte": cutoff}}, {"_id": 1}):
+                claimed = claim_media_group(group["_id"], MEDIA_GROUP_STALE)
+                if claimed: ingest_media_group(claimed['posts'])
+        except Exception as e:
+            print(f"Media Group Sweep Error: {e}")
+
+def handle_private_message(msg):
+    chat_id = msg.get('chat', {}).get('id')
+    text = msg.get('text', '')
+    reply = None
+
+    if text.startswith('/start'):
+        parts = text.split()
+        if len(parts) > 1:
+            code = parts[1]
+            movie = movies.find_one({"files.unique_code": code})
+            if movie:
+                target_file = next((f for f in movie['files'] if f['unique_code'] == code), None)
+                if target_file:
+                    method, payload = build_file_delivery(movie, target_file, chat_id)
+                    try:
+                        response = tg_post(method, payload)
+                        resp_data = response.json()
                         
-                        try:
-                            response = requests.post(f"{TELEGRAM_API_URL}/{method}", json=payload)
-                            resp_data = response.json()
-                            
-                            if resp_data.get('ok'):
-                                sent_msg_id = resp_data['result']['message_id']
-                                threading.Thread(target=delete_message_later, args=(chat_id, sent_msg_id, DELETE_TIMEOUT)).start()
-                        except Exception as e:
-                            print(f"Error sending file: {e}")
-                    else:
-                        requests.post(f"{TELEGRAM_API_URL}/sendMessage", json={'chat_id': chat_id, 'text': "❌ File expired or removed."})
+                        if resp_data.get('ok'):
+                            counters.download(movie['_id'])
+                            sent_msg_id = resp_data['result']['message_id']
+                            threading.Thread(target=delete_message_later, args=(chat_id, sent_msg_id, DELETE_TIMEOUT)).start()
+                        elif method != 'copyMessage' and classify_file_response(response.status_code, resp_data)[0] == 'broken':
+                            mark_file_broken(movie['_id'], target_file['file_id'], resp_data.get('description'))
+                    except Exception as e:
+                        print(f"Error sending file: {e}")
                 else:
-                    requests.post(f"{TELEGRAM_API_URL}/sendMessage", json={'chat_id': chat_id, 'text': "❌ Invalid Link."})
+                    reply = {'chat_id': chat_id, 'text': "❌ File expired or removed."}
             else:
-                welcome_kb = {
-                    "inline_keyboard": [[{"text": "📢 Join Our Channel", "url": MY_CHANNEL_LINK}]]
-                }
-                requests.post(f"{TELEGRAM_API_URL}/sendMessage", json={
-                    'chat_id': chat_id, 
-                    'text': "👋 Welcome! Use the website to download movies.",
-                    'reply_markup': json.dumps(welcome_kb)
-                })
+                reply = {'chat_id': chat_id, 'text': "❌ Invalid Link."}
+        else:
+            reply = welcome_payload(chat_id)
 
-    return jsonify({'status': 'ok'})
+    if reply:
+        # ব্রেকার খোলা (CircuitOpenError) বা নেটওয়ার্ক সমস্যা: আপডেট ব্যর্থ হলে Telegram বারবার পাঠাত
+        try:
+            tg_post("sendMessage", reply)
+        except Exception as e:
+            print(f"Error sending reply: {e}")
+    return {'status': 'ok'}
+
+def process_update(update):
+    """ একটি টেলিগ্রাম আপডেট প্রসেস করে স্ট্যাটাস dict রিটার্ন করে """
+    if 'channel_post' in update:
+        return handle_channel_post(update['channel_post'])
+    elif 'message' in update:
+        return handle_private_message(update['message'])
+    return {'status': 'ok'}
+
+# রুটটা create_app() এ যোগ হয়, শুধু BOT_TOKEN থাকলে (নাহলে /webhook/None খোলা থাকত)
+def telegram_webhook():
+    update = request.get_json()
+    if not update: return jsonify({'status': 'ignored'})
+    return jsonify(process_update(update))
+
+# ================================
+#        STATIC ASSET PIPELINE
+# ================================
+# assets/ ফোল্ডারের CSS/JS কনটেন্ট-হ্যাশ নাম দিয়ে /assets/<name>.<hash>.<ext> এ সার্ভ হয়।
+# ফাইল বদলালে হ্যাশ বদলায়, তাই ব্রাউজার/CDN এক বছর immutable ক্যাশ রাখতে পারে।
+ASSET_SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assets')
+ASSET_DIST_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'dist')
+ASSET_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+asset_manifest = {}   # 'home.css' -> 'home.3f9a1c2b7d4e.css'
+asset_store = {}      # 'home.3f9a1c2b7d4e.css' -> {'identity': bytes, 'gzip': bytes, 'br': bytes}
+
+def build_assets(write=False):
+    """ সব অ্যাসেট হ্যাশ করে মেমরিতে রাখে (gzip/brotli প্রি-কম্প্রেসড সহ); write=True হলে static/dist এ লিখে """
+    manifest, store = {}, {}
+    for name in sorted(os.listdir(ASSET_SRC_DIR)) if os.path.isdir(ASSET_SRC_DIR) else []:
+        with open(os.path.join(ASSET_SRC_DIR, name), 'rb') as fh:
+            data = fh.read()
+        base, ext = os.path.splitext(name)
+        hashed = f"{base}.{hashlib.sha256(data).hexdigest()[:12]}{ext}"
+        variants = {'identity': data, 'gzip': gzip.compress(data, compresslevel=9, mtime=0)}
+        if brotli:
+            variants['br'] = brotli.compress(data, quality=11)
+        manifest[name] = hashed
+        store[hashed] = variants
+
+    if write:
+        os.makedirs(ASSET_DIST_DIR, exist_ok=True)
+        suffix = {'identity': '', 'gzip': '.gz', 'br': '.br'}
+        for hashed, variants in store.items():
+            for encoding, payload in variants.items():
+                with open(os.path.join(ASSET_DIST_DIR, hashed + suffix[encoding]), 'wb') as fh:
+                    fh.write(payload)
+        with open(os.path.join(ASSET_DIST_DIR, 'manifest.json'), 'w') as fh:
+            json.dump(manifest, fh, indent=2, sort_keys=True)
+
+    asset_manifest.clear(); asset_manifest.update(manifest)
+    asset_store.clear(); asset_store.update(store)
+    return manifest
+
+def asset_url(name):
+    return f"/assets/{asset_manifest.get(name, name)}"
+
+def pick_encoding(accept_encoding, available):
+    """ Accept-Encoding থেকে সবচেয়ে ভালো এনকোডিং (br > gzip > identity) """
+    accept_encoding = (accept_encoding or '').lower()
+    offered = {}
+    for part in accept_encoding.split(','):
+        token, _, params = part.strip().partition(';')
+        q = 1.0
+        if params.strip().startswith('q='):
+            try: q = float(params.strip()[2:])
+            except ValueError: q = 0.0
+        if token: offered[token.strip()] = q
+    for encoding in ('br', 'gzip'):
+        if encoding in available and offered.get(encoding, offered.get('*', 0)) > 0:
+            return encoding
+    return 'identity'
+
+build_assets()
+
+@app.route('/assets/<filename>')
+def serve_asset(filename):
+    variants = asset_store.get(filename)
+    if not variants: abort(404)
+    encoding = pick_encoding(request.headers.get('Accept-Encoding'), variants)
+    etag = filename.rsplit('.', 2)[-2]
+    headers = {
+        'Cache-Control': ASSET_CACHE_CONTROL,
+        'ETag': quote_etag(etag),
+        'Vary': 'Accept-Encoding',
+    }
+    if parse_etags(request.headers.get('If-None-Match')).contains(etag):
+        return Response(status=304, headers=headers)
+    if encoding != 'identity':
+        headers['Content-Encoding'] = encoding
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    return Response(variants[encoding], mimetype=mimetype, headers=headers)
+
+# --- RESPONSE COMPRESSION (brotli / gzip) ---
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", 512))
+COMPRESS_CACHE_BYTES = int(os.getenv("COMPRESS_CACHE_BYTES", 16 * 1024 * 1024))
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5   # ডায়নামিক পেজের জন্য স্পিড/রেশিও ব্যালান্স
+COMPRESSIBLE_TYPES = ('text/html', 'text/plain', 'text/css', 'application/json', 'application/javascript', 'text/javascript')
+
+class CompressionStats:
+    """ কম্প্রেশন রেশিও এবং CPU টাইম এর হিসাব (এডমিন স্ট্যাটসে দেখায়) """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.data = {}
+
+    def record(self, encoding, bytes_in, bytes_out, cpu_seconds, cache_hit=False):
+        with self.lock:
+            row = self.data.setdefault(encoding, {"responses": 0, "cache_hits": 0, "bytes_in": 0, "bytes_out": 0, "cpu_seconds": 0.0})
+            row["responses"] += 1
+            row["bytes_in"] += bytes_in
+            row["bytes_out"] += bytes_out
+            row["cpu_seconds"] += cpu_seconds
+            if cache_hit: row["cache_hits"] += 1
+
+    def snapshot(self):
+        with self.lock:
+            out = {}
+            for encoding, row in self.data.items():
+                row = dict(row)
+                row["ratio"] = round(row["bytes_in"] / row["bytes_out"], 2) if row["bytes_out"] else None
+                row["cpu_ms_per_response"] = round(1000 * row["cpu_seconds"] / max(row["responses"] - row["cache_hits"], 1), 3)
+                row["cpu_seconds"] = round(row["cpu_seconds"], 4)
+                out[encoding] = row
+            return out
+
+class CompressedCache:
+    """ ETag-ওয়ালা রেসপন্সের কম্প্রেসড বাইট LRU ক্যাশ, যাতে একই পেজ বারবার কম্প্রেস করতে না হয় """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            value = self.items.get(key)
+            if value is not None:
+                self.items.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        if len(value) > self.max_bytes // 4: return
+        with self.lock:
+            old = self.items.pop(key, None)
+            if old is not None: self.size -= len(old)
+            self.items[key] = value
+            self.size += len(value)
+            while self.size > self.max_bytes and self.items:
+                _, evicted = self.items.popitem(last=False)
+                self.size -= len(evicted)
+
+compression_stats = CompressionStats()
+compressed_cache = CompressedCache(COMPRESS_CACHE_BYTES)
+
+def compress_bytes(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+def make_compressor(encoding):
+    """ স্ট্রিমিং কম্প্রেসর: (compress(chunk), flush()) """
+    if encoding == 'br':
+        c = brotli.Compressor(quality=BROTLI_QUALITY)
+        return c.process, c.finish
+    c = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+    return c.compress, c.flush
+
+def compress_stream(chunks, encoding):
+    compress, flush = make_compressor(encoding)
+    bytes_in = bytes_out = 0
+    cpu = 0.0
+    for chunk in chunks:
+        if isinstance(chunk, str): chunk = chunk.encode('utf-8')
+        bytes_in += len(chunk)
+        started = time.thread_time()
+        out = compress(chunk)
+        cpu += time.thread_time() - started
+        if out:
+            bytes_out += len(out)
+            yield out
+    started = time.thread_time()
+    out = flush()
+    cpu += time.thread_time() - started
+    bytes_out += len(out)
+    compression_stats.record(encoding, bytes_in, bytes_out, cpu)
+    if out: yield out
+
+def compress_cached(body, encoding, etag=None):
+    """
+    বডি কম্প্রেস করে; ETag থাকলে (ক্যাশযোগ্য পেজ) কম্প্রেসড বাইট ক্যাশে রাখে। কী বডির হ্যাশ, ETag নয়:
+    একই ETag এ আলাদা বডি হতে পারে (stealth/এডমিন ভ্যারিয়েন্ট, ETag এ না থাকা পরিবর্তন)
+    """
+    key = (hashlib.blake2b(body, digest_size=16).digest(), encoding) if etag else None
+    if key:
+        hit = compressed_cache.get(key)
+        if hit is not None:
+            compression_stats.record(encoding, len(body), len(hit), 0.0, cache_hit=True)
+            return hit
+    started = time.thread_time()
+    out = compress_bytes(body, encoding)
+    compression_stats.record(encoding, len(body), len(out), time.thread_time() - started)
+    if key: compressed_cache.put(key, out)
+    return out
+
+def is_compressible(mimetype):
+    return bool(mimetype) and mimetype.split(';')[0].strip() in COMPRESSIBLE_TYPES
+
+def merge_vary(current, value):
+    parts = [p.strip() for p in (current or '').split(',') if p.strip()]
+    if value.lower() not in [p.lower() for p in parts]: parts.append(value)
+    return ', '.join(parts)
+
+@app.after_request
+def compress_response(response):
+    if response.status_code != 200 or 'Content-Encoding' in response.headers:
+        return response
+    if response.direct_passthrough or not is_compressible(response.mimetype):
+        return response
+    response.headers['Vary'] = merge_vary(response.headers.get('Vary'), 'Accept-Encoding')
+    encoding = pick_encoding(request.headers.get('Accept-Encoding'), ('br', 'gzip') if brotli else ('gzip',))
+    if encoding == 'identity':
+        return response
+
+    if response.is_streamed:
+        # আগে থেকেই স্ট্রিমড রেসপন্স (জেনারেটর) শুধু চাঙ্কে চাঙ্কে কম্প্রেস হয়; বাফার করা বডি ক্যাশ দিয়ে যায়
+        response.response = compress_stream(response.response, encoding)
+        response.headers.pop('Content-Length', None)
+    else:
+        body = response.get_data()
+        if len(body) < COMPRESS_MIN_SIZE:
+            return response
+        response.set_data(compress_cached(body, encoding, response.headers.get('ETag')))
+    response.headers['Content-Encoding'] = encoding
+    return response
 
 # ================================
 #        FRONTEND TEMPLATES
@@ -601,85 +2063,7 @@ index_template = """
     <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css">
     <link rel="stylesheet" href="https://cdn.jsdelivr.net/npm/swiper@11/swiper-bundle.min.css" />
 
-    <style>
-        @import url('https://fonts.googleapis.com/css2?family=Poppins:wght@300;400;500;600;700&display=swap');
-        @import url('https://fonts.googleapis.com/css2?family=Hind+Siliguri:wght@400;500;600;700&display=swap');
-        
-        :root { --primary: #E50914; --dark: #0f1012; --card-bg: #1a1a1a; --text: #fff; --red-btn: #cc0000; --blue-badge: #0084ff; }
-        * { margin: 0; padding: 0; box-sizing: border-box; font-family: 'Poppins', sans-serif; -webkit-tap-highlight-color: transparent; }
-        body { background-color: var(--dark); color: var(--text); padding-bottom: 70px; }
-        a { text-decoration: none; color: inherit; }
-        
-        .navbar { display: flex; justify-content: space-between; align-items: center; padding: 12px 15px; background: #161616; border-bottom: 1px solid #222; position: sticky; top: 0; z-index: 100; }
-        .logo { font-size: 22px; font-weight: 800; color: var(--primary); text-transform: uppercase; letter-spacing: 1px; }
-        
-        /* 18+ Toggle */
-        .adult-control { display: flex; align-items: center; gap: 8px; font-size: 11px; font-weight: 600; background: #222; padding: 5px 10px; border-radius: 20px; border: 1px solid #333; }
-        .switch { position: relative; display: inline-block; width: 34px; height: 18px; }
-        .switch input { opacity: 0; width: 0; height: 0; }
-        .slider { position: absolute; cursor: pointer; top: 0; left: 0; right: 0; bottom: 0; background-color: #4caf50; transition: .4s; border-radius: 34px; }
-        .slider:before { position: absolute; content: ""; height: 14px; width: 14px; left: 2px; bottom: 2px; background-color: white; transition: .4s; border-radius: 50%; }
-        input:checked + .slider { background-color: #E50914; }
-        input:checked + .slider:before { transform: translateX(16px); }
-
-        /* Blur Logic */
-        body.hide-adult .is-adult img { filter: blur(20px); pointer-events: none; }
-        body.hide-adult .is-adult .card-title { opacity: 0.3; filter: blur(3px); }
-        body.hide-adult .is-adult::after { 
-            content: "18+"; position: absolute; top: 50%; left: 50%; 
-            transform: translate(-50%, -50%); background: #E50914; color: #fff; 
-            padding: 5px 10px; font-weight: bold; font-size: 14px; border-radius: 5px; 
-            pointer-events: none; z-index: 5;
-        }
-
-        .category-container { padding: 10px; background: #121212; display: flex; flex-wrap: wrap; justify-content: center; gap: 8px; }
-        .cat-btn { background: var(--red-btn); color: white; padding: 6px 10px; border-radius: 6px; font-size: 12px; font-weight: 700; text-transform: uppercase; display: inline-flex; align-items: center; gap: 5px; border: 1px solid #990000; box-shadow: 0 3px 0 #800000; transition: 0.1s; white-space: nowrap; }
-        .cat-btn:active { transform: translateY(3px); box-shadow: none; }
-        .cat-btn.active { background: #ffcc00; color: #000; border-color: #cc9900; box-shadow: 0 3px 0 #997700; }
-        .request-btn { background: #28a745; border-color: #28a745; }
-
-        .search-wrapper { padding: 5px 15px 15px 15px; background: #121212; display: flex; justify-content: center; }
-        .big-search-box { width: 100%; max-width: 600px; display: flex; background: #1e252b; border: 2px solid #00c3ff; border-radius: 8px; overflow: hidden; }
-        .big-search-box input { flex: 1; background: transparent; border: none; padding: 10px 15px; color: #fff; font-family: 'Hind Siliguri', sans-serif; font-size: 15px; outline: none; }
-        .big-search-box button { background: #00c3ff; border: none; width: 50px; cursor: pointer; color: #fff; font-size: 18px; }
-
-        /* HERO SLIDER */
-        .slider-section { padding: 10px 15px; margin-bottom: 10px; }
-        .swiper { width: 100%; height: 200px; border-radius: 8px; overflow: hidden; }
-        @media (min-width: 600px) { .swiper { height: 320px; } }
-        .swiper-slide { position: relative; background: #000; display: flex; align-items: flex-end; }
-        .slide-img { width: 100%; height: 100%; object-fit: cover; opacity: 0.8; }
-        .slide-overlay { position: absolute; inset: 0; background: linear-gradient(to top, rgba(0,0,0,1) 0%, rgba(0,0,0,0.6) 40%, transparent 100%); pointer-events: none; }
-        .slide-content { position: absolute; bottom: 0; left: 0; width: 100%; padding: 15px; z-index: 10; padding-right: 90px; }
-        .slide-title { font-size: 1.4rem; font-weight: 700; line-height: 1.2; text-shadow: 0 2px 4px rgba(0,0,0,0.8); margin-bottom: 5px; white-space: nowrap; overflow: hidden; text-overflow: ellipsis; text-transform: uppercase; }
-        .slide-meta { font-size: 0.9rem; color: #ccc; font-weight: 500; }
-        .type-badge { position: absolute; bottom: 0; right: 0; background: var(--blue-badge); color: #fff; padding: 6px 15px; font-weight: 700; font-size: 0.85rem; text-transform: uppercase; border-top-left-radius: 8px; z-index: 20; }
-        .swiper-pagination-bullet { background: #888; opacity: 1; width: 8px; height: 8px; }
-        .swiper-pagination-bullet-active { background: #fff; width: 20px; border-radius: 4px; }
-
-        .section { padding: 0 15px; }
-        .section-header { margin-bottom: 15px; border-left: 4px solid var(--primary); padding-left: 10px; }
-        .section-title { font-size: 1.1rem; font-weight: 700; text-transform: uppercase; }
-
-        .grid { display: grid; grid-template-columns: repeat(2, 1fr); gap: 10px; }
-        @media (min-width: 600px) { .grid { grid-template-columns: repeat(3, 1fr); gap: 15px; } }
-        @media (min-width: 900px) { .grid { grid-template-columns: repeat(5, 1fr); gap: 20px; } }
-
-        .card { position: relative; background: var(--card-bg); border-radius: 6px; overflow: hidden; aspect-ratio: 2/3; transition: transform 0.2s; }
-        .card-img { width: 100%; height: 100%; object-fit: cover; }
-        .card-overlay { position: absolute; inset: 0; background: linear-gradient(to top, rgba(0,0,0,0.95) 0%, transparent 60%); display: flex; flex-direction: column; justify-content: flex-end; padding: 10px; }
-        .card-title { font-size: 0.85rem; font-weight: 500; white-space: nowrap; overflow: hidden; text-overflow: ellipsis; }
-        .card-meta { font-size: 0.75rem; color: #ccc; display: flex; justify-content: space-between; }
-        .rating-badge { position: absolute; top: 6px; left: 6px; background: rgba(0,0,0,0.7); color: #ffb400; padding: 2px 5px; border-radius: 3px; font-size: 0.65rem; font-weight: bold; }
-
-        .pagination { display: flex; justify-content: center; gap: 10px; margin: 30px 0; }
-        .page-btn { padding: 8px 16px; background: #222; border-radius: 4px; color: #fff; font-size: 0.9rem; border: 1px solid #333; }
-
-        .bottom-nav { position: fixed; bottom: 0; width: 100%; background: #161616; display: flex; justify-content: space-around; padding: 10px 0; border-top: 1px solid #252525; z-index: 99; }
-        .nav-item { display: flex; flex-direction: column; align-items: center; color: #777; font-size: 10px; }
-        .nav-item.active { color: var(--primary); }
-        .ad-container { margin: 15px 0; text-align: center; overflow: hidden; }
-    </style>
+    <link rel="stylesheet" href="{{ asset_url('home.css') }}">
 </head>
 <body class="hide-adult"> 
 
@@ -695,7 +2079,8 @@ index_template = """
 </nav>
 
 <div class="category-container">
-    <a href="/" class="cat-btn {{ 'active' if not selected_cat and not request.args.get('type') else '' }}">🏠 Home</a>
+    <a href="/" class="cat-btn {{ 'active' if not selected_cat and not request.args.get('type') and not request.args.get('sort') else '' }}">🏠 Home</a>
+    <a href="/?sort=trending" class="cat-btn {{ 'active' if request.args.get('sort') == 'trending' else '' }}">🔥 Trending</a>
     <a href="/?type=movie" class="cat-btn {{ 'active' if request.args.get('type') == 'movie' else '' }}"><i class="fas fa-film"></i> All Movies</a>
     <a href="/?type=series" class="cat-btn {{ 'active' if request.args.get('type') == 'series' else '' }}"><i class="fas fa-tv"></i> All Web Series</a>
     {% for cat in categories %}
@@ -720,7 +2105,7 @@ index_template = """
             {% for slide in slider_movies %}
             <div class="swiper-slide {% if slide.is_adult %}is-adult{% endif %}">
                 <a href="{{ url_for('movie_detail', movie_id=slide._id) }}" style="width:100%; height:100%; position:relative;">
-                    <img src="{{ slide.backdrop or slide.poster }}" class="slide-img">
+                    {% if slide.backdrop %}<img {{ img(slide.backdrop, 'slider') }} class="slide-img">{% else %}<img {{ img(slide.poster, 'slider_poster') }} class="slide-img">{% endif %}
                     <div class="slide-overlay"></div>
                     <div class="slide-content">
                         <h2 class="slide-title">{{ slide.title }}</h2>
@@ -753,7 +2138,7 @@ index_template = """
         {% for movie in movies %}
         <a href="{{ url_for('movie_detail', movie_id=movie._id) }}" class="card {% if movie.is_adult %}is-adult{% endif %}">
             <span class="rating-badge">{{ movie.vote_average }}</span>
-            <img src="{{ movie.poster or 'https://via.placeholder.com/300x450' }}" class="card-img" loading="lazy">
+            <img {{ img(movie.poster, 'grid', 'https://via.placeholder.com/300x450') }} class="card-img" loading="lazy">
             <div class="card-overlay">
                 <h3 class="card-title">{{ movie.title }}</h3>
                 <div class="card-meta">
@@ -767,10 +2152,10 @@ index_template = """
 
     <div class="pagination">
         {% if page > 1 %}
-        <a href="/?page={{ page-1 }}&type={{ request.args.get('type') or '' }}&cat={{ selected_cat or '' }}&q={{ query or '' }}" class="page-btn">Previous</a>
+        <a href="/?page={{ page-1 }}&type={{ request.args.get('type') or '' }}&cat={{ selected_cat or '' }}&q={{ query or '' }}&sort={{ request.args.get('sort') or '' }}" class="page-btn">Previous</a>
         {% endif %}
         {% if has_next %}
-        <a href="/?page={{ page+1 }}&type={{ request.args.get('type') or '' }}&cat={{ selected_cat or '' }}&q={{ query or '' }}" class="page-btn">Next</a>
+        <a href="/?page={{ page+1 }}&type={{ request.args.get('type') or '' }}&cat={{ selected_cat or '' }}&q={{ query or '' }}&sort={{ request.args.get('sort') or '' }}" class="page-btn">Next</a>
         {% endif %}
     </div>
     <div style="height: 20px;"></div>
@@ -785,56 +2170,68 @@ index_template = """
 {% if ad_settings.popunder %}{{ ad_settings.popunder|safe }}{% endif %}
 
 <script src="https://cdn.jsdelivr.net/npm/swiper@11/swiper-bundle.min.js"></script>
-<script>
-    var swiper = new Swiper(".mySwiper", {
-        spaceBetween: 15,
-        centeredSlides: true,
-        autoplay: { delay: 3500, disableOnInteraction: false },
-        pagination: { el: ".swiper-pagination", clickable: true, dynamicBullets: true },
-        loop: true
-    });
-
-    const toggle = document.getElementById('adultToggle');
-    const label = document.getElementById('adult-label');
-    const body = document.body;
-
-    if (localStorage.getItem('adult_enabled') === 'true') {
-        body.classList.remove('hide-adult');
-        toggle.checked = true;
-        label.innerText = "18+ ON";
-        label.style.color = "#E50914";
-    } else {
-        body.classList.add('hide-adult');
-        toggle.checked = false;
-        label.innerText = "18+ OFF";
-        label.style.color = "#4caf50";
-    }
-
-    toggle.addEventListener('change', function() {
-        if(this.checked) {
-            if(confirm("Are you over 18 years old? This will show adult content.")) {
-                body.classList.remove('hide-adult');
-                localStorage.setItem('adult_enabled', 'true');
-                label.innerText = "18+ ON";
-                label.style.color = "#E50914";
-            } else {
-                this.checked = false;
-            }
-        } else {
-            body.classList.add('hide-adult');
-            localStorage.setItem('adult_enabled', 'false');
-            label.innerText = "18+ OFF";
-            label.style.color = "#4caf50";
-        }
-    });
-</script>
+<script src="{{ asset_url('home.js') }}"></script>
 
 </body>
 </html>
 """
 
 # --- DETAIL TEMPLATE (Updated with REQUEST BUTTON) ---
-detail_template = """
+# ফাইল বাটন ও সিজনের এপিসোড লিস্টের ম্যাক্রো (ডিটেইল পেজ এবং লেজি সিজন এন্ডপয়েন্ট দুই জায়গাতেই লাগে)
+file_macros = """
+{% macro file_item(file) %}
+{% if not (HIDE_BROKEN_FILES and file.health == 'broken') %}
+    <div class="file-item{{ ' file-broken' if file.health == 'broken' else '' }}">
+        <div class="file-details">
+            {% if file.health == 'broken' %}<div class="broken-flag"><i class="fas fa-exclamation-triangle"></i> This link may not work</div>{% endif %}
+            {% if file.episode_label %}
+                <h4 style="color: #ffb400; font-weight: 700;">{{ file.episode_label }}</h4>
+                <span class="badge-q {{ file.q_class or quality_class(file.quality) }}">{{ file.quality }}</span>
+            {% else %}
+                <h4>{{ file.quality }}</h4>
+            {% endif %}
+            
+            <div style="font-size: 0.75rem; color: #888; margin-top: 3px;">
+                Size: {{ file.size }} • Format: {{ file.file_type|upper }}
+            </div>
+            <div style="font-size: 0.65rem; color: #555; margin-top: 2px; white-space: nowrap; overflow: hidden; text-overflow: ellipsis; max-width: 250px;">
+                {{ file.filename }}
+            </div>
+            <a href="/report/broken/{{ movie_id if movie_id is defined else movie._id }}?file={{ file.unique_code }}" class="file-report" onclick="return confirm('Report this file as broken?')"><i class="fas fa-bug"></i> Report</a>
+        </div>
+        
+        {% set tg_link = "https://t.me/" + BOT_USERNAME + "?start=" + file.unique_code %}
+        
+        {% if ad_settings.shortener_domain and ad_settings.shortener_api %}
+            <!-- JS Button for API Shorteners -->
+            <button class="btn-dl" onclick="processLink(this, '{{ tg_link }}', '{{ ad_settings.shortener_api }}', '{{ ad_settings.shortener_domain }}')">
+                <i class="fab fa-telegram-plane"></i> 
+                {% if file.episode_label %}Watch {{ file.episode_label }}{% else %}Get File{% endif %}
+            </button>
+        {% else %}
+            <!-- Direct Link -->
+            <a href="{{ tg_link }}" class="btn-dl" target="_blank">
+                <i class="fab fa-telegram-plane"></i> 
+                {% if file.episode_label %}Watch {{ file.episode_label }}{% else %}Get File{% endif %}
+            </a>
+        {% endif %}
+
+    </div>
+{% endif %}
+{% endmacro %}
+
+{% macro season_episodes(season) %}
+{% for episode in season.episodes %}
+<div class="episode-group">
+    {% for file in episode.files %}{{ file_item(file) }}{% endfor %}
+</div>
+{% endfor %}
+{% endmacro %}
+"""
+
+season_template = file_macros + """{{ season_episodes(season) }}"""
+
+detail_template = file_macros + """
 <!DOCTYPE html>
 <html lang="en">
 <head>
@@ -843,85 +2240,20 @@ detail_template = """
     <meta name="viewport" content="width=device-width, initial-scale=1.0, maximum-scale=1.0, user-scalable=no">
     <title>{{ movie.title }} - Download</title>
     <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css">
-    <style>
-        @import url('https://fonts.googleapis.com/css2?family=Poppins:wght@300;400;600;700&display=swap');
-        :root { --primary: #E50914; --dark: #0f0f0f; --bg-sec: #1a1a1a; --text: #eee; }
-        body { background-color: var(--dark); color: var(--text); font-family: 'Poppins', sans-serif; padding-bottom: 30px; }
-        .container { max-width: 900px; margin: 0 auto; padding: 15px; }
-        
-        .backdrop { height: 250px; position: relative; overflow: hidden; margin-bottom: -80px; }
-        .backdrop img { width: 100%; height: 100%; object-fit: cover; opacity: 0.6; mask-image: linear-gradient(to bottom, black 50%, transparent 100%); }
-        .back-btn { position: absolute; top: 15px; left: 15px; background: rgba(0,0,0,0.6); color: #fff; width: 35px; height: 35px; display: flex; align-items: center; justify-content: center; border-radius: 50%; z-index: 10; font-size: 14px; }
-        
-        .movie-info { position: relative; display: flex; flex-direction: column; align-items: center; text-align: center; gap: 15px; z-index: 5; }
-        .poster-box { width: 140px; border-radius: 8px; box-shadow: 0 5px 15px rgba(0,0,0,0.5); overflow: hidden; border: 2px solid #333; }
-        .poster-box img { width: 100%; display: block; }
-        
-        h1 { font-size: 1.6rem; margin-bottom: 5px; line-height: 1.2; }
-        .meta-tags { display: flex; flex-wrap: wrap; gap: 8px; justify-content: center; margin-bottom: 8px; font-size: 0.8rem; color: #bbb; }
-        .tag { background: #333; padding: 3px 8px; border-radius: 4px; }
-        .overview { font-size: 0.9rem; line-height: 1.6; color: #ccc; margin-bottom: 25px; text-align: justify; }
-        
-        .file-section { background: var(--bg-sec); border-radius: 8px; padding: 15px; border: 1px solid #2a2a2a; }
-        .section-head { font-size: 1rem; margin-bottom: 15px; display: flex; align-items: center; gap: 10px; color: var(--primary); font-weight: 600; border-bottom: 1px solid #333; padding-bottom: 10px; }
-        
-        .file-item { display: flex; flex-direction: column; align-items: center; background: #252525; padding: 15px; border-radius: 8px; margin-bottom: 12px; text-align: center; }
-        .file-details h4 { font-size: 1rem; margin-bottom: 4px; color: #fff; }
-        .file-details span { font-size: 0.8rem; color: #999; }
-        
-        .btn-dl { 
-            background: #0088cc; 
-            color: white; 
-            width: 100%;
-            padding: 10px; 
-            margin-top: 10px; 
-            border-radius: 6px; 
-            text-decoration: none; 
-            font-weight: 600; 
-            display: flex; 
-            align-items: center; 
-            justify-content: center; 
-            gap: 8px;
-            font-size: 0.95rem;
-            transition: 0.3s;
-            cursor: pointer;
-            border: none;
-        }
-        .btn-dl:hover { background: #0077b5; transform: translateY(-2px); }
-
-        .badge-q { padding: 3px 8px; border-radius: 4px; font-size: 0.7rem; font-weight: bold; }
-        .q-4k { background: #d63384; color: #fff; box-shadow: 0 0 10px rgba(214, 51, 132, 0.5); }
-        .q-1080p { background: #6f42c1; color: #fff; }
-        .q-720p { background: #0d6efd; color: #fff; }
-        .q-480p { background: #198754; color: #fff; }
-        
-        .dmca-link { color: #555; font-size: 11px; text-decoration: none; margin-top: 30px; display: block; text-align: center; }
-        .dmca-link:hover { text-decoration: underline; color: #777; }
-        
-        .report-btn { color: #dc3545; background: none; border: 1px solid #dc3545; padding: 5px 10px; border-radius: 4px; font-size: 0.75rem; margin-top: 10px; cursor: pointer; text-decoration: none; display: inline-block; }
-        .report-btn:hover { background: #dc3545; color: white; }
-
-        @media (min-width: 600px) {
-            .movie-info { flex-direction: row; text-align: left; align-items: flex-end; padding: 0 20px; }
-            .meta-tags { justify-content: flex-start; }
-            .overview { text-align: left; padding: 0 20px; }
-            .backdrop { height: 350px; margin-bottom: -100px; }
-            .poster-box { width: 180px; }
-        }
-    </style>
+    <link rel="stylesheet" href="{{ asset_url('detail.css') }}">
 </head>
 <body>
 
 <a href="/" class="back-btn"><i class="fas fa-arrow-left"></i></a>
 
 <div class="backdrop">
-    <img src="{{ movie.backdrop or movie.poster }}" alt="">
+    {% if movie.backdrop %}<img {{ img(movie.backdrop, 'backdrop') }} alt="">{% else %}<img {{ img(movie.poster, 'slider_poster') }} alt="">{% endif %}
 </div>
 
 <div class="container">
     <div class="movie-info">
         <div class="poster-box">
-            <img src="{{ movie.poster }}" alt="Poster">
+            <img {{ img(movie.poster, 'detail') }} alt="Poster">
         </div>
         <div style="padding-bottom: 10px;">
             <h1>{{ movie.title }}</h1>
@@ -966,7 +2298,7 @@ detail_template = """
         <div style="display: flex; gap: 15px; overflow-x: auto; padding-bottom: 10px; scrollbar-width: none;">
             {% for actor in movie.cast %}
             <div style="min-width: 90px; text-align: center;">
-                <img src="{{ actor.img or 'https://via.placeholder.com/90x90?text=No+Img' }}" 
+                <img {{ img(actor.img, 'cast', 'https://via.placeholder.com/90x90?text=No+Img') }} loading="lazy"
                      style="width: 80px; height: 80px; border-radius: 50%; object-fit: cover; border: 2px solid #333; margin-bottom: 5px;">
                 <div style="font-size: 0.75rem; color: #ccc; overflow: hidden; text-overflow: ellipsis; white-space: nowrap;">{{ actor.name }}</div>
             </div>
@@ -992,53 +2324,22 @@ detail_template = """
     <div class="file-section">
         <div style="display:flex; justify-content:space-between; align-items:center; margin-bottom:15px; border-bottom:1px solid #333; padding-bottom:10px;">
              <span class="section-head" style="margin:0;"><i class="fas fa-download"></i> Download Links</span>
-             {% if movie.files %}
+             {% if movie.files or movie.episode_index %}
                 <a href="/report/broken/{{ movie._id }}" class="report-btn" onclick="return confirm('Report broken link for this movie?')"><i class="fas fa-bug"></i> Report Broken Link</a>
              {% endif %}
         </div>
 
-        {% if movie.files %}
-            {% for file in movie.files|reverse %}
-            <div class="file-item">
-                <div class="file-details">
-                    {% if file.episode_label %}
-                        <h4 style="color: #ffb400; font-weight: 700;">{{ file.episode_label }}</h4>
-                        {% set q_class = 'q-480p' %}
-                        {% if '1080p' in file.quality %} {% set q_class = 'q-1080p' %}
-                        {% elif '720p' in file.quality %} {% set q_class = 'q-720p' %}
-                        {% elif '4K' in file.quality %} {% set q_class = 'q-4k' %}
-                        {% endif %}
-                        <span class="badge-q {{ q_class }}">{{ file.quality }}</span>
-                    {% else %}
-                        <h4>{{ file.quality }}</h4>
-                    {% endif %}
-                    
-                    <div style="font-size: 0.75rem; color: #888; margin-top: 3px;">
-                        Size: {{ file.size }} • Format: {{ file.file_type|upper }}
-                    </div>
-                    <div style="font-size: 0.65rem; color: #555; margin-top: 2px; white-space: nowrap; overflow: hidden; text-overflow: ellipsis; max-width: 250px;">
-                        {{ file.filename }}
-                    </div>
-                </div>
-                
-                {% set tg_link = "https://t.me/" + BOT_USERNAME + "?start=" + file.unique_code %}
-                
-                {% if ad_settings.shortener_domain and ad_settings.shortener_api %}
-                    <!-- JS Button for API Shorteners -->
-                    <button class="btn-dl" onclick="processLink(this, '{{ tg_link }}', '{{ ad_settings.shortener_api }}', '{{ ad_settings.shortener_domain }}')">
-                        <i class="fab fa-telegram-plane"></i> 
-                        {% if file.episode_label %}Watch {{ file.episode_label }}{% else %}Get File{% endif %}
-                    </button>
-                {% else %}
-                    <!-- Direct Link -->
-                    <a href="{{ tg_link }}" class="btn-dl" target="_blank">
-                        <i class="fab fa-telegram-plane"></i> 
-                        {% if file.episode_label %}Watch {{ file.episode_label }}{% else %}Get File{% endif %}
-                    </a>
-                {% endif %}
-
-            </div>
-            {% endfor %}
+        {% if movie.files or movie.episode_index %}
+            {% if movie.episode_index %}
+                {% for season in movie.episode_index %}
+                <details class="season-group" data-url="/movie/{{ movie._id }}/season/{{ season.season }}" {% if season.episodes %}open data-loaded="1"{% endif %}>
+                    <summary><span><i class="fas fa-layer-group"></i> {{ season.label }}</span> <small>{{ season.count }} Episodes</small></summary>
+                    <div class="season-body">{% if season.episodes %}{{ season_episodes(season) }}{% endif %}</div>
+                </details>
+                {% endfor %}
+            {% else %}
+                {% for file in movie.files|reverse %}{{ file_item(file) }}{% endfor %}
+            {% endif %}
         {% else %}
             <!-- NO FILES - SHOW REQUEST BUTTON -->
             <div style="text-align: center; padding: 30px 10px;">
@@ -1051,13 +2352,6 @@ detail_template = """
                 </a>
             </div>
             
-            <style>
-                @keyframes pulse {
-                    0% { box-shadow: 0 0 0 0 rgba(229, 9, 20, 0.7); }
-                    70% { box-shadow: 0 0 0 10px rgba(229, 9, 20, 0); }
-                    100% { box-shadow: 0 0 0 0 rgba(229, 9, 20, 0); }
-                }
-            </style>
         {% endif %}
     </div>
 
@@ -1085,53 +2379,7 @@ detail_template = """
 
 {% if ad_settings.popunder %}{{ ad_settings.popunder|safe }}{% endif %}
 
-<script>
-    async function processLink(btn, originalUrl, apiKey, domain) {
-        // বাটন লোডিং স্টেট
-        const originalText = btn.innerHTML;
-        btn.innerHTML = '<i class="fas fa-spinner fa-spin"></i> Please Wait...';
-        btn.style.opacity = "0.7";
-        btn.disabled = true;
-
-        try {
-            // FIX: Call our own server-side proxy instead of external API directly to avoid CORS
-            const proxyUrl = `/api/shorten?api=${apiKey}&domain=${domain}&url=${encodeURIComponent(originalUrl)}`;
-            
-            const response = await fetch(proxyUrl);
-            const data = await response.json();
-
-            // Check for various response formats (shortenedUrl, link, short, etc.)
-            let finalLink = null;
-            
-            if (data.status === 'success' || data.shortenedUrl) {
-                finalLink = data.shortenedUrl || data.link || data.short;
-            } else if (data.shortenedUrl) {
-                finalLink = data.shortenedUrl;
-            }
-
-            if (finalLink) {
-                // সফল হলে শর্ট লিংকে রিডাইরেক্ট
-                window.location.href = finalLink;
-            } else {
-                // ফেইল হলে অরিজিনাল লিংকে
-                console.error("API returned error or unknown format:", data);
-                // alert("Shortener Error! Redirecting to original link...");
-                window.location.href = originalUrl;
-            }
-        } catch (error) {
-            console.error("Fetch Error:", error);
-            // কোন এরর হলে অরিজিনাল লিংকে রিডাইরেক্ট
-            window.location.href = originalUrl;
-        } finally {
-            // যদি পেজ রিডাইরেক্ট না হয়, বাটন ঠিক করা
-            setTimeout(() => {
-                btn.innerHTML = originalText;
-                btn.style.opacity = "1";
-                btn.disabled = false;
-            }, 3000);
-        }
-    }
-</script>
+<script src="{{ asset_url('detail.js') }}"></script>
 
 </body>
 </html>
@@ -1150,24 +2398,7 @@ admin_base = """
     <title>Admin Panel - MovieZone</title>
     <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css" rel="stylesheet">
     <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css">
-    <style>
-        body { font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif; background-color: #0f1012; }
-        .sidebar { height: 100vh; position: fixed; top: 0; left: 0; width: 240px; background: #191b1f; padding-top: 20px; border-right: 1px solid #2a2d31; }
-        .sidebar a { padding: 12px 25px; display: block; color: #aaa; text-decoration: none; transition: 0.3s; font-weight: 500; }
-        .sidebar a:hover, .sidebar a.active { color: #fff; background: #E50914; border-radius: 0 25px 25px 0; }
-        .sidebar .brand { font-size: 22px; font-weight: bold; color: #E50914; text-align: center; margin-bottom: 30px; }
-        .main-content { margin-left: 240px; padding: 30px; }
-        .card { background: #1f2226; border: 1px solid #2a2d31; }
-        .form-control { background: #131517; border-color: #333; color: #fff; }
-        .form-control:focus { background: #131517; color: #fff; border-color: #E50914; box-shadow: none; }
-        .poster-preview { width: 100%; border-radius: 8px; max-width: 200px; }
-        @media (max-width: 768px) {
-            .sidebar { width: 60px; }
-            .sidebar a span, .sidebar .brand span { display: none; }
-            .sidebar a { padding: 15px; text-align: center; border-radius: 0; }
-            .main-content { margin-left: 60px; padding: 15px; }
-        }
-    </style>
+    <link rel="stylesheet" href="{{ asset_url('admin.css') }}">
 </head>
 <body>
 
@@ -1176,6 +2407,10 @@ admin_base = """
     <a href="/admin" class="{{ 'active' if active == 'dashboard' else '' }}"><i class="fas fa-th-large"></i> <span>Movies</span></a>
     <a href="/admin/categories" class="{{ 'active' if active == 'categories' else '' }}"><i class="fas fa-tags"></i> <span>Categories</span></a>
     <a href="/admin/settings" class="{{ 'active' if active == 'settings' else '' }}"><i class="fas fa-cogs"></i> <span>Settings</span></a>
+    <a href="/admin/reports" class="{{ 'active' if active == 'reports' else '' }}"><i class="fas fa-bug"></i> <span>Reports</span></a>
+    <a href="/admin/files" class="{{ 'active' if active == 'files' else '' }}"><i class="fas fa-file-medical"></i> <span>Files</span></a>
+    <a href="/admin/health" class="{{ 'active' if active == 'health' else '' }}"><i class="fas fa-heartbeat"></i> <span>Health</span></a>
+    <a href="/admin/export"><i class="fas fa-download"></i> <span>Export</span></a>
     <a href="/" target="_blank"><i class="fas fa-external-link-alt"></i> <span>View Site</span></a>
 </div>
 
@@ -1191,19 +2426,68 @@ admin_base = """
 admin_dashboard = """
 <div class="d-flex justify-content-between align-items-center mb-4">
     <h2>Manage Movies</h2>
-    <form class="d-flex" method="GET">
-        <input class="form-control me-2" type="search" name="q" placeholder="Search movies..." value="{{ q }}">
+    <form class="d-flex gap-2" method="GET">
+        <select name="type" class="form-select" style="width:auto;">
+            <option value="">All Types</option>
+            <option value="movie" {% if type_filter == 'movie' %}selected{% endif %}>Movie</option>
+            <option value="series" {% if type_filter == 'series' %}selected{% endif %}>Series</option>
+        </select>
+        <select name="cat" class="form-select" style="width:auto;">
+            <option value="">All Categories</option>
+            {% for cat in categories %}<option value="{{ cat.name }}" {% if cat_filter == cat.name %}selected{% endif %}>{{ cat.name }}</option>{% endfor %}
+        </select>
+        <input class="form-control" type="search" name="q" placeholder="Search movies..." value="{{ q }}">
         <button class="btn btn-outline-light" type="submit">Search</button>
     </form>
 </div>
 
+<form method="POST" action="/admin/bulk" id="bulkForm" onsubmit="return confirmBulk(this)">
+<input type="hidden" name="q" value="{{ q }}">
+<input type="hidden" name="cat" value="{{ cat_filter }}">
+<input type="hidden" name="type" value="{{ type_filter }}">
+<div class="card p-3 mb-4">
+    <div class="d-flex flex-wrap gap-2 align-items-center">
+        <div class="form-check me-2">
+            <input class="form-check-input" type="checkbox" id="selectAll" onclick="toggleAll(this)">
+            <label class="form-check-label" for="selectAll">Select page</label>
+        </div>
+        <select name="scope" class="form-select" style="width:auto;">
+            <option value="selected">Checked items</option>
+            <option value="filter">All {{ total }} matching current filter</option>
+        </select>
+        <select name="action" class="form-select" style="width:auto;" onchange="bulkValueField(this.value)">
+            <option value="set_category">Set Category</option>
+            <option value="set_type">Set Type</option>
+            <option value="set_language">Set Language</option>
+            <option value="set_adult">Set Adult Flag</option>
+            <option value="reenrich">Re-enrich from TMDB</option>
+            <option value="delete">Delete</option>
+        </select>
+        <select name="value" class="form-select bulk-value" data-for="set_category" style="width:auto;">
+            {% for cat in categories %}<option value="{{ cat.name }}">{{ cat.name }}</option>{% endfor %}
+            <option value="Uncategorized">Uncategorized</option>
+        </select>
+        <select name="value" class="form-select bulk-value" data-for="set_type" style="width:auto;" disabled hidden>
+            <option value="movie">Movie</option>
+            <option value="series">Series</option>
+        </select>
+        <input name="value" class="form-control bulk-value" data-for="set_language" style="width:auto;" placeholder="Language" disabled hidden>
+        <select name="value" class="form-select bulk-value" data-for="set_adult" style="width:auto;" disabled hidden>
+            <option value="true">18+ (Adult)</option>
+            <option value="false">Not Adult</option>
+        </select>
+        <button class="btn btn-danger" type="submit"><i class="fas fa-bolt"></i> Apply</button>
+    </div>
+</div>
+
 <div class="row">
     {% for movie in movies %}
     <div class="col-md-6 col-lg-4 col-xl-3 mb-4">
         <div class="card h-100">
             <div class="row g-0 h-100">
-                <div class="col-4">
-                    <img src="{{ movie.poster or 'https://via.placeholder.com/150' }}" class="img-fluid rounded-start h-100" style="object-fit:cover;" alt="...">
+                <div class="col-4 position-relative">
+                    <input class="form-check-input position-absolute m-2 bulk-check" type="checkbox" name="ids" value="{{ movie._id }}">
+                    <img src="{{ tmdb_image(movie.poster, 'w185') or 'https://via.placeholder.com/150' }}" class="img-fluid rounded-start h-100" style="object-fit:cover;" alt="...">
                 </div>
                 <div class="col-8">
                     <div class="card-body p-2 d-flex flex-column h-100">
@@ -1222,13 +2506,114 @@ admin_dashboard = """
     </div>
     {% endfor %}
 </div>
+</form>
 
 <div class="d-flex justify-content-center mt-4">
     {% if page > 1 %}
-    <a href="?page={{ page-1 }}&q={{ q }}" class="btn btn-outline-secondary me-2">Previous</a>
+    <a href="?page={{ page-1 }}&q={{ q }}&cat={{ cat_filter }}&type={{ type_filter }}" class="btn btn-outline-secondary me-2">Previous</a>
     {% endif %}
     <span class="align-self-center mx-2">Page {{ page }}</span>
-    <a href="?page={{ page+1 }}&q={{ q }}" class="btn btn-outline-secondary ms-2">Next</a>
+    <a href="?page={{ page+1 }}&q={{ q }}&cat={{ cat_filter }}&type={{ type_filter }}" class="btn btn-outline-secondary ms-2">Next</a>
+</div>
+<script src="{{ asset_url('admin.js') }}"></script>
+"""
+
+admin_health = """
+<h2 class="mb-4">Service Health</h2>
+<div class="card p-3 mb-4">
+    <table class="table table-dark table-sm mb-0 align-middle">
+        <thead><tr><th>Service</th><th>State</th><th>Budget</th><th>OK</th><th>Failed</th><th>Fast-fails</th><th>Last change</th></tr></thead>
+        <tbody>
+        {% for b in breakers %}
+        <tr>
+            <td><b>{{ b.name }}</b></td>
+            <td><span class="badge {{ 'bg-success' if b.state == 'closed' else ('bg-warning text-dark' if b.state == 'half_open' else 'bg-danger') }}">{{ b.state }}</span></td>
+            <td>{{ b.budget_ms }} ms</td>
+            <td>{{ b.successes }}</td>
+            <td>{{ b.failures }}{% if b.consecutive_failures %} ({{ b.consecutive_failures }} in a row){% endif %}</td>
+            <td>{{ b.fast_fails }}</td>
+            <td class="small">{% if b.transitions %}{% set t = b.transitions[-1] %}{{ t.from }} → {{ t.to }} at {{ t.at.strftime('%Y-%m-%d %H:%M:%S') }} UTC{% else %}-{% endif %}</td>
+        </tr>
+        {% endfor %}
+        </tbody>
+    </table>
+</div>
+<p class="text-muted">Titles waiting for TMDB re-enrichment: <b>{{ pending_enrich }}</b></p>
+"""
+
+admin_reports = """
+<h2 class="mb-4">Most Reported</h2>
+<div class="card p-3 mb-4">
+    {% if items %}
+    <table class="table table-dark table-sm mb-0 align-middle">
+        <thead><tr><th>Title</th><th>Reports</th><th>New</th><th>Worst files</th><th>Last report</th><th></th></tr></thead>
+        <tbody>
+        {% for r in items %}
+        <tr>
+            <td>{% if r.movie %}<a href="/admin/movie/edit/{{ r._id }}">{{ r.movie.title }}</a>{% else %}<span class="text-muted">deleted ({{ r._id }})</span>{% endif %}</td>
+            <td><b>{{ r.count }}</b></td>
+            <td>{{ r.pending }}</td>
+            <td class="small">{% for f in r.top_files %}{{ f.label }} ×{{ f.count }}{% if not loop.last %}, {% endif %}{% endfor %}</td>
+            <td class="small">{{ r.last_at.strftime('%Y-%m-%d %H:%M') if r.last_at else '-' }}</td>
+            <td>
+                <form method="POST" action="/admin/reports/clear/{{ r._id }}" class="m-0">
+                    <button class="btn btn-sm btn-outline-success" title="Mark fixed"><i class="fas fa-check"></i></button>
+                </form>
+            </td>
+        </tr>
+        {% endfor %}
+        </tbody>
+    </table>
+    {% else %}
+    <p class="text-muted mb-0">No broken link reports.</p>
+    {% endif %}
+</div>
+"""
+
+admin_files = """
+<h2 class="mb-4">File Health</h2>
+<div class="card p-3 mb-4">
+    <p class="mb-1">Titles with broken files: <b>{{ broken_titles }}</b> &nbsp; Never checked: <b>{{ unchecked }}</b></p>
+    {% if last %}
+    <p class="mb-1 small text-muted">Last round: {{ last.checked }} files in {{ last.titles }} titles, {{ last.broken }} broken, {{ last.recovered }} recovered, {{ last.unknown }} unknown
+        ({{ last.started_at.strftime('%Y-%m-%d %H:%M') }} – {{ last.finished_at.strftime('%H:%M') if last.finished_at else '…' }} UTC)</p>
+    {% endif %}
+    <form method="POST" action="/admin/files/check" class="mt-2 mb-0"><button class="btn btn-sm btn-outline-info"><i class="fas fa-stethoscope"></i> Run check now</button></form>
+</div>
+<div class="card p-3 mb-4">
+    {% if items %}
+    <table class="table table-dark table-sm mb-0 align-middle">
+        <thead><tr><th>Title</th><th>Broken files</th><th>Checked</th></tr></thead>
+        <tbody>
+        {% for m in items %}
+        <tr>
+            <td><a href="/admin/movie/edit/{{ m._id }}">{{ m.title }}</a></td>
+            <td class="small">{% for f in m.files if f.health == 'broken' %}<div>{{ f.episode_label or f.quality }} <span class="text-muted">{{ f.filename }}</span> <span class="text-danger">{{ f.check_error }}</span></div>{% endfor %}</td>
+            <td class="small">{{ m.health_checked_at.strftime('%Y-%m-%d %H:%M') if m.health_checked_at else '-' }}</td>
+        </tr>
+        {% endfor %}
+        </tbody>
+    </table>
+    {% else %}
+    <p class="text-muted mb-0">No broken files found.</p>
+    {% endif %}
+</div>
+"""
+
+admin_job_template = """
+{% if job.status == 'running' %}<meta http-equiv="refresh" content="2">{% endif %}
+<h2 class="mb-4">Bulk Job</h2>
+<div class="card p-4" style="max-width: 640px;">
+    <p class="mb-1"><b>Action:</b> {{ job.action }}{% if job.value is not none and job.value != '' %} → {{ job.value }}{% endif %}</p>
+    <p class="mb-3"><b>Selection:</b> {{ job.selection }}</p>
+    {% set pct = ((job.processed / job.total * 100) if job.total else 100)|round|int %}
+    <div class="progress mb-3" style="height: 22px;">
+        <div class="progress-bar {{ 'bg-success' if job.status == 'done' else ('bg-danger' if job.status == 'failed' else 'progress-bar-striped progress-bar-animated') }}" style="width: {{ pct }}%;">{{ pct }}%</div>
+    </div>
+    <p class="mb-1">Processed: {{ job.processed }} / {{ job.total }}</p>
+    <p class="mb-1">Modified: {{ job.modified }} &nbsp; Deleted: {{ job.deleted }} &nbsp; Errors: {{ job.errors }}</p>
+    <p class="mb-3">Status: <b>{{ job.status }}</b>{% if job.error %} — {{ job.error }}{% endif %}</p>
+    <a href="/admin" class="btn btn-outline-light">Back to Movies</a>
 </div>
 """
 
@@ -1285,7 +2670,7 @@ admin_edit = """
             
             <div class="card p-3 mt-3 text-center">
                 <label class="form-label text-muted">Current Poster</label><br>
-                <img src="{{ movie.poster }}" class="poster-preview img-thumbnail" style="max-height: 200px;">
+                <img src="{{ tmdb_image(movie.poster, 'w342') }}" class="poster-preview img-thumbnail" style="max-height: 200px;">
             </div>
         </div>
 
@@ -1366,92 +2751,7 @@ admin_edit = """
     </div>
 </div>
 
-<script>
-    function smartFetch() {
-        let query = document.getElementById('smartInput').value.trim();
-        const resultDiv = document.getElementById('tmdbResults');
-        
-        if(!query) {
-            resultDiv.innerHTML = '<div class="text-warning text-center">Please paste a link or type a name.</div>';
-            return;
-        }
-        
-        resultDiv.innerHTML = '<div class="text-center py-3"><div class="spinner-border text-primary" role="status"></div><br>Searching...</div>';
-        
-        fetch('/admin/api/tmdb?q=' + encodeURIComponent(query))
-        .then(r => r.json())
-        .then(data => {
-            if(data.error) {
-                resultDiv.innerHTML = '<div class="alert alert-danger small">'+data.error+'</div>';
-                return;
-            }
-            if(!data.results || data.results.length === 0) {
-                 resultDiv.innerHTML = '<div class="alert alert-warning small">No results found. Try using TMDB Link.</div>';
-                 return;
-            }
-
-            let html = '<div class="list-group list-group-flush">';
-            data.results.forEach(item => {
-                let title = item.title || item.name;
-                let date = item.release_date || item.first_air_date || 'N/A';
-                let type = item.media_type || 'movie';
-                let poster = item.poster_path ? 'https://image.tmdb.org/t/p/w92' + item.poster_path : 'https://via.placeholder.com/92x138?text=No+Img';
-                
-                let cleanItem = JSON.stringify(item).replace(/'/g, "&#39;").replace(/"/g, "&quot;");
-
-                html += `<button type="button" class="list-group-item list-group-item-action d-flex align-items-center gap-2 p-2" onclick='fillForm(${cleanItem})'>
-                    <img src="${poster}" style="width:45px; height:65px; object-fit:cover; border-radius:4px;">
-                    <div style="overflow:hidden; width:100%;">
-                        <div class="fw-bold text-truncate">${title}</div>
-                        <div class="d-flex justify-content-between small text-muted">
-                            <span>${date.substring(0,4)}</span>
-                            <span class="badge bg-secondary">${type.toUpperCase()}</span>
-                        </div>
-                    </div>
-                </button>`;
-            });
-            html += '</div>';
-            resultDiv.innerHTML = html;
-        });
-    }
-
-    function fillForm(data) {
-        document.querySelector('input[name="title"]').value = data.title || data.name;
-        document.querySelector('textarea[name="overview"]').value = data.overview || '';
-        document.querySelector('input[name="release_date"]').value = data.release_date || data.first_air_date || '';
-        document.querySelector('input[name="vote_average"]').value = data.vote_average || '';
-
-        if(data.poster_path) {
-            let pUrl = 'https://image.tmdb.org/t/p/w500' + data.poster_path;
-            document.querySelector('input[name="poster"]').value = pUrl;
-            document.querySelector('.poster-preview').src = pUrl;
-        }
-        if(data.backdrop_path) {
-            document.querySelector('input[name="backdrop"]').value = 'https://image.tmdb.org/t/p/w1280' + data.backdrop_path;
-        }
-
-        let typeSelect = document.querySelector('select[name="type"]');
-        if(data.media_type === 'tv') {
-            typeSelect.value = 'series';
-        } else {
-            typeSelect.value = 'movie';
-        }
-        
-        let adultSelect = document.querySelector('select[name="is_adult"]');
-        if(data.adult === true) {
-            adultSelect.value = 'true';
-        }
-
-        if(data.original_language) {
-             let langMap = {'en': 'English', 'hi': 'Hindi', 'bn': 'Bengali', 'ko': 'Korean', 'ja': 'Japanese', 'ta': 'Tamil', 'te': 'Telugu', 'es': 'Spanish', 'fr': 'French'};
-             let fullLang = langMap[data.original_language] || data.original_language.toUpperCase();
-             document.querySelector('input[name="language"]').value = fullLang;
-        }
-
-        const resDiv = document.getElementById('tmdbResults');
-        resDiv.innerHTML = '<div class="alert alert-success mt-2 text-center"><i class="fas fa-check-circle"></i> Data Applied!<br>Please check fields and click <b>Update</b>.</div>';
-    }
-</script>
+<script src="{{ asset_url('admin.js') }}"></script>
 """
 
 # --- ADMIN SETTINGS TEMPLATE (Updated with Stealth Mode) ---
@@ -1514,38 +2814,398 @@ admin_settings = """
 #        FLASK ROUTES
 # ================================
 
+# --- CONDITIONAL GET (ETag / Last-Modified / Cache-Control) ---
+# টেমপ্লেট বদলালে ভার্সন বদলাবে, ফলে পুরনো ETag আর মিলবে না
+TEMPLATE_VERSION = hashlib.sha1((fake_home_template + index_template + detail_template + season_template + json.dumps(asset_manifest, sort_keys=True)).encode()).hexdigest()[:10]
+LISTING_CACHE_CONTROL = os.getenv("LISTING_CACHE_CONTROL", "public, max-age=30, s-maxage=60, stale-while-revalidate=300")
+DETAIL_CACHE_CONTROL = os.getenv("DETAIL_CACHE_CONTROL", "public, max-age=60, s-maxage=300, stale-while-revalidate=600")
+PRIVATE_CACHE_CONTROL = "private, no-cache"
+
+def as_utc(dt):
+    if not dt: return None
+    return dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt.astimezone(timezone.utc)
+
+def newest(*stamps):
+    stamps = [as_utc(s) for s in stamps if isinstance(s, datetime)]
+    return max(stamps) if stamps else None
+
+def settings_version(curr_settings):
+    """ সেটিংস (অ্যাড কোড, শর্টনার ইত্যাদি) বদলালে পেজের ETag বদলাতে হবে """
+    body = {k: v for k, v in curr_settings.items() if k != '_id'}
+    return hashlib.sha1(repr(sorted(body.items(), key=lambda kv: kv[0])).encode()).hexdigest()[:10]
+
+def content_revision(now):
+    """
+    ফাইল যোগ/স্বাস্থ্য বদলের মতো পরিবর্তন যা লিস্টিং ক্রম (updated_at) বদলানো উচিত নয়, কিন্তু ডিটেইল/API এর
+    ETag আর Last-Modified বদলাতে হবে
+    """
+    return {"$inc": {"content_rev": 1}, "$max": {"revised_at": now}}
+
+def content_stamp(doc):
+    """ ডিটেইল/সিজন/API ETag এর অংশ আর Last-Modified """
+    return (doc.get('updated_at'), doc.get('content_rev', 0)), newest(doc.get('updated_at'), doc.get('revised_at'))
+
+def make_page_etag(*parts):
+    return hashlib.sha1("|".join(str(p) for p in parts).encode()).hexdigest()[:20]
+
+def not_modified(if_none_match, if_modified_since, etag, last_modified):
+    """ হেডার স্ট্রিং থেকে চেক (WSGI ও ASGI দুই মোডে শেয়ার্ড) """
+    if if_none_match:
+        return parse_etags(if_none_match).contains_weak(etag)
+    if if_modified_since and last_modified:
+        since = parse_date(if_modified_since)
+        return bool(since) and last_modified.replace(microsecond=0) <= since
+    return False
+
+def is_not_modified(etag, last_modified):
+    return not_modified(request.headers.get('If-None-Match'), request.headers.get('If-Modified-Since'), etag, last_modified)
+
+def cache_headers(etag, last_modified, cache_control, vary=None):
+    headers = {'ETag': quote_etag(etag, weak=True), 'Cache-Control': cache_control}
+    if last_modified: headers['Last-Modified'] = http_date(last_modified)
+    if vary: headers['Vary'] = vary
+    return headers
+
+# ডিটেইল পেজ: সিজনের শুধু সারাংশ + সর্বশেষ সিজনের এপিসোড; বাকি সিজন /movie/<id>/season/<n> থেকে লেজি লোড
+DETAIL_STAMP_FIELDS = {"updated_at": 1, "content_rev": 1, "revised_at": 1,
+                       "episode_index.season": 1, "episode_index.label": 1, "episode_index.count": 1}
+DETAIL_SERIES_FIELDS = {"files": 0, "episode_index": {"$slice": -1}}
+
+def detail_projection(stamp):
+    """ ইনডেক্স থাকলে files লোড হয় না, episode_index এর শুধু শেষ সিজন আসে """
+    return DETAIL_SERIES_FIELDS if stamp.get('episode_index') else None
+
+def merge_episode_view(movie, stamp):
+    """ সব সিজনের সারাংশ (stamp থেকে) + লোড হওয়া সর্বশেষ সিজন; পুরনো ডকুমেন্টে প্রথমবার ইনডেক্স তৈরি """
+    if stamp.get('episode_index'):
+        movie['episode_index'] = stamp['episode_index'][:-1] + movie.get('episode_index', [])[-1:]
+    elif 'episode_index' not in movie:
+        files = movie.get('files', [])
+        index = build_episode_index(files)
+        movies.update_one({"_id": movie["_id"], "files": {"$size": len(files)}}, {"$set": {"episode_index": index}})
+        movie['episode_index'] = [dict(s, episodes=[]) for s in index[:-1]] + index[-1:]
+    return movie
+
+per_page = 16
+LISTING_SORT = [('updated_at', -1), ('_id', -1)]
+SLIDER_QUERY = {"backdrop": {"$ne": None}}
+SLIDER_SORT = [('created_at', -1)]
+SLIDER_SIZE = 5
+
+HOME_CARD_FIELDS = {"title": 1, "poster": 1, "backdrop": 1, "release_date": 1, "language": 1, "type": 1,
+                    "is_adult": 1, "vote_average": 1, "category": 1, "created_at": 1, "updated_at": 1}
+
+# --- VIEW / DOWNLOAD COUNTERS (write-behind) ---
+# ডিটেইল পেজ ভিউ আর /start ডেলিভারি প্রতিবার Mongo তে $inc না করে প্রসেসের ভিতরে জমা হয়।
+# COUNTER_FLUSH_INTERVAL পর পর (বা COUNTER_MAX_PENDING কী জমে গেলে আগেই) একটা unordered bulk_write এ
+# movies.views/downloads আর ঘণ্টা ও দিনের বাকেটে (movie_stats) যায়। ক্র্যাশে সর্বোচ্চ এক ইন্টারভালের কাউন্ট হারায়।
+# দুই কালেকশন আলাদা লেখা হয়; ব্যর্থ হলে শুধু যে অপারেশনগুলো লেখা হয়নি সেগুলোই পরের ফ্লাশে আবার যায়
+# (যেটা সফল হয়েছে তার কাউন্ট দ্বিতীয়বার যোগ হয় না)।
+COUNTER_FLUSH_INTERVAL = int(os.getenv("COUNTER_FLUSH_INTERVAL", 10))
+COUNTER_MAX_PENDING = 5000
+COUNTER_HOURLY_RETENTION = timedelta(days=8)
+COUNTER_DAILY_RETENTION = timedelta(days=400)
+TRENDING_INTERVAL = int(os.getenv("TRENDING_INTERVAL", 900))
+TRENDING_WINDOW_HOURS = 72
+TRENDING_HALF_LIFE_HOURS = 24
+TRENDING_DOWNLOAD_WEIGHT = 3     # একটা ডাউনলোড = ৩টা ভিউ
+TRENDING_SORT = [('trending_score', -1), ('updated_at', -1), ('_id', -1)]
+TRENDING_JOB_ID = "trending"
+
+class CounterBuffer:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = {}         # (movie_id, ঘণ্টার শুরু) -> [views, downloads]
+        self.retry = {}           # কালেকশন -> আগের ফ্লাশে লেখা হয়নি এমন UpdateOne গুলো
+        self.wake = threading.Event()
+        self.flushed = 0
+        self.dropped = 0
+        self.flushed_at = None
+
+    def incr(self, movie_id, field):
+        """ field: 0 = view, 1 = download """
+        hour = utc_now().replace(minute=0, second=0, microsecond=0)
+        with self.lock:
+            counts = self.pending.get((movie_id, hour))
+            if counts is None:
+                counts = self.pending[(movie_id, hour)] = [0, 0]
+                if len(self.pending) >= COUNTER_MAX_PENDING: self.wake.set()
+            counts[field] += 1
+
+    def view(self, movie_id): self.incr(movie_id, 0)
+    def download(self, movie_id): self.incr(movie_id, 1)
+
+    @staticmethod
+    def _ops(pending):
+        totals, stats_ops = {}, []
+        for (movie_id, hour), (views, downloads) in pending.items():
+            total = totals.setdefault(movie_id, [0, 0])
+            total[0] += views
+            total[1] += downloads
+            inc = {"views": views, "downloads": downloads}
+            day = hour.replace(hour=0)
+            for period, start, retention in (("hour", hour, COUNTER_HOURLY_RETENTION), ("day", day, COUNTER_DAILY_RETENTION)):
+                stats_ops.append(UpdateOne(
+                    {"_id": f"{movie_id}:{period[0]}:{start.strftime('%Y%m%d%H')}"},
+                    {"$inc": inc, "$setOnInsert": {"movie_id": movie_id, "period": period, "at": start, "expires_at": start + retention}},
+                    upsert=True))
+        movie_ops = [UpdateOne({"_id": movie_id}, {"$inc": {"views": v, "downloads": d}}) for movie_id, (v, d) in totals.items()]
+        return movie_ops, stats_ops
+
+    @staticmethod
+    def _write(collection, ops):
+        """ রিটার্ন: (লেখা হয়নি এমন অপারেশন, এরর) """
+        try:
+            collection.bulk_write(ops, ordered=False)
+            return [], None
+        except BulkWriteError as e:
+            # unordered: writeErrors এর বাইরের সব অপারেশন লেখা হয়ে গেছে
+            return [ops[err["index"]] for err in e.details.get("writeErrors", [])], e
+        except Exception as e:
+            return ops, e
+
+    def flush(self):
+        with self.lock:
+            pending, self.pending = self.pending, {}
+            retry, self.retry = self.retry, {}
+        if not pending and not retry: return 0
+        movie_ops, stats_ops = self._ops(pending)
+        error = None
+        for collection, ops in ((movies, movie_ops), (movie_stats, stats_ops)):
+            ops = retry.get(collection.name, []) + ops
+            if not ops: continue
+            failed, e = self._write(collection, ops)
+            if not failed: continue
+            error = error or e
+            # সীমা ছাড়ালে বাদ
+            with self.lock:
+                queue = self.retry.setdefault(collection.name, [])
+                keep = max(4 * COUNTER_MAX_PENDING - len(queue), 0)
+                queue.extend(failed[:keep])
+                self.dropped += len(failed[keep:])
+        if error: raise error
+        self.flushed += sum(v + d for v, d in pending.values())
+        self.flushed_at = utc_now()
+        return len(pending)
+
+    def snapshot(self):
+        return {'pending_keys': len(self.pending), 'retry_ops': sum(map(len, self.retry.values())),
+                'flushed': self.flushed, 'dropped': self.dropped,
+                'flushed_at': self.flushed_at and as_utc(self.flushed_at).isoformat()}
+
+counters = CounterBuffer()
+atexit.register(lambda: counters.flush() if counters.pending or counters.retry else None)
+
+def start_counter_flush():
+    movie_stats.create_index("expires_at", expireAfterSeconds=0)
+    movie_stats.create_index([("period", 1), ("at", 1)])
+    while True:
+        counters.wake.wait(COUNTER_FLUSH_INTERVAL)
+        counters.wake.clear()
+        try:
+            counters.flush()
+        except Exception as e:
+            print(f"Counter Flush Error: {e}")
+
+def compute_trending():
+    """
+    শেষ TRENDING_WINDOW_HOURS এর ঘণ্টার বাকেট থেকে decayed স্কোর: (views + 3*downloads) * 0.5^(বয়স/২৪ঘণ্টা)।
+    home(sort=trending) শুধু trending_score ইনডেক্স দিয়ে সর্ট করে, রিকোয়েস্টে কোনো হিসাব নেই।
+    """
+    now = utc_now()
+    scores = {}
+    for bucket in movie_stats.find({"period": "hour", "at": {"$gte": now - timedelta(hours=TRENDING_WINDOW_HOURS)}}):
+        age_hours = max((now - bucket["at"]).total_seconds() / 3600, 0)
+        weight = bucket.get("views", 0) + TRENDING_DOWNLOAD_WEIGHT * bucket.get("downloads", 0)
+        scores[bucket["movie_id"]] = scores.get(bucket["movie_id"], 0) + weight * 0.5 ** (age_hours / TRENDING_HALF_LIFE_HOURS)
+    ops = [UpdateOne({"_id": movie_id}, {"$set": {"trending_score": round(score, 4)}}) for movie_id, score in scores.items()]
+    ops += [UpdateOne({"_id": doc["_id"]}, {"$set": {"trending_score": 0}})
+            for doc in movies.find({"trending_score": {"$gt": 0}}, {"_id": 1}) if doc["_id"] not in scores]
+    if ops: movies.bulk_write(ops, ordered=False)
+    admin_jobs.update_one({"_id": TRENDING_JOB_ID}, {"$set": {"computed_at": now, "titles": len(scores)}}, upsert=True)
+    trending_state.update(version=now, checked=time.monotonic())
+    return len(scores)
+
+def start_trending():
+    movies.create_index(TRENDING_SORT)
+    while True:
+        try:
+            if singleton_active(): compute_trending()
+        except Exception as e:
+            print(f"Trending Error: {e}")
+        time.sleep(TRENDING_INTERVAL)
+
+trending_state = {"version": None, "checked": 0}
+
+def trending_version():
+    """ শেষ স্কোর হিসাবের সময় (ETag এর জন্য); অন্য প্রসেস হিসাব করে বলে এক মিনিট পর পর আবার পড়া হয় """
+    if time.monotonic() - trending_state["checked"] > 60:
+        job = admin_jobs.find_one({"_id": TRENDING_JOB_ID}, {"computed_at": 1}) or {}
+        trending_state.update(version=job.get("computed_at"), checked=time.monotonic())
+    return trending_state["version"]
+
+def listing_sort(sort_by):
+    return TRENDING_SORT if sort_by == 'trending' else LISTING_SORT
+
+# --- MATERIALIZED HOME FEED ---
+# ফিল্টার ছাড়া হোমপেজ (এবং type=movie/series) একটা ছোট ডকুমেন্ট থেকে সার্ভ হয়: স্লাইডার, ক্যাটাগরি,
+# আর প্রতিটা টাইপের প্রথম কয়েক পেজের কার্ড। ইনজেস্টে ইনক্রিমেন্টাল আপডেট, এডমিন অ্যাকশনে পুরো রিবিল্ড।
+HOME_FEED_ID = "home"
+HOME_FEED_PAGES = int(os.getenv("HOME_FEED_PAGES", 3))
+HOME_FEED_MAX_AGE = int(os.getenv("HOME_FEED_MAX_AGE", 600))  # সরাসরি DB এডিটের ড্রিফট ঠেকাতে নিয়মিত রিবিল্ড
+FEED_TYPES = ("movie", "series")
+
+def feed_size():
+    return HOME_FEED_PAGES * per_page
+
+def feed_card(movie):
+    return {k: movie.get(k) for k in HOME_CARD_FIELDS if k in movie} | {"_id": movie["_id"]}
+
+def listing_sort_key(card):
+    return (as_utc(card.get('updated_at')) or datetime.min.replace(tzinfo=timezone.utc), card["_id"])
+
+def rebuild_home_feed():
+    """ পুরো ফিড নতুন করে তৈরি (এডমিন এডিট, ডিলিট, বাল্ক অ্যাকশন, অটো-ইমপোর্টের পর) """
+    try:
+        lists = {}
+        for key in ("all",) + FEED_TYPES:
+            db_query = build_listing_query('', '', '' if key == "all" else key)
+            items = list(movies.find(db_query, HOME_CARD_FIELDS).sort(LISTING_SORT).limit(feed_size()))
+            lists[key] = {"items": items, "total": movies.count_documents(db_query)}
+        body = {
+            "lists": lists,
+            "slider": list(movies.find(SLIDER_QUERY, HOME_CARD_FIELDS).sort(SLIDER_SORT).limit(SLIDER_SIZE)),
+            "categories": [{"name": c.get("name")} for c in categories.find()],
+            "built_at": utc_now(),
+        }
+        return home_feed.find_one_and_update({"_id": HOME_FEED_ID}, {"$set": body, "$inc": {"version": 1}},
+                                             upsert=True, return_document=ReturnDocument.AFTER)
+    except Exception as e:
+        print(f"❌ Home Feed Rebuild Error: {e}")
+        return None
+
+def apply_feed_change(feed, movie, is_new):
+    """ একটা মুভির কার্ড ফিডে বসায় (পুরনোটা সরিয়ে, সর্ট অর্ডার অনুযায়ী); নতুন হলে কাউন্ট বাড়ে """
+    card = feed_card(movie)
+    changes = {}
+    for key in ("all", movie.get("type")):
+        listing = feed["lists"].get(key)
+        if listing is None: continue
+        items = [c for c in listing["items"] if c["_id"] != card["_id"]] + [card]
+        items.sort(key=listing_sort_key, reverse=True)
+        changes[f"lists.{key}.items"] = items[:feed_size()]
+        if is_new: changes[f"lists.{key}.total"] = listing["total"] + 1
+
+    slider = feed.get("slider", [])
+    if any(s["_id"] == card["_id"] for s in slider):
+        changes["slider"] = [card if s["_id"] == card["_id"] else s for s in slider]
+    elif is_new and card.get("backdrop"):
+        changes["slider"] = ([card] + slider)[:SLIDER_SIZE]
+    return changes
+
+def touch_home_feed(movie, is_new=False):
+    """
+    ইনজেস্টের পর ইনক্রিমেন্টাল আপডেট। version মিললে তবেই লেখে (optimistic concurrency),
+    কয়েকবার কনফ্লিক্ট হলে পুরো রিবিল্ড।
+    """
+    try:
+        for _ in range(3):
+            feed = home_feed.find_one({"_id": HOME_FEED_ID})
+            if not feed: break
+            result = home_feed.update_one({"_id": HOME_FEED_ID, "version": feed["version"]},
+                                          {"$set": apply_feed_change(feed, movie, is_new), "$inc": {"version": 1}})
+            if result.modified_count: return
+    except Exception as e:
+        print(f"⚠️ Home Feed Update Error: {e}")
+    rebuild_home_feed()
+
+def feed_is_fresh(feed):
+    built_at = as_utc(feed.get("built_at")) if feed else None
+    return bool(built_at) and (as_utc(utc_now()) - built_at).total_seconds() < HOME_FEED_MAX_AGE
+
+def load_home_feed():
+    feed = home_feed.find_one({"_id": HOME_FEED_ID})
+    return feed if feed_is_fresh(feed) else rebuild_home_feed()
+
+def serves_from_feed(page, query, cat_filter, type_filter, sort_by=''):
+    return not query and not cat_filter and not sort_by and type_filter in ('',) + FEED_TYPES and 1 <= page <= HOME_FEED_PAGES
+
+def feed_page(feed, page, type_filter):
+    """ ফিড থেকে এক পেজ: (movie_list, has_next, slider, categories, latest_updated_at) """
+    listing = feed["lists"][type_filter or "all"]
+    start = (page - 1) * per_page
+    movie_list = listing["items"][start:start + per_page]
+    latest = listing["items"][0].get("updated_at") if listing["items"] else None
+    slider = feed.get("slider", []) if not type_filter else []
+    return movie_list, page * per_page < listing["total"], slider, feed.get("categories", []), latest
+
+def build_listing_query(query, cat_filter, type_filter):
+    """ হোমপেজের সার্চ / ক্যাটাগরি / টাইপ ফিল্টার থেকে Mongo কুয়েরি """
+    db_query = {}
+    if query: db_query["title"] = {"$regex": query, "$options": "i"}
+    if cat_filter: db_query["category"] = cat_filter
+    if type_filter: db_query["type"] = type_filter
+    return db_query
+
 @app.route('/')
 def home():
     # --- STEALTH MODE CHECK ---
-    curr_settings = settings.find_one() or {}
-    if curr_settings.get('stealth_mode', False):
+    curr_settings = get_site_settings()
+    stealth = curr_settings.get('stealth_mode', False)
+    if stealth:
         # যদি Stealth Mode অন থাকে, তবে চেক করুন ইউজার এডমিন কিনা
         # যদি এডমিন না হয়, তবে ফেইক হোমপেজ দেখান
         if not check_auth():
-            return render_template_string(fake_home_template)
+            etag = make_page_etag('fake', TEMPLATE_VERSION)
+            headers = cache_headers(etag, None, LISTING_CACHE_CONTROL, vary='Authorization')
+            if is_not_modified(etag, None): return Response(status=304, headers=headers)
+            return make_response(render_template_string(fake_home_template), 200, headers)
 
     page = int(request.args.get('page', 1))
-    per_page = 16
     query = request.args.get('q', '').strip()
     cat_filter = request.args.get('cat', '').strip()
     type_filter = request.args.get('type', '').strip()
+    sort_by = request.args.get('sort', '').strip()
     
-    db_query = {}
-    if query: db_query["title"] = {"$regex": query, "$options": "i"}
-    if cat_filter: db_query["category"] = cat_filter
-    if type_filter: db_query["type"] = type_filter
-
+    cache_control = PRIVATE_CACHE_CONTROL if stealth else LISTING_CACHE_CONTROL
+    vary = 'Authorization' if stealth else None
+
+    # ডিফল্ট হোমপেজ: একটা ফিড ডকুমেন্ট রিড, কোনো কাউন্ট/সর্ট কুয়েরি নেই
+    feed = load_home_feed() if serves_from_feed(page, query, cat_filter, type_filter, sort_by) else None
+    if feed:
+        movie_list, has_next, slider_movies, cat_list, latest = feed_page(feed, page, type_filter)
+        last_modified = newest(latest, curr_settings.get('updated_at'))
+        etag = make_page_etag('home-feed', TEMPLATE_VERSION, settings_version(curr_settings), page, type_filter, feed['version'])
+        headers = cache_headers(etag, last_modified, cache_control, vary=vary)
+        if is_not_modified(etag, last_modified): return Response(status=304, headers=headers)
+        html = render_template_string(index_template, movies=movie_list, categories=cat_list, selected_cat='', query='', slider_movies=slider_movies, page=page, has_next=has_next)
+        return make_response(html, 200, headers)
+
+    db_query = build_listing_query(query, cat_filter, type_filter)
+
+    # 304 চেক: কাউন্ট + সর্বশেষ updated_at (projected) দিয়ে ETag, রেন্ডার ছাড়াই
+    sort = listing_sort(sort_by)
     total_movies = movies.count_documents(db_query)
-    movie_list = list(movies.find(db_query).sort([('updated_at', -1), ('_id', -1)]).skip((page-1)*per_page).limit(per_page))
+    latest = movies.find_one(db_query, {"updated_at": 1}, sort=sort) or {}
     cat_list = list(categories.find())
+    last_modified = newest(latest.get('updated_at'), curr_settings.get('updated_at'))
+    # trending এ ক্রম updated_at ছাড়াই বদলায়, তাই স্কোর হিসাবের সময়ও ETag এ
+    etag = make_page_etag('home', TEMPLATE_VERSION, settings_version(curr_settings), page, query, cat_filter, type_filter,
+                          total_movies, latest.get('_id'), latest.get('updated_at'), [c.get('name') for c in cat_list],
+                          sort_by, trending_version() if sort is TRENDING_SORT else None)
+    headers = cache_headers(etag, last_modified, cache_control, vary=vary)
+    if is_not_modified(etag, last_modified): return Response(status=304, headers=headers)
+
+    movie_list = list(movies.find(db_query, HOME_CARD_FIELDS).sort(sort).skip((page-1)*per_page).limit(per_page))
     
     slider_movies = []
-    if not query and not cat_filter and not type_filter:
-        slider_movies = list(movies.find({"backdrop": {"$ne": None}}).sort([('created_at', -1)]).limit(5))
+    if not query and not cat_filter and not type_filter and not sort_by:
+        slider_movies = list(movies.find(SLIDER_QUERY, HOME_CARD_FIELDS).sort(SLIDER_SORT).limit(SLIDER_SIZE))
 
     has_next = (page * per_page) < total_movies
 
-    return render_template_string(index_template, movies=movie_list, categories=cat_list, selected_cat=cat_filter, query=query, slider_movies=slider_movies, page=page, has_next=has_next)
+    html = render_template_string(index_template, movies=movie_list, categories=cat_list, selected_cat=cat_filter, query=query, slider_movies=slider_movies, page=page, has_next=has_next)
+    return make_response(html, 200, headers)
 
 @app.route('/movies')
 def view_movies():
@@ -1558,19 +3218,51 @@ def view_series():
 @app.route('/movie/<movie_id>')
 def movie_detail(movie_id):
     try:
-        movie = movies.find_one({"_id": ObjectId(movie_id)})
+        oid = ObjectId(movie_id)
+        # শুধু স্ট্যাম্প প্রজেকশন দিয়ে ETag; মিলে গেলে 304 (কোনো রেন্ডার নেই)
+        stamp = movies.find_one({"_id": oid}, DETAIL_STAMP_FIELDS)
+        if not stamp: return "Content Removed or Not Found", 404
+        counters.view(oid)
+        curr_settings = get_site_settings()
+        revision, changed_at = content_stamp(stamp)
+        last_modified = newest(changed_at, curr_settings.get('updated_at'))
+        etag = make_page_etag('detail', TEMPLATE_VERSION, settings_version(curr_settings), movie_id, revision)
+        headers = cache_headers(etag, last_modified, DETAIL_CACHE_CONTROL)
+        if is_not_modified(etag, last_modified): return Response(status=304, headers=headers)
+
+        movie = movies.find_one({"_id": oid}, detail_projection(stamp))
         if not movie: return "Content Removed or Not Found", 404
+        merge_episode_view(movie, stamp)
         # Inject Admin Contact URL into template context
-        return render_template_string(detail_template, movie=movie, ADMIN_CONTACT_URL=ADMIN_CONTACT_URL)
+        html = render_template_string(detail_template, movie=movie, ADMIN_CONTACT_URL=ADMIN_CONTACT_URL)
+        return make_response(html, 200, headers)
     except:
         return "Invalid ID", 400
 
+@app.route('/movie/<movie_id>/season/<int:season_no>')
+def movie_season(movie_id, season_no):
+    """ একটা সিজনের এপিসোড লিস্ট (HTML ফ্র্যাগমেন্ট), ডিটেইল পেজে সিজন খুললে লোড হয় """
+    if not ObjectId.is_valid(movie_id): return "Invalid ID", 400
+    movie = movies.find_one({"_id": ObjectId(movie_id)}, {"updated_at": 1, "content_rev": 1, "revised_at": 1,
+                                                          "episode_index": {"$elemMatch": {"season": season_no}}})
+    if not movie or not movie.get('episode_index'): return "Season Not Found", 404
+    curr_settings = get_site_settings()
+    revision, changed_at = content_stamp(movie)
+    last_modified = newest(changed_at, curr_settings.get('updated_at'))
+    etag = make_page_etag('season', TEMPLATE_VERSION, settings_version(curr_settings), movie_id, season_no, revision)
+    headers = cache_headers(etag, last_modified, DETAIL_CACHE_CONTROL)
+    if is_not_modified(etag, last_modified): return Response(status=304, headers=headers)
+    return make_response(render_template_string(season_template, season=movie['episode_index'][0], movie_id=movie['_id']), 200, headers)
+
 # --- NEW: AUTO DMCA DELETE ROUTE ---
 @app.route('/dmca/report/<movie_id>')
 def dmca_delete(movie_id):
     """ Allows instant removal of content to comply with DMCA without admin intervention """
     try:
         movies.delete_one({"_id": ObjectId(movie_id)})
+        reports.delete_one({"_id": ObjectId(movie_id)})
+        rebuild_home_feed()
+        suggest_index.remove(movie_id)
         return """
         <div style='text-align:center; padding:50px; font-family:sans-serif;'>
             <h1 style='color:green;'>Content Removed Successfully</h1>
@@ -1583,27 +3275,220 @@ def dmca_delete(movie_id):
         return "Error deleting file", 500
 
 # --- NEW: REPORT BROKEN LINK ROUTE ---
-@app.route('/report/broken/<movie_id>')
-def report_broken(movie_id):
-    """ Sends a notification to the admin channel about broken link """
-    try:
-        movie = movies.find_one({"_id": ObjectId(movie_id)})
-        if movie and SOURCE_CHANNEL_ID:
-            report_msg = f"⚠️ *BROKEN LINK REPORTED*\n\n🎬 Title: {movie.get('title')}\n🆔 ID: {movie_id}\n\nPlease check the files."
-            payload = {'chat_id': SOURCE_CHANNEL_ID, 'text': report_msg, 'parse_mode': 'Markdown'}
-            requests.post(f"{TELEGRAM_API_URL}/sendMessage", json=payload)
-        
-        return """
+# প্রতি ক্লিকে টেলিগ্রাম মেসেজ না পাঠিয়ে শুধু কাউন্টার বাড়ে (মুভি প্রতি একটা ডকুমেন্ট, এক upsert)।
+# send_report_digest পর্যায়ক্রমে সবচেয়ে বেশি রিপোর্ট হওয়া টাইটেলগুলো একটা মেসেজে পাঠায়।
+REPORT_DIGEST_INTERVAL = int(os.getenv("REPORT_DIGEST_INTERVAL", 1800))
+REPORT_DIGEST_TOP = 10
+REPORT_FILE_CODE_RE = re.compile(r'^[A-Za-z0-9-]{1,36}$')
+REPORT_MAX_FILES = 20    # রিপোর্ট ডকুমেন্টে ফাইল প্রতি কাউন্টার সর্বোচ্চ এতগুলো (ডাইজেস্টের সময় বাকিগুলো ছাঁটা হয়)
+REPORT_THANKS_HTML = """
         <div style='text-align:center; padding:50px; font-family:sans-serif;'>
-            <h1 style='color:#007bff;'>Report Sent!</h1>
-            <p>Admin has been notified. We will fix the link soon.</p>
+            <h1 style='color:#007bff;'>Reported, thanks!</h1>
+            <p>Reported links are reviewed regularly. We will fix it soon.</p>
             <a href='javascript:history.back()' style='background:#333; color:white; padding:10px 20px; text-decoration:none; border-radius:5px;'>Go Back</a>
         </div>
         """
-    except:
+
+def record_broken_report(movie_id, file_code=None):
+    """
+    মুভি আর (থাকলে) ফাইলের কাউন্টার এক upsert এ; pending = শেষ ডাইজেস্টের পর কতগুলো।
+    ফাইল কোড শুধু টাইটেলে সত্যিই থাকলে গোনা হয়, যাতে বানানো কোড দিয়ে files ম্যাপ বাড়ানো না যায়।
+    """
+    now = utc_now()
+    inc = {"count": 1, "pending": 1}
+    if file_code and movies.find_one({"_id": movie_id, "files.unique_code": file_code}, {"_id": 1}):
+        inc[f"files.{file_code}"] = 1
+    reports.update_one({"_id": movie_id},
+                       {"$inc": inc, "$setOnInsert": {"first_at": now}, "$max": {"last_at": now}}, upsert=True)
+
+@app.route('/report/broken/<movie_id>')
+def report_broken(movie_id):
+    """ Counts a broken link report; the admin channel gets a periodic digest instead of one message per click """
+    if not ObjectId.is_valid(movie_id): return "Invalid ID", 400
+    file_code = request.args.get('file')
+    try:
+        record_broken_report(ObjectId(movie_id), file_code if file_code and REPORT_FILE_CODE_RE.match(file_code) else None)
+    except Exception as e:
+        print(f"Report Error: {e}")
         return "Error sending report", 500
+    return REPORT_THANKS_HTML
+
+def plain_title(text):
+    # Markdown মেসেজে টাইটেলের _ * ` [ ফরম্যাটিং ভেঙে দেয়
+    return re.sub(r'[_*`\[]', '', text or 'Unknown')
+
+def send_report_digest(limit=REPORT_DIGEST_TOP):
+    """
+    শেষ ডাইজেস্টের পর রিপোর্ট হওয়া টাইটেলগুলোর টপ লিস্ট একটা মেসেজে পাঠিয়ে pending কমায়
+    (পড়া মান বিয়োগ হয়, তাই এর মাঝে আসা রিপোর্ট পরের ডাইজেস্টে থাকে)। মুছে ফেলা মুভির রিপোর্ট বাদ যায়,
+    আর ফাইল কাউন্টারের মধ্যে মুছে ফেলা ফাইলগুলো আর REPORT_MAX_FILES এর বাইরের কমগুলো ছাঁটা হয়।
+    """
+    pending = list(reports.find({"pending": {"$gt": 0}}).sort("pending", -1))
+    if not pending: return 0
+    titles = {m["_id"]: m for m in movies.find({"_id": {"$in": [r["_id"] for r in pending]}},
+                                               {"title": 1, "files.unique_code": 1, "files.quality": 1, "files.episode_label": 1})}
+    gone = [r["_id"] for r in pending if r["_id"] not in titles]
+    if gone: reports.delete_many({"_id": {"$in": gone}})
+    pending = [r for r in pending if r["_id"] in titles]
+
+    if pending and SOURCE_CHANNEL_ID:
+        lines = [f"⚠️ *BROKEN LINK REPORTS* ({sum(r['pending'] for r in pending)} new)\n"]
+        for n, report in enumerate(pending[:limit], 1):
+            movie = titles[report["_id"]]
+            line = f"{n}. {plain_title(movie.get('title'))}: {report['pending']} new / {report['count']} total"
+            if report.get("files"):
+                code = max(report["files"], key=report["files"].get)
+                file = next((f for f in movie.get("files", []) if f.get("unique_code") == code), None)
+                if file: line += f" (worst: {plain_title(file.get('episode_label') or file.get('quality'))})"
+            lines.append(line)
+        if len(pending) > limit: lines.append(f"\n…and {len(pending) - limit} more titles")
+        if WEBSITE_URL: lines.append(f"\n{WEBSITE_URL.rstrip('/')}/admin/reports")
+        tg_post("sendMessage", {'chat_id': SOURCE_CHANNEL_ID, 'text': "\n".join(lines), 'parse_mode': 'Markdown',
+                                'disable_web_page_preview': True})
+    if pending:
+        reports.bulk_write([UpdateOne({"_id": r["_id"]}, report_digest_update(r, titles[r["_id"]])) for r in pending], ordered=False)
+    return len(pending)
+
+def report_digest_update(report, movie):
+    update = {"$inc": {"pending": -report["pending"]}}
+    counts = report.get("files") or {}
+    existing = {f.get("unique_code") for f in movie.get("files", [])}
+    keep = set(sorted((c for c in counts if c in existing), key=counts.get, reverse=True)[:REPORT_MAX_FILES])
+    drop = [c for c in counts if c not in keep]
+    if drop: update["$unset"] = {f"files.{c}": "" for c in drop}
+    return update
+
+def start_report_digest():
+    reports.create_index([("count", -1)])
+    while True:
+        time.sleep(REPORT_DIGEST_INTERVAL)
+        try:
+            if singleton_active(): send_report_digest()
+        except Exception as e:
+            print(f"Report Digest Error: {e}")
+
+# --- FILE HEALTH CHECKER ---
+# ব্যবহারকারী ক্লিক করে খালি হাতে ফেরার আগেই মরা file_id খুঁজে বের করে। getFile সবচেয়ে হালকা কল
+# (কিছু পাঠায় না); ২০MB এর বড় ফাইলে "file is too big" আসে, মানে file_id ঠিকই আছে।
+# অগ্রাধিকার: রিপোর্ট হওয়া টাইটেল, তারপর কখনো চেক হয়নি / সবচেয়ে পুরনো চেক, তারপর রেটিং আর নতুনত্ব।
+FILE_CHECK_INTERVAL = int(os.getenv("FILE_CHECK_INTERVAL", 600))          # রাউন্ডের মাঝে বিরতি
+FILE_CHECK_RATE = float(os.getenv("FILE_CHECK_RATE", 5))                  # getFile কল / সেকেন্ড
+FILE_CHECK_ROUND_CALLS = int(os.getenv("FILE_CHECK_ROUND_CALLS", 500))    # এক রাউন্ডে সর্বোচ্চ কল
+FILE_RECHECK_AFTER = int(os.getenv("FILE_RECHECK_DAYS", 7)) * 86400
+FILE_HEALTH_HIDE_BROKEN = os.getenv("FILE_HEALTH_HIDE_BROKEN", "0") == "1"  # না হলে শুধু ফ্ল্যাগ দেখায়
+FILE_HEALTHY_ERRORS = ("file is too big",)
+FILE_BROKEN_ERRORS = ("wrong file identifier", "wrong remote file identifier", "invalid file_id")
+FILE_HEALTH_JOB_ID = "file_health"
+file_check_lock = threading.Lock()
+
+def classify_file_response(status_code, data):
+    """ getFile / send* এর রেসপন্স -> ('ok' | 'broken' | 'retry' | None, বিবরণ বা retry সেকেন্ড) """
+    if data.get("ok"): return "ok", None
+    description = data.get("description") or f"HTTP {status_code}"
+    if status_code == 429:
+        return "retry", (data.get("parameters") or {}).get("retry_after", 5)
+    lowered = description.lower()
+    if any(e in lowered for e in FILE_HEALTHY_ERRORS): return "ok", None
+    if status_code == 400 and any(e in lowered for e in FILE_BROKEN_ERRORS): return "broken", description
+    # সার্ভার/নেটওয়ার্ক সমস্যা বা অচেনা এরর: কিছু লেখা হয় না, পরের রাউন্ডে আবার
+    return None, description
+
+def check_file_id(file_id):
+    resp = tg_post("getFile", {"file_id": file_id})
+    try: data = resp.json()
+    except ValueError: data = {}
+    return classify_file_response(resp.status_code, data)
+
+def file_health_update(movie_id, file_id, state, detail, now):
+    return UpdateOne({"_id": movie_id, "files.file_id": file_id},
+                     {"$set": {"files.$.health": state, "files.$.checked_at": now, "files.$.check_error": detail}})
+
+def mark_file_broken(movie_id, file_id, detail):
+    """ ডেলিভারির সময় Telegram file_id প্রত্যাখ্যান করলে পরের রাউন্ডের অপেক্ষা না করে সাথে সাথে ফ্ল্যাগ """
+    now = utc_now()
+    movies.bulk_write([file_health_update(movie_id, file_id, "broken", detail, now),
+                       UpdateOne({"_id": movie_id}, content_revision(now))])
+    refresh_episode_index(movie_id)
+
+def file_check_candidates(limit):
+    stale = utc_now() - timedelta(seconds=FILE_RECHECK_AFTER)
+    due = {"files.0": {"$exists": True},
+           "$or": [{"health_checked_at": {"$exists": False}}, {"health_checked_at": {"$lt": stale}}]}
+    fields = {"title": 1, "files.file_id": 1, "files.health": 1, "files.checked_at": 1}
+    reported = [r["_id"] for r in reports.find({}, {"_id": 1}).sort("count", -1).limit(limit)]
+    picked = list(movies.find({**due, "_id": {"$in": reported}}, fields)) if reported else []
+    if len(picked) < limit:
+        picked += movies.find({**due, "_id": {"$nin": reported}}, fields) \
+                        .sort([("health_checked_at", 1), ("vote_average", -1), ("created_at", -1)]).limit(limit - len(picked))
+    return picked
+
+def verify_files_round(max_calls=FILE_CHECK_ROUND_CALLS):
+    """ রেট বাজেটের (FILE_CHECK_RATE কল/সেকেন্ড, সর্বোচ্চ max_calls) মধ্যে এক রাউন্ড; একসাথে একটাই চলে """
+    if not file_check_lock.acquire(blocking=False): return None
+    stats = {"titles": 0, "checked": 0, "broken": 0, "recovered": 0, "unknown": 0, "started_at": utc_now()}
+    try:
+        calls = 0
+        stale = utc_now() - timedelta(seconds=FILE_RECHECK_AFTER)
+        for movie in file_check_candidates(max(max_calls // 4, 10)):
+            if calls >= max_calls: break
+            ops, changed, finished = [], False, True
+            for f in movie.get("files", []):
+                file_id = f.get("file_id") or ""
+                # এক্সপোর্ট থেকে আসা ফাইলের file_id নেই (copyMessage এ যায়), getFile দিয়ে চেক করা যায় না
+                if file_id.startswith(EXPORT_FILE_PREFIX): continue
+                # আগের অসম্পূর্ণ রাউন্ডে চেক হয়ে গেছে
+                if f.get("checked_at") and f["checked_at"] >= stale: continue
+                # বাজেট শেষ: বড় সিরিজের মাঝপথে থামা, বাকি ফাইল পরের রাউন্ডে (টাইটেল তখনও due থাকে)
+                if calls >= max_calls:
+                    finished = False
+                    break
+                state, detail = check_file_id(file_id)
+                calls += 1
+                if state == "retry":
+                    time.sleep(detail)
+                    state, detail = check_file_id(file_id)
+                time.sleep(1 / FILE_CHECK_RATE)
+                if state not in ("ok", "broken"):
+                    stats["unknown"] += 1
+                    continue
+                stats["checked"] += 1
+                if state == "broken": stats["broken"] += 1
+                if state == "ok" and f.get("health") == "broken": stats["recovered"] += 1
+                changed |= state != f.get("health", "ok")
+                ops.append(file_health_update(movie["_id"], file_id, state, detail, utc_now()))
+            now = utc_now()
+            # অবস্থা বদলালে content_rev বাড়ে, যাতে ডিটেইল পেজের ETag বদলায় (updated_at না, লিস্টিং ক্রম ঠিক থাকে)
+            title_update = {"$set": {"health_checked_at": now}} if finished else {}
+            if changed: title_update = {**title_update, **content_revision(now)}
+            if title_update: ops.append(UpdateOne({"_id": movie["_id"]}, title_update))
+            if ops: movies.bulk_write(ops, ordered=False)
+            if changed: refresh_episode_index(movie["_id"])
+            stats["titles"] += finished
+    finally:
+        stats["finished_at"] = utc_now()
+        admin_jobs.update_one({"_id": FILE_HEALTH_JOB_ID}, {"$set": {"last_round": stats}}, upsert=True)
+        file_check_lock.release()
+    return stats
+
+def start_file_checker():
+    movies.create_index([("health_checked_at", 1)])
+    movies.create_index([("files.health", 1)], sparse=True)
+    while True:
+        time.sleep(FILE_CHECK_INTERVAL)
+        try:
+            if singleton_active() and BOT_TOKEN:
+                stats = verify_files_round()
+                if stats and stats["broken"]: print(f"🩺 File check: {stats['broken']} broken of {stats['checked']} checked")
+        except Exception as e:
+            # ব্রেকার খোলা (CircuitOpenError) বা নেটওয়ার্ক সমস্যা: এই রাউন্ড শেষ, পরে আবার
+            print(f"File Check Error: {e}")
 
 # --- SERVER SIDE SHORTENER PROXY (FIX FOR CORS) ---
+def shortener_api_url(original_url, api_key, domain):
+    # URL Encode the original URL for the API call
+    encoded_url = urllib.parse.quote(original_url)
+    return f"{SHORTENER_SCHEME}://{domain}/api?api={api_key}&url={encoded_url}"
+
 @app.route('/api/shorten')
 def shorten_link_proxy():
     original_url = request.args.get('url')
@@ -1613,21 +3498,427 @@ def shorten_link_proxy():
     if not original_url or not api_key or not domain:
         return jsonify({'status': 'error', 'message': 'Missing parameters'})
 
-    # URL Encode the original URL for the API call
-    encoded_url = urllib.parse.quote(original_url)
-    api_url = f"https://{domain}/api?api={api_key}&url={encoded_url}"
+    api_url = shortener_api_url(original_url, api_key, domain)
 
     try:
         # Server-side request (Bypasses Browser CORS)
-        resp = requests.get(api_url, timeout=10)
-        try:
-            data = resp.json()
-            return jsonify(data)
-        except:
-            # If response is not JSON (some shorteners return raw text)
-            return jsonify({'status': 'error', 'raw': resp.text})
+        resp = breakers["shortener"].call(requests.get, api_url)
     except Exception as e:
-        return jsonify({'status': 'error', 'message': str(e)})
+        # শর্টনার ডাউন বা ব্রেকার খোলা: ইউজারকে অপেক্ষা না করিয়ে সরাসরি অরিজিনাল লিংক
+        return jsonify({'status': 'success', 'shortenedUrl': original_url, 'fallback': True, 'message': str(e)})
+    try:
+        data = resp.json()
+        return jsonify(data)
+    except:
+        # If response is not JSON (some shorteners return raw text)
+        return jsonify({'status': 'error', 'raw': resp.text})
+
+# --- PUBLIC JSON API (read-only) ---
+# কম্প্যানিয়ন ক্লায়েন্টদের জন্য; HTML স্ক্র্যাপ করার দরকার নেই
+API_FIELDS = ("title", "type", "category", "language", "overview", "poster", "backdrop", "release_date",
+              "vote_average", "genres", "runtime", "trailer", "cast", "is_adult", "tmdb_id", "files",
+              "created_at", "updated_at")
+API_LIST_FIELDS = ("title", "type", "category", "language", "poster", "release_date", "vote_average", "updated_at")
+# file_id ইন্টারনাল, তাই ফাইলের শুধু এই সাব-ফিল্ডগুলো বাইরে যায়
+API_FILE_FIELDS = ("unique_code", "filename", "quality", "episode_label", "size", "file_type", "added_at")
+API_PAGE_SIZE = 20
+API_MAX_PAGE_SIZE = 100
+API_CACHE_CONTROL = os.getenv("API_CACHE_CONTROL", "public, max-age=30, s-maxage=60")
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+@app.errorhandler(ApiError)
+def handle_api_error(e):
+    return api_response({'error': str(e)}, status=e.status)
+
+def api_default(obj):
+    """ ObjectId / datetime এর মতো BSON টাইপ JSON এ রূপান্তর """
+    if isinstance(obj, ObjectId): return str(obj)
+    if isinstance(obj, datetime): return as_utc(obj).isoformat()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+def api_dumps(payload):
+    if orjson:
+        return orjson.dumps(payload, default=api_default, option=orjson.OPT_NAIVE_UTC)
+    return json.dumps(payload, default=api_default, ensure_ascii=False, separators=(',', ':')).encode()
+
+def api_response(payload, status=200, headers=None):
+    return Response(api_dumps(payload), status=status, headers=headers, mimetype='application/json')
+
+def api_projection(fields_param, default_fields):
+    """ ?fields=title,poster -> Mongo প্রজেকশন (অচেনা ফিল্ড হলে 400) """
+    fields = [f.strip() for f in fields_param.split(',') if f.strip()] if fields_param else list(default_fields)
+    unknown = [f for f in fields if f not in API_FIELDS]
+    if unknown: raise ApiError(f"Unknown fields: {', '.join(unknown)}")
+    projection = {}
+    for field in fields:
+        if field == "files":
+            projection.update({f"files.{sub}": 1 for sub in API_FILE_FIELDS})
+        else:
+            projection[field] = 1
+    return projection
+
+def api_document(doc):
+    doc['id'] = doc.pop('_id')
+    return doc
+
+def encode_cursor(doc):
+    stamp = doc.get('updated_at')
+    raw = json.dumps([stamp.isoformat() if stamp else None, str(doc['_id'])])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """ next_cursor -> LISTING_SORT (updated_at, _id desc) অনুযায়ী পরের পেজের শর্ত """
+    try:
+        stamp, oid = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode())
+        stamp, oid = (datetime.fromisoformat(stamp) if stamp else None), ObjectId(oid)
+    except Exception:
+        raise ApiError("Invalid cursor")
+    if stamp is None:
+        return {"updated_at": None, "_id": {"$lt": oid}}
+    return {"$or": [
+        {"updated_at": {"$lt": stamp}},
+        {"updated_at": stamp, "_id": {"$lt": oid}},
+        {"updated_at": None}
+    ]}
+
+def api_visible(cache_control=API_CACHE_CONTROL):
+    """ Stealth Mode চালু থাকলে এডমিন ছাড়া কেউ ক্যাটালগ দেখতে পাবে না।
+    রিটার্ন: (Cache-Control, Vary) — stealth এ এডমিনের রেসপন্স শেয়ার্ড ক্যাশে যাবে না (home এর মতো) """
+    stealth = get_site_settings().get('stealth_mode', False)
+    if stealth and not check_auth():
+        raise ApiError("Not found", 404)
+    return (PRIVATE_CACHE_CONTROL, 'Authorization') if stealth else (cache_control, None)
+
+def api_listing(db_query):
+    cache_control, vary = api_visible()
+    try:
+        limit = min(max(int(request.args.get('limit', API_PAGE_SIZE)), 1), API_MAX_PAGE_SIZE)
+    except ValueError:
+        raise ApiError("Invalid limit")
+    projection = api_projection(request.args.get('fields'), API_LIST_FIELDS)
+    wants_stamp = 'updated_at' in projection
+    projection['updated_at'] = 1  # কার্সরের জন্য সবসময় লাগে
+
+    cursor = request.args.get('cursor')
+    if cursor:
+        db_query = {"$and": [db_query, decode_cursor(cursor)]} if db_query else decode_cursor(cursor)
+
+    docs = list(movies.find(db_query, projection).sort(LISTING_SORT).limit(limit + 1))
+    next_cursor = encode_cursor(docs[limit - 1]) if len(docs) > limit else None
+    docs = docs[:limit]
+    if not wants_stamp:
+        for doc in docs: doc.pop('updated_at', None)
+
+    body = api_dumps({'items': [api_document(d) for d in docs], 'next_cursor': next_cursor})
+    etag = hashlib.sha1(body).hexdigest()[:20]
+    headers = cache_headers(etag, None, cache_control, vary)
+    if is_not_modified(etag, None): return Response(status=304, headers=headers)
+    return Response(body, headers=headers, mimetype='application/json')
+
+def api_stamp(movie_id):
+    """ ডিটেইল/এপিসোডের জন্য ETag এর অংশ আর Last-Modified (শুধু স্ট্যাম্প প্রজেকশন) """
+    caching = api_visible()
+    try: oid = ObjectId(movie_id)
+    except Exception: raise ApiError("Invalid ID")
+    stamp = movies.find_one({"_id": oid}, {"updated_at": 1, "content_rev": 1, "revised_at": 1})
+    if not stamp: raise ApiError("Not found", 404)
+    revision, changed_at = content_stamp(stamp)
+    return oid, revision, changed_at, caching
+
+@app.route('/api/v1/titles')
+def api_titles():
+    query = request.args.get('q', '').strip()
+    cat_filter = request.args.get('cat', '').strip()
+    type_filter = request.args.get('type', '').strip()
+    return api_listing(build_listing_query(query, cat_filter, type_filter))
+
+@app.route('/api/v1/search')
+def api_search():
+    query = request.args.get('q', '').strip()
+    if not query: raise ApiError("Missing q")
+    return api_listing(build_listing_query(query, request.args.get('cat', '').strip(), request.args.get('type', '').strip()))
+
+@app.route('/api/v1/titles/<movie_id>')
+def api_title_detail(movie_id):
+    fields_param = request.args.get('fields')
+    projection = api_projection(fields_param, API_FIELDS)
+    oid, revision, changed_at, caching = api_stamp(movie_id)
+    last_modified = as_utc(changed_at)
+    etag = make_page_etag('api-detail', movie_id, revision, fields_param)
+    headers = cache_headers(etag, last_modified, *caching)
+    if is_not_modified(etag, last_modified): return Response(status=304, headers=headers)
+    movie = movies.find_one({"_id": oid}, projection)
+    if not movie: raise ApiError("Not found", 404)
+    return api_response(api_document(movie), headers=headers)
+
+@app.route('/api/v1/titles/<movie_id>/episodes')
+def api_title_episodes(movie_id):
+    oid, revision, changed_at, caching = api_stamp(movie_id)
+    last_modified = as_utc(changed_at)
+    etag = make_page_etag('api-episodes', movie_id, revision)
+    headers = cache_headers(etag, last_modified, *caching)
+    if is_not_modified(etag, last_modified): return Response(status=304, headers=headers)
+    movie = movies.find_one({"_id": oid}, {"title": 1, "type": 1, **{f"files.{sub}": 1 for sub in API_FILE_FIELDS}})
+    if not movie: raise ApiError("Not found", 404)
+    return api_response({'id': movie['_id'], 'title': movie.get('title'), 'type': movie.get('type'),
+                         'episodes': movie.get('files', [])}, headers=headers)
+
+
+# --- TYPEAHEAD SUGGEST INDEX ---
+# সার্চ বক্সের টাইপ-অ্যাহেড; প্রতি কী-স্ট্রোকে Mongo তে regex স্ক্যান না করে প্রসেসের ভিতরের ইনডেক্স থেকে উত্তর।
+# নরমালাইজড টাইটেলের প্রতিটা শব্দ-শুরু থেকে একটা এন্ট্রি, suffix অনুযায়ী সাজানো। এন্ট্রি শুধু
+# (ডক নম্বর, অফসেট) হিসেবে দুটো array তে থাকে (৬ বাইট), তাই স্ট্রিং কপি হয় না।
+SUGGEST_LIMIT = 8
+SUGGEST_MAX_LIMIT = 20
+SUGGEST_SCAN_LIMIT = 256     # এর চেয়ে বেশি এন্ট্রির prefix এর টপ রেজাল্ট আগেই হিসাব করা থাকে ("hot")
+SUGGEST_HALF_LIFE_DAYS = 30
+SUGGEST_BUILD_TARGET_MS = 2000   # ১ লাখ টাইটেলে স্টার্টআপ বিল্ডের লক্ষ্য
+SUGGEST_SYNC_INTERVAL = int(os.getenv("SUGGEST_SYNC_INTERVAL", 15))
+SUGGEST_REBUILD_INTERVAL = int(os.getenv("SUGGEST_REBUILD_INTERVAL", 900))
+SUGGEST_CACHE_CONTROL = "public, max-age=60"
+SUGGEST_FIELDS = {"title": 1, "type": 1, "release_date": 1, "vote_average": 1, "is_adult": 1,
+                  "created_at": 1, "updated_at": 1, "files": {"$slice": 1}}
+SUGGEST_ITEM_KEYS = ('id', 'title', 'type', 'year', 'is_adult')
+
+def suggest_score(doc, now):
+    """ নতুন (৩০ দিনের half-life) + রেটিং + ফাইল আছে কি না; now হলো naive UTC (utc_now) """
+    stamp = doc.get('created_at') or doc.get('updated_at')
+    if stamp and stamp.tzinfo: stamp = stamp.astimezone(timezone.utc).replace(tzinfo=None)
+    age_days = max((now - stamp).total_seconds() / 86400, 0) if stamp else 365
+    try: rating = float(doc.get('vote_average') or 0) / 10
+    except (TypeError, ValueError): rating = 0
+    return 2 * 0.5 ** (age_days / SUGGEST_HALF_LIFE_DAYS) + rating + (0.5 if doc.get('files') else 0)
+
+def word_offsets(norm):
+    offsets, i = [0], norm.find(' ')
+    while i != -1:
+        offsets.append(i + 1)
+        i = norm.find(' ', i + 1)
+    return offsets
+
+class SuggestIndex:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.ready = False
+        self.built_at = 0
+        self.build_ms = 0
+        self.watermark = None
+        self._load([], {}, [], array('f'), array('I'), array('H'), {})
+
+    def _load(self, norms, slots, items, scores, entry_doc, entry_off, hot):
+        self.norms = norms          # ডক নম্বর -> নরমালাইজড টাইটেল (মুছে ফেলা হলে None)
+        self.slots = slots          # str(_id) -> ডক নম্বর
+        self.items = items          # ডক নম্বর -> (id, title, type, year, is_adult) টাপল
+        self.scores = scores
+        self.entry_doc = entry_doc
+        self.entry_off = entry_off
+        self.hot = hot              # prefix -> স্কোর অনুযায়ী টপ ডক নম্বর
+
+    @staticmethod
+    def _item(doc):
+        release = doc.get('release_date') or ''
+        return (str(doc['_id']), doc.get('title'), doc.get('type'), release[:4] or None, bool(doc.get('is_adult')))
+
+    def rebuild(self, docs=None):
+        """ পুরো কালেকশন (বা docs) থেকে নতুন ইনডেক্স বানিয়ে একবারে বদলে দেয়; ডিলিট হওয়া টাইটেলও এভাবে বাদ পড়ে """
+        started = time.perf_counter()
+        now = utc_now()
+        norms, slots, items, scores, keyed, watermark = [], {}, [], array('f'), [], None
+        for doc in (movies.find({}, SUGGEST_FIELDS) if docs is None else docs):
+            norm = normalize_title(doc.get('title'))
+            if not norm: continue
+            doc_no = len(norms)
+            norms.append(norm)
+            slots[str(doc['_id'])] = doc_no
+            items.append(self._item(doc))
+            scores.append(suggest_score(doc, now))
+            for off in word_offsets(norm):
+                keyed.append((norm[off:], doc_no, off))
+            if doc.get('updated_at') and (watermark is None or doc['updated_at'] > watermark):
+                watermark = doc['updated_at']
+        keyed.sort()
+        suffixes = [k[0] for k in keyed]
+        entry_doc = array('I', [k[1] for k in keyed])
+        entry_off = array('H', [min(k[2], 65535) for k in keyed])
+        del keyed
+
+        # hot prefix: শুধু আগের লেভেলের hot রেঞ্জের ভিতরেই পরের লেভেল খোঁজা হয়, bisect দিয়ে গ্রুপের সীমানা
+        hot, ranges, length = {}, [(0, len(suffixes))], 1
+        while ranges:
+            deeper = []
+            for lo, hi in ranges:
+                while lo < hi:
+                    prefix = suffixes[lo][:length]
+                    if len(prefix) < length:
+                        lo = bisect.bisect_right(suffixes, prefix, lo, hi)
+                        continue
+                    end = bisect.bisect_left(suffixes, prefix + '\U0010ffff', lo, hi)
+                    if end - lo > SUGGEST_SCAN_LIMIT:
+                        hot[prefix] = heapq.nlargest(SUGGEST_MAX_LIMIT, set(entry_doc[lo:end]), key=scores.__getitem__)
+                        deeper.append((lo, end))
+                    lo = end
+            ranges, length = deeper, length + 1
+
+        with self.lock:
+            self._load(norms, slots, items, scores, entry_doc, entry_off, hot)
+            self.watermark = watermark
+            self.ready = True
+            self.built_at = time.time()
+            self.build_ms = round((time.perf_counter() - started) * 1000, 1)
+        if self.build_ms > SUGGEST_BUILD_TARGET_MS:
+            print(f"⚠️ Suggest index build took {self.build_ms}ms for {len(norms)} titles")
+        return len(norms)
+
+    def _suffix_key(self, length=None):
+        norms, entry_doc, entry_off = self.norms, self.entry_doc, self.entry_off
+        if length is None:
+            return lambda e: norms[entry_doc[e]][entry_off[e]:]
+        return lambda e: norms[entry_doc[e]][entry_off[e]:entry_off[e] + length]
+
+    def _range(self, prefix):
+        key = self._suffix_key(len(prefix))
+        entries = range(len(self.entry_doc))
+        return bisect.bisect_left(entries, prefix, key=key), bisect.bisect_right(entries, prefix, key=key)
+
+    def _top(self, prefix, limit):
+        lo, hi = self._range(prefix)
+        return heapq.nlargest(limit, set(self.entry_doc[lo:hi]), key=self.scores.__getitem__)
+
+    def _hot_prefixes(self, norm):
+        """ এই টাইটেলের যে prefix গুলো hot লিস্টে আছে (hot না হলে তার পরের লম্বা prefix ও hot নয়) """
+        found = []
+        for off in word_offsets(norm):
+            for end in range(off + 1, len(norm) + 1):
+                if norm[off:end] not in self.hot: break
+                found.append(norm[off:end])
+        return found
+
+    def _drop(self, doc_no):
+        norm = self.norms[doc_no]
+        key = self._suffix_key()
+        entries = range(len(self.entry_doc))
+        for off in word_offsets(norm):
+            e = bisect.bisect_left(entries, norm[off:], key=key)
+            while self.entry_doc[e] != doc_no: e += 1
+            del self.entry_doc[e]
+            del self.entry_off[e]
+        self.norms[doc_no] = None
+        self.items[doc_no] = None
+        for prefix in self._hot_prefixes(norm):
+            if doc_no in self.hot[prefix]:
+                self.hot[prefix] = self._top(prefix, SUGGEST_MAX_LIMIT)
+
+    def upsert(self, doc):
+        """ একটা ডকুমেন্ট যোগ/আপডেট; টাইটেল না বদলালে শুধু স্কোর আর মেটাডেটা বদলায় """
+        if not doc or not doc.get('_id'): return
+        norm = normalize_title(doc.get('title'))
+        score = suggest_score(doc, utc_now())
+        with self.lock:
+            doc_no = self.slots.get(str(doc['_id']))
+            if doc_no is not None and self.norms[doc_no] == norm:
+                self.items[doc_no] = self._item(doc)
+                self.scores[doc_no] = score
+            else:
+                if doc_no is not None:
+                    self._drop(doc_no)
+                    del self.slots[str(doc['_id'])]
+                if not norm: return
+                doc_no = len(self.norms)
+                self.norms.append(norm)
+                self.slots[str(doc['_id'])] = doc_no
+                self.items.append(self._item(doc))
+                self.scores.append(score)
+                key = self._suffix_key()
+                entries = range(len(self.entry_doc))
+                for off in word_offsets(norm):
+                    e = bisect.bisect_right(entries, norm[off:], key=key)
+                    self.entry_doc.insert(e, doc_no)
+                    self.entry_off.insert(e, min(off, 65535))
+            # স্কোর কমে গেলে hot লিস্টে সামান্য ভুল থাকতে পারে; পরের পুরো রিবিল্ডে ঠিক হয়ে যায়
+            for prefix in self._hot_prefixes(norm):
+                self.hot[prefix] = heapq.nlargest(SUGGEST_MAX_LIMIT, set(self.hot[prefix]) | {doc_no},
+                                                  key=self.scores.__getitem__)
+
+    def remove(self, movie_id):
+        with self.lock:
+            doc_no = self.slots.pop(str(movie_id), None)
+            if doc_no is not None: self._drop(doc_no)
+
+    def sync(self):
+        """ অন্য প্রসেস/ওয়ার্কারের লেখা সহ, watermark এর পর আপডেট হওয়া ডকুমেন্টগুলো যোগ করে """
+        query = {"updated_at": {"$gte": self.watermark}} if self.watermark else {}
+        changed = 0
+        for doc in movies.find(query, SUGGEST_FIELDS):
+            self.upsert(doc)
+            changed += 1
+            if doc.get('updated_at') and (self.watermark is None or doc['updated_at'] > self.watermark):
+                self.watermark = doc['updated_at']
+        return changed
+
+    def search(self, text, limit=SUGGEST_LIMIT):
+        prefix = normalize_title(text)
+        if not prefix: return []
+        with self.lock:
+            top = self.hot.get(prefix)
+            doc_nos = top[:limit] if top is not None else self._top(prefix, limit)
+            return [dict(zip(SUGGEST_ITEM_KEYS, self.items[d])) for d in doc_nos]
+
+    def snapshot(self):
+        return {'ready': self.ready, 'titles': len(self.slots), 'entries': len(self.entry_doc),
+                'hot_prefixes': len(self.hot), 'build_ms': self.build_ms,
+                'entry_bytes': self.entry_doc.itemsize * len(self.entry_doc) + self.entry_off.itemsize * len(self.entry_off),
+                'built_at': self.built_at and datetime.fromtimestamp(self.built_at, timezone.utc).isoformat()}
+
+suggest_index = SuggestIndex()
+SUGGEST_JOB_ID = "suggest_index"
+
+def request_suggest_rebuild():
+    """
+    পুরনো updated_at সহ বাল্ক লেখার পর (backfill/catalogue import): watermark সিঙ্ক সেগুলো পায় না,
+    তাই admin_jobs এ সংখ্যা বাড়ানো হয়, প্রতিটা প্রসেস পরের সিঙ্ক রাউন্ডে দেখে পুরো রিবিল্ড করে
+    """
+    admin_jobs.update_one({"_id": SUGGEST_JOB_ID}, {"$inc": {"rebuild_seq": 1}}, upsert=True)
+
+def suggest_rebuild_seq():
+    return (admin_jobs.find_one({"_id": SUGGEST_JOB_ID}, {"rebuild_seq": 1}) or {}).get("rebuild_seq", 0)
+
+def start_suggest_sync():
+    seen_seq = None
+    while True:
+        try:
+            seq = suggest_rebuild_seq()
+            if seq != seen_seq or time.time() - suggest_index.built_at >= SUGGEST_REBUILD_INTERVAL:
+                suggest_index.rebuild()
+                seen_seq = seq
+            else:
+                suggest_index.sync()
+        except Exception as e:
+            print(f"Suggest Index Error: {e}")
+        time.sleep(SUGGEST_SYNC_INTERVAL)
+
+@app.route('/api/suggest')
+def api_suggest():
+    cache_control, vary = api_visible(SUGGEST_CACHE_CONTROL)
+    text = request.args.get('q', '').strip()
+    try:
+        limit = min(max(int(request.args.get('limit', SUGGEST_LIMIT)), 1), SUGGEST_MAX_LIMIT)
+    except ValueError:
+        raise ApiError("Invalid limit")
+    headers = {'Cache-Control': cache_control, **({'Vary': vary} if vary else {})}
+    if not text: return api_response({'q': text, 'items': []}, headers=headers)
+
+    if suggest_index.ready:
+        items = suggest_index.search(text, limit)
+    else:
+        # স্টার্টআপে ইনডেক্স তৈরি হওয়ার আগ পর্যন্ত সাধারণ prefix কুয়েরি
+        docs = movies.find({"title": {"$regex": '^' + re.escape(text), "$options": "i"}},
+                           {"title": 1, "type": 1, "release_date": 1, "is_adult": 1}).limit(limit)
+        items = [dict(zip(SUGGEST_ITEM_KEYS, SuggestIndex._item(d))) for d in docs]
+    return api_response({'q': text, 'items': items}, headers=headers)
 
 # ================================
 #        ADMIN ROUTES
@@ -1639,50 +3930,243 @@ def admin_home():
         return Response('Login Required', 401, {'WWW-Authenticate': 'Basic realm="Login Required"'})
     
     page = int(request.args.get('page', 1))
-    q = request.args.get('q', '')
+    q = request.args.get('q', '').strip()
+    cat_filter = request.args.get('cat', '').strip()
+    type_filter = request.args.get('type', '').strip()
     per_page = 20
     
-    filter_q = {}
-    if q: filter_q['title'] = {'$regex': q, '$options': 'i'}
+    filter_q = build_listing_query(q, cat_filter, type_filter)
     
-    movie_list = list(movies.find(filter_q).sort('_id', -1).skip((page-1)*per_page).limit(per_page))
+    movie_list = list(movies.find(filter_q, ADMIN_CARD_FIELDS).sort('_id', -1).skip((page-1)*per_page).limit(per_page))
+    total = movies.count_documents(filter_q)
     
     full_html = admin_base.replace('<!-- CONTENT_GOES_HERE -->', admin_dashboard)
-    return render_template_string(full_html, movies=movie_list, page=page, q=q, active='dashboard')
+    return render_template_string(full_html, movies=movie_list, page=page, q=q, cat_filter=cat_filter, type_filter=type_filter,
+                                  categories=list(categories.find()), total=total, active='dashboard')
+
+# --- BULK OPERATIONS ---
+# ছোট সিলেকশন রিকোয়েস্টের ভিতরেই একটা unordered bulk_write এ শেষ হয়;
+# বড় সিলেকশন আর TMDB রি-এনরিচ ব্যাকগ্রাউন্ড থ্রেডে চলে, অগ্রগতি admin_jobs কালেকশনে থাকে
+ADMIN_CARD_FIELDS = {"title": 1, "poster": 1, "category": 1, "is_adult": 1, "release_date": 1}
+BULK_SET_ACTIONS = {"set_category": "category", "set_type": "type", "set_language": "language", "set_adult": "is_adult"}
+BULK_ACTIONS = tuple(BULK_SET_ACTIONS) + ("delete", "reenrich")
+BULK_SYNC_LIMIT = int(os.getenv("BULK_SYNC_LIMIT", 500))
+BULK_CHUNK = 500
+TMDB_REFRESH_FIELDS = ("tmdb_id", "overview", "poster", "backdrop", "release_date", "vote_average",
+                       "genres", "runtime", "trailer", "cast")
+
+def bulk_selection(form):
+    """ চেকবক্সে বাছাই করা আইডি, অথবা ড্যাশবোর্ডের বর্তমান ফিল্টার (q/cat/type) থেকে কুয়েরি """
+    if form.get('scope') == 'filter':
+        query = build_listing_query(form.get('q', '').strip(), form.get('cat', '').strip(), form.get('type', '').strip())
+        return query, "filter: " + (", ".join(f"{k}={form.get(k)}" for k in ('q', 'cat', 'type') if form.get(k)) or "all titles")
+    ids = [ObjectId(i) for i in form.getlist('ids') if ObjectId.is_valid(i)]
+    return {"_id": {"$in": ids}}, f"{len(ids)} checked"
+
+def bulk_ops(action, oids, value):
+    """ একটা চাঙ্কের জন্য bulk_write অপারেশন """
+    if action == 'delete':
+        return [DeleteOne({"_id": oid}) for oid in oids]
+    now = utc_now()
+    field = BULK_SET_ACTIONS[action]
+    return [UpdateOne({"_id": oid}, {"$set": {field: value, "updated_at": now}}) for oid in oids]
+
+def tmdb_refresh_plan(docs, now=None):
+    """
+    প্রতিটা টাইটেল TMDB থেকে আবার খুঁজে নতুন মেটাডেটা সেট করে (না পেলে শুধু needs_enrich মুছে দেয়)।
+    প্লেসহোল্ডারের (tmdb_id নেই) ফাইলের নাম থেকে বানানো title/title_key ও TMDB এর টাইটেলে বদলায়; সেই
+    (title_key, tmdb_id, type) এর টাইটেল আগেই থাকলে প্লেসহোল্ডারের ফাইলগুলো সেখানে মার্জ হয়ে প্লেসহোল্ডার মুছে যায়।
+    রিটার্ন: [(doc _id, অপারেশন, মার্জ হলে যে টাইটেলে গেল)]
+    """
+    now = now or utc_now()
+    plan, claimed = [], set()
+    for doc in docs:
+        year = (doc.get('release_date') or '')[:4] or None
+        tmdb_data = get_tmdb_details(doc.get('title', ''), doc.get('type', 'movie'), year)
+        if tmdb_data.get('enrich_pending'): continue  # TMDB এখনো ডাউন, পরে আবার
+        update = {"$unset": {"needs_enrich": ""}}
+        if not tmdb_data.get('tmdb_id'):
+            plan.append((doc["_id"], [UpdateOne({"_id": doc["_id"]}, update)], None))
+            continue
+        fields = {k: tmdb_data.get(k) for k in TMDB_REFRESH_FIELDS}
+        title_key = doc.get('title_key')
+        if doc.get('tmdb_id') is None and tmdb_data.get('title'):
+            title_key = normalize_title(tmdb_data['title'])
+            fields.update(title=tmdb_data['title'], title_key=title_key)
+        key = (title_key, tmdb_data['tmdb_id'], doc.get('type'))
+        if key in claimed: continue   # এই ব্যাচেই আরেকটা প্লেসহোল্ডার একই টাইটেল হচ্ছে; পরের রাউন্ডে মার্জ
+        claimed.add(key)
+        target = movies.find_one({"title_key": key[0], "tmdb_id": key[1], "type": key[2], "_id": {"$ne": doc["_id"]}},
+                                 {"files.file_id": 1})
+        if target:
+            known = {f.get('file_id') for f in target.get('files', [])}
+            files = [f for f in doc.get('files') or [] if f.get('file_id') not in known]
+            ops = [UpdateOne({"_id": target["_id"]}, {"$push": {"files": {"$each": files}}, **content_revision(now)})] if files else []
+            plan.append((doc["_id"], ops + [DeleteOne({"_id": doc["_id"]})], target["_id"]))
+            continue
+        update["$set"] = {**fields, "updated_at": now}
+        plan.append((doc["_id"], [UpdateOne({"_id": doc["_id"]}, update)], None))
+    return plan
+
+TMDB_REFRESH_PROJECTION = {"title": 1, "title_key": 1, "tmdb_id": 1, "type": 1, "release_date": 1, "files": 1}
+ENRICH_RETRY_INTERVAL = int(os.getenv("ENRICH_RETRY_INTERVAL", 600))
+ENRICH_RETRY_BATCH = 50
+
+def retry_pending_enrichment():
+    """
+    TMDB ডাউন থাকার সময় প্লেসহোল্ডার টাইটেলে ইনজেস্ট হওয়া ডকুমেন্টগুলো আবার এনরিচ করে।
+    লেখা ব্যর্থ হলে needs_enrich মুছে enrich_error রাখা হয়, যাতে একই ডকুমেন্ট প্রতি রাউন্ডে ব্যাচ আটকে না রাখে।
+    """
+    docs = list(movies.find({"needs_enrich": True}, TMDB_REFRESH_PROJECTION).sort("_id", 1).limit(ENRICH_RETRY_BATCH))
+    plan = tmdb_refresh_plan(docs)
+    ops = [op for _, doc_ops, _ in plan for op in doc_ops]
+    owners = [doc_id for doc_id, doc_ops, _ in plan for _ in doc_ops]
+    if not ops: return 0
+    try:
+        result = movies.bulk_write(ops, ordered=False).bulk_api_result
+        failed = {}
+    except BulkWriteError as e:
+        result = e.details
+        failed = {owners[err["index"]]: err.get("errmsg", "write error") for err in result.get("writeErrors", [])}
+        print(f"⚠️ Re-enrich write errors: {list(failed.values())}")
+        movies.bulk_write([UpdateOne({"_id": doc_id}, {"$unset": {"needs_enrich": ""}, "$set": {"enrich_error": error}})
+                           for doc_id, error in failed.items()], ordered=False)
+    for doc_id, _, target in plan:
+        if doc_id in failed: continue
+        if target:
+            refresh_episode_index(target)
+            suggest_index.remove(doc_id)
+    fixed = result.get("nModified", 0) + result.get("nRemoved", 0)
+    if fixed: rebuild_home_feed()
+    return fixed
+
+def start_enrich_retry():
+    while True:
+        time.sleep(ENRICH_RETRY_INTERVAL)
+        try:
+            fixed = retry_pending_enrichment() if singleton_active() else 0
+            if fixed: print(f"✅ Re-enriched {fixed} placeholder titles from TMDB")
+        except Exception as e:
+            print(f"Enrich Retry Error: {e}")
+
+def run_bulk_job(job_id, action, query, value):
+    counts = {"processed": 0, "modified": 0, "deleted": 0, "errors": 0}
+    try:
+        # আগেই _id গুলো নিয়ে রাখি, যাতে আপডেট/ডিলিটের মাঝে সিলেকশন না বদলায়
+        oids = [d["_id"] for d in movies.find(query, {"_id": 1})]
+        admin_jobs.update_one({"_id": job_id}, {"$set": {"total": len(oids)}})
+        for start in range(0, len(oids), BULK_CHUNK):
+            chunk = oids[start:start + BULK_CHUNK]
+            merged_into = []
+            if action == 'reenrich':
+                plan = tmdb_refresh_plan(movies.find({"_id": {"$in": chunk}}, TMDB_REFRESH_PROJECTION))
+                ops = [op for _, doc_ops, _ in plan for op in doc_ops]
+                merged_into = [target for _, _, target in plan if target]
+            else:
+                ops = bulk_ops(action, chunk, value)
+            if ops:
+                try:
+                    result = movies.bulk_write(ops, ordered=False).bulk_api_result
+                except BulkWriteError as e:
+                    result = e.details
+                    counts["errors"] += len(result.get("writeErrors", []))
+                counts["modified"] += result.get("nModified", 0)
+                counts["deleted"] += result.get("nRemoved", 0)
+            for target in merged_into: refresh_episode_index(target)
+            counts["processed"] += len(chunk)
+            admin_jobs.update_one({"_id": job_id}, {"$set": counts})
+        admin_jobs.update_one({"_id": job_id}, {"$set": {"status": "done", "finished_at": utc_now()}})
+        rebuild_home_feed()
+        if counts["deleted"]: suggest_index.rebuild()
+    except Exception as e:
+        print(f"❌ Bulk Job Error: {e}")
+        admin_jobs.update_one({"_id": job_id}, {"$set": {**counts, "status": "failed", "error": str(e), "finished_at": utc_now()}})
+
+@app.route('/admin/bulk', methods=['POST'])
+def admin_bulk():
+    if not check_auth(): return Response('Login Required', 401, {'WWW-Authenticate': 'Basic realm="Login Required"'})
+    action = request.form.get('action')
+    if action not in BULK_ACTIONS: return "Unknown bulk action", 400
+    value = request.form.get('value', '').strip()
+    if action == 'set_adult': value = value == 'true'
+    elif action in BULK_SET_ACTIONS and not value: return "Missing value", 400
+
+    query, selection = bulk_selection(request.form)
+    total = movies.count_documents(query)
+    job_id = admin_jobs.insert_one({
+        "action": action, "value": value if action in BULK_SET_ACTIONS else None, "selection": selection,
+        "total": total, "processed": 0, "modified": 0, "deleted": 0, "errors": 0,
+        "status": "running", "created_at": utc_now()
+    }).inserted_id
+
+    if action == 'reenrich' or total > BULK_SYNC_LIMIT:
+        threading.Thread(target=run_bulk_job, args=(job_id, action, query, value), daemon=True).start()
+    else:
+        run_bulk_job(job_id, action, query, value)
+    return redirect(url_for('admin_job', job_id=str(job_id)))
+
+@app.route('/admin/jobs/<job_id>')
+def admin_job(job_id):
+    if not check_auth(): return Response('Login Required', 401, {'WWW-Authenticate': 'Basic realm="Login Required"'})
+    job = admin_jobs.find_one({"_id": ObjectId(job_id)}) if ObjectId.is_valid(job_id) else None
+    if not job: return "Job not found", 404
+    full_html = admin_base.replace('<!-- CONTENT_GOES_HERE -->', admin_job_template)
+    return render_template_string(full_html, job=job, active='dashboard')
+
+@app.route('/admin/api/jobs/<job_id>')
+def admin_job_status(job_id):
+    if not check_auth(): return jsonify({'error': 'Unauthorized'}), 401
+    job = admin_jobs.find_one({"_id": ObjectId(job_id)}) if ObjectId.is_valid(job_id) else None
+    if not job: return jsonify({'error': 'Job not found'}), 404
+    return api_response(api_document(job))
 
 # --- DUPLICATE CLEANER ROUTE (One-Click Fix) ---
 @app.route('/admin/cleanup')
 def admin_cleanup():
-    """ ডেটাবেস থেকে ডুপ্লিকেট এবং ফাঁকা মুভি রিমুভ করার টুল """
+    """ একই নরমালাইজড টাইটেলের ডুপ্লিকেটগুলো মার্জ করে (ফাইল হারায় না), তারপর ইনজেস্টের ইউনিক ইনডেক্স তৈরি করে """
     if not check_auth(): return "Unauthorized", 401
     
-    # 1. সব মুভি নিয়ে আসা
-    all_movies = list(movies.find({}))
+    # 1. সব মুভি নিয়ে আসা (শুধু দরকারি ফিল্ড)
+    all_movies = list(movies.find({}, {"title": 1, "title_key": 1, "tmdb_id": 1, "type": 1, "files": 1}))
     
-    # 2. সর্টিং: যাদের ফাইল আছে তারা আগে থাকবে, এরপর ID অনুযায়ী
-    # (files array length descending, then ID descending)
-    all_movies.sort(key=lambda x: (len(x.get('files', [])), x.get('_id')), reverse=True)
-
-    seen_titles = set()
-    duplicates_removed = 0
+    # 2. সর্টিং: যাদের ফাইল বেশি তারা আগে থাকবে, এরপর ID অনুযায়ী
+    all_movies.sort(key=lambda x: (len(x.get('files') or []), x.get('_id')), reverse=True)
 
+    # 3. (title_key, tmdb_id, type) অনুযায়ী গ্রুপ; TMDB আইডি ছাড়া (প্লেসহোল্ডার) গুলো একই টাইটেল ও টাইপের প্রথমটার সাথে যায়
+    keepers, groups = {}, {}
     for m in all_movies:
-        title = m.get('title')
-        if not title: continue
-        
-        if title in seen_titles:
-            # যদি এই নামের মুভি আগেই লিস্টে (seen_titles) ঢুকে থাকে,
-            # তার মানে বর্তমানটা ডুপ্লিকেট (এবং সম্ভবত ফাইল নেই কারণ আমরা ফাইলওয়ালাদের আগে রেখেছি)
-            movies.delete_one({'_id': m['_id']})
-            duplicates_removed += 1
-        else:
-            # প্রথমবার দেখা গেলে লিস্টে রাখলাম
-            seen_titles.add(title)
+        title_key = m.get('title_key') or normalize_title(m.get('title'))
+        if not title_key: continue
+        key = (title_key, m.get('tmdb_id'), m.get('type'))
+        if m.get('tmdb_id') is None:
+            key = keepers.get((title_key, m.get('type')), key)
+        keepers.setdefault((title_key, m.get('type')), key)
+        groups.setdefault(key, []).append(m)
 
+    duplicates_removed = 0
+    for keeper, *extras in groups.values():
+        if not extras: continue
+        known = {f.get('file_id') for f in keeper.get('files') or []}
+        merged = []
+        for m in extras:
+            for f in m.get('files') or []:
+                if f.get('file_id') not in known:
+                    known.add(f.get('file_id'))
+                    merged.append(f)
+        if merged:
+            movies.update_one({'_id': keeper['_id']}, {'$push': {'files': {'$each': merged}}, '$set': {'updated_at': utc_now()}})
+            refresh_episode_index(keeper['_id'])
+        movies.delete_many({'_id': {'$in': [m['_id'] for m in extras]}})
+        duplicates_removed += len(extras)
+
+    ensure_ingest_index()
+    if duplicates_removed:
+        rebuild_home_feed()
+        suggest_index.rebuild()
     return f"""
     <div style="text-align:center; padding:50px; font-family:sans-serif;">
         <h1 style="color:green;">✅ Cleanup Successful!</h1>
-        <h3>Removed {duplicates_removed} Duplicate Movies.</h3>
+        <h3>Merged {duplicates_removed} Duplicate Movies.</h3>
         <p>Your database is now clean. Only unique movies remain.</p>
         <a href="/admin" style="background:#333; color:white; padding:10px 20px; text-decoration:none; border-radius:5px;">Back to Admin</a>
     </div>
@@ -1696,6 +4180,7 @@ def admin_cats():
         new_cat = request.form.get('new_category').strip()
         if new_cat:
             categories.insert_one({"name": new_cat})
+            rebuild_home_feed()
         return redirect(url_for('admin_cats'))
     
     cat_list = list(categories.find())
@@ -1706,6 +4191,7 @@ def admin_cats():
 def delete_cat(cat_id):
     if not check_auth(): return Response('Login Required', 401)
     categories.delete_one({"_id": ObjectId(cat_id)})
+    rebuild_home_feed()
     return redirect(url_for('admin_cats'))
 
 @app.route('/admin/movie/edit/<movie_id>', methods=['GET', 'POST'])
@@ -1721,11 +4207,12 @@ def admin_edit_movie(movie_id):
 
         update_data = {
             "title": request.form.get("title"),
+            "title_key": normalize_title(request.form.get("title")),
             "category": request.form.get("category"),
             "language": request.form.get("language"),
             "overview": request.form.get("overview"),
-            "poster": new_poster,
-            "backdrop": request.form.get("backdrop"),
+            "poster": image_key(new_poster),
+            "backdrop": image_key(request.form.get("backdrop")),
             "release_date": request.form.get("release_date"),
             "vote_average": request.form.get("vote_average"),
             "type": request.form.get("type"),
@@ -1733,7 +4220,12 @@ def admin_edit_movie(movie_id):
             "updated_at": now_utc
         }
         
-        movies.update_one({"_id": ObjectId(movie_id)}, {"$set": update_data})
+        try:
+            movies.update_one({"_id": ObjectId(movie_id)}, {"$set": update_data})
+        except DuplicateKeyError:
+            return "Another entry with the same title and TMDB ID already exists. Use Cleanup to merge them.", 409
+        rebuild_home_feed()
+        suggest_index.upsert(dict(movie, **update_data))
         
         if not movie.get('last_notified') and new_poster and PUBLIC_CHANNEL_ID:
             latest_file = movie.get('files', [])[-1] if movie.get('files') else None
@@ -1760,12 +4252,12 @@ def admin_edit_movie(movie_id):
                     'chat_id': PUBLIC_CHANNEL_ID,
                     'parse_mode': 'Markdown',
                     'reply_markup': json.dumps({"inline_keyboard": pub_keyboard}),
-                    'photo': new_poster,
+                    'photo': tmdb_image(new_poster),
                     'caption': caption
                 }
                 
                 try:
-                    resp = requests.post(f"{TELEGRAM_API_URL}/sendPhoto", json=notify_payload)
+                    resp = tg_post("sendPhoto", notify_payload)
                     if resp.json().get('ok'):
                         now_utc = datetime.now(datetime.UTC) if hasattr(datetime, 'UTC') else datetime.utcnow()
                         movies.update_one({"_id": ObjectId(movie_id)}, {"$set": {"last_notified": now_utc}})
@@ -1782,6 +4274,9 @@ def admin_edit_movie(movie_id):
 def admin_delete_movie(movie_id):
     if not check_auth(): return Response('Login Required', 401)
     movies.delete_one({"_id": ObjectId(movie_id)})
+    reports.delete_one({"_id": ObjectId(movie_id)})
+    rebuild_home_feed()
+    suggest_index.remove(movie_id)
     return redirect(url_for('admin_home'))
 
 @app.route('/admin/settings', methods=['GET', 'POST'])
@@ -1801,7 +4296,8 @@ def admin_settings_page():
             "tutorial_video_url": raw_yt, 
             "tutorial_video": clean_yt,   
             "banner_ad": request.form.get("banner_ad"),
-            "popunder": request.form.get("popunder")
+            "popunder": request.form.get("popunder"),
+            "updated_at": datetime.now(datetime.UTC) if hasattr(datetime, 'UTC') else datetime.utcnow()
         }}, upsert=True)
         return redirect(url_for('admin_settings_page'))
     
@@ -1809,72 +4305,412 @@ def admin_settings_page():
     full_html = admin_base.replace('<!-- CONTENT_GOES_HERE -->', admin_settings)
     return render_template_string(full_html, settings=curr_settings, active='settings')
 
+@app.route('/admin/api/stats')
+def admin_stats():
+    """ পারফরম্যান্স কাউন্টার (কম্প্রেশন রেশিও, CPU টাইম ইত্যাদি) """
+    if not check_auth(): return jsonify({'error': 'Unauthorized'}), 401
+    if request.args.get('reset') == '1':
+        compression_stats.reset()
+    return jsonify({
+        'pid': os.getpid(),
+        'tmdb_cache': {'entries': len(tmdb_cache.items), 'hits': tmdb_cache.hits, 'misses': tmdb_cache.misses,
+                       'shared_lookups': tmdb_flight.shared},
+        'breakers': [b.snapshot() for b in breakers.values()],
+        'compression': compression_stats.snapshot(),
+        'compressed_cache': {'entries': len(compressed_cache.items), 'bytes': compressed_cache.size},
+        'suggest': suggest_index.snapshot(),
+        'rate_limit': rate_limiter.snapshot(),
+        'counters': counters.snapshot(),
+        'cold_start': {k: v for k, v in cold_start.items() if k != 'started'},
+        'background_services': {'mode': BACKGROUND_SERVICES, 'lease_held': service_lease.held},
+        'tmdb_index': local_tmdb_index.snapshot(),
+    })
+
+@app.route('/admin/health')
+def admin_health_page():
+    """ সার্কিট ব্রেকারের অবস্থা, ফাস্ট-ফেইল কাউন্ট, এনরিচমেন্টের অপেক্ষায় থাকা টাইটেল """
+    if not check_auth(): return Response('Login Required', 401, {'WWW-Authenticate': 'Basic realm="Login Required"'})
+    full_html = admin_base.replace('<!-- CONTENT_GOES_HERE -->', admin_health)
+    return render_template_string(full_html, breakers=[b.snapshot() for b in breakers.values()],
+                                  pending_enrich=movies.count_documents({"needs_enrich": True}), active='health')
+
+@app.route('/admin/reports')
+def admin_reports_page():
+    """ রিপোর্ট সংখ্যা অনুযায়ী সাজানো টাইটেল, প্রতিটার সবচেয়ে বেশি রিপোর্ট হওয়া ফাইল সহ """
+    if not check_auth(): return Response('Login Required', 401, {'WWW-Authenticate': 'Basic realm="Login Required"'})
+    items = list(reports.find().sort("count", -1).limit(100))
+    titles = {m["_id"]: m for m in movies.find({"_id": {"$in": [r["_id"] for r in items]}},
+                                               {"title": 1, "files.unique_code": 1, "files.quality": 1, "files.episode_label": 1})}
+    for r in items:
+        r["movie"] = titles.get(r["_id"])
+        labels = {f.get("unique_code"): f.get("episode_label") or f.get("quality") for f in (r["movie"] or {}).get("files", [])}
+        r["top_files"] = [{"label": labels.get(code, code), "count": n}
+                          for code, n in sorted((r.get("files") or {}).items(), key=lambda kv: -kv[1])[:3]]
+    full_html = admin_base.replace('<!-- CONTENT_GOES_HERE -->', admin_reports)
+    return render_template_string(full_html, items=items, active='reports')
+
+@app.route('/admin/reports/clear/<movie_id>', methods=['POST'])
+def admin_clear_reports(movie_id):
+    if not check_auth(): return Response('Login Required', 401)
+    reports.delete_one({"_id": ObjectId(movie_id)})
+    return redirect(url_for('admin_reports_page'))
+
+@app.route('/admin/files')
+def admin_files_page():
+    """ file_id চেকারের রিপোর্ট: ভাঙা ফাইল থাকা টাইটেল আর শেষ রাউন্ডের হিসাব """
+    if not check_auth(): return Response('Login Required', 401, {'WWW-Authenticate': 'Basic realm="Login Required"'})
+    items = list(movies.find({"files.health": "broken"}, {"title": 1, "files": 1, "health_checked_at": 1})
+                 .sort("health_checked_at", -1).limit(200))
+    job = admin_jobs.find_one({"_id": FILE_HEALTH_JOB_ID}) or {}
+    full_html = admin_base.replace('<!-- CONTENT_GOES_HERE -->', admin_files)
+    return render_template_string(full_html, items=items, last=job.get("last_round"), active='files',
+                                  broken_titles=movies.count_documents({"files.health": "broken"}),
+                                  unchecked=movies.count_documents({"files.0": {"$exists": True}, "health_checked_at": {"$exists": False}}))
+
+@app.route('/admin/files/check', methods=['POST'])
+def admin_run_file_check():
+    if not check_auth(): return Response('Login Required', 401)
+    threading.Thread(target=verify_files_round, daemon=True).start()
+    return redirect(url_for('admin_files_page'))
+
+@app.route('/admin/migrate/images', methods=['POST'])
+def admin_migrate_images():
+    """ পুরনো ফিক্সড-সাইজ ছবির URL গুলোকে TMDB পাথ কি তে রূপান্তর """
+    if not check_auth(): return jsonify({'error': 'Unauthorized'}), 401
+    updated = migrate_image_keys()
+    if updated: rebuild_home_feed()
+    return jsonify({'updated': updated})
+
 @app.route('/admin/api/tmdb')
 def api_tmdb_search():
     if not check_auth(): return jsonify({'error': 'Unauthorized'}), 401
     query = request.args.get('q', '').strip()
     if not query or not TMDB_API_KEY: return jsonify({'error': 'No query provided'})
 
-    tmdb_url_match = re.search(r'themoviedb\.org/(movie|tv)/(\d+)', query)
-    if tmdb_url_match:
-        m_type = tmdb_url_match.group(1) 
-        m_id = tmdb_url_match.group(2)
-        url = f"https://api.themoviedb.org/3/{m_type}/{m_id}?api_key={TMDB_API_KEY}"
+    result = first_sufficient(tmdb_lookup_candidates(query))
+    if result is None: return jsonify({'error': 'Search Failed'})
+    return jsonify(result)
+
+# --- CLI CHECKPOINTS (backfill.py, catalogue.py) ---
+# লম্বা ইমপোর্ট মাঝপথে থামলে আবার চালালে সেখান থেকে; .tmp এ লিখে নাম বদলায়, তাই অর্ধেক লেখা ফাইল থাকে না
+def checkpoint_path(source, override=None):
+    return override or f"{source}.checkpoint.json"
+
+def load_checkpoint(path, source):
+    if not os.path.exists(path): return None
+    with open(path) as f:
+        state = json.load(f)
+    return state if state.get("source") == os.path.abspath(source) else None
+
+def save_checkpoint(path, source, done, stats):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump({"source": os.path.abspath(source), "done": done, "stats": stats, "saved_at": time.time()}, f)
+    os.replace(tmp, path)
+
+# --- CATALOGUE EXPORT / IMPORT (gzip NDJSON) ---
+# mongodump ছাড়াই ব্যাকআপ/মাইগ্রেশন। প্রথম লাইন হেডার, তারপর প্রতি লাইনে {"c": কালেকশন, "d": ডকুমেন্ট}
+# (Extended JSON, তাই ObjectId আর তারিখ ঠিক থাকে)। সার্ভার-সাইড কার্সর ব্যাচে পড়ে gzip এ একটু একটু করে লেখা হয়,
+# ইমপোর্টও লাইন ধরে পড়ে চাংকে লেখে; কোনো দিকেই পুরো কালেকশন মেমরিতে আসে না। CLI: catalogue.py
+CATALOGUE_FORMAT = "moviezone-catalogue"
+CATALOGUE_VERSION = 1
+CATALOGUE_COLLECTIONS = {"movies": movies, "categories": categories, "settings": settings}
+CATALOGUE_BATCH = 500               # কার্সরের ব্যাচ সাইজ
+CATALOGUE_CHUNK = 1000              # ইমপোর্টে প্রতি bulk_write এর ডকুমেন্ট
+CATALOGUE_GZIP_CHUNK = 64 * 1024    # এতটুকু জমলে কম্প্রেস করে পাঠানো/লেখা
+
+def catalogue_names(names=None):
+    names = names or list(CATALOGUE_COLLECTIONS)
+    unknown = [n for n in names if n not in CATALOGUE_COLLECTIONS]
+    if unknown: raise ValueError(f"Unknown collection(s): {', '.join(unknown)}")
+    return names
+
+def catalogue_lines(names=None, batch_size=CATALOGUE_BATCH, stats=None):
+    """ হেডার, তারপর প্রতিটা কালেকশন _id ক্রমে (bytes লাইন); stats দিলে সেখানে রো গোনা হয় """
+    names = catalogue_names(names)
+    header = {"format": CATALOGUE_FORMAT, "version": CATALOGUE_VERSION, "collections": names,
+              "exported_at": as_utc(utc_now()).isoformat()}
+    yield (json.dumps(header) + "\n").encode()
+    for name in names:
+        for doc in CATALOGUE_COLLECTIONS[name].find({}).sort("_id", 1).batch_size(batch_size):
+            yield (json_util.dumps({"c": name, "d": doc}, json_options=json_util.RELAXED_JSON_OPTIONS) + "\n").encode()
+            if stats is not None: stats["rows"] = stats.get("rows", 0) + 1
+
+def gzip_chunks(lines):
+    """ লাইনগুলো CATALOGUE_GZIP_CHUNK করে জমিয়ে একটা gzip স্ট্রিমের অংশ হিসেবে yield করে """
+    compress, flush = make_compressor('gzip')
+    buffer, size = [], 0
+    for line in lines:
+        buffer.append(line)
+        size += len(line)
+        if size >= CATALOGUE_GZIP_CHUNK:
+            out = compress(b"".join(buffer))
+            buffer, size = [], 0
+            if out: yield out
+    yield compress(b"".join(buffer)) + flush()
+
+def export_catalogue(path, names=None, batch_size=CATALOGUE_BATCH, progress=None, progress_every=10000):
+    """ ফাইলে লেখে (শেষ হলে তবেই path এ বসে); রিটার্ন: {'rows', 'seconds', 'rows_per_sec', 'bytes'} """
+    stats, started = {"rows": 0}, time.perf_counter()
+    tmp = f"{path}.tmp"
+    next_report = progress_every
+    with open(tmp, "wb") as f:
+        for chunk in gzip_chunks(catalogue_lines(names, batch_size, stats)):
+            f.write(chunk)
+            if progress and stats["rows"] >= next_report:
+                progress(stats["rows"], time.perf_counter() - started)
+                next_report += progress_every
+    os.replace(tmp, path)
+    seconds = time.perf_counter() - started
+    return {**stats, "seconds": round(seconds, 2), "rows_per_sec": round(stats["rows"] / max(seconds, 1e-9)),
+            "bytes": os.path.getsize(path)}
+
+def read_catalogue(path):
+    """ (লাইন নম্বর, কালেকশন, ডকুমেন্ট); হেডার না মিললে ValueError """
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        header = json.loads(f.readline() or "{}")
+        if header.get("format") != CATALOGUE_FORMAT or header.get("version", 0) > CATALOGUE_VERSION:
+            raise ValueError(f"{path} is not a {CATALOGUE_FORMAT} v{CATALOGUE_VERSION} export")
+        for lineno, line in enumerate(f, start=1):
+            if not line.strip(): continue
+            row = json_util.loads(line)
+            yield lineno, row["c"], row["d"]
+
+def write_catalogue_chunk(name, docs, stats):
+    """ _id অনুযায়ী unordered upsert; অন্য _id এর একই টাইটেল (ইনজেস্ট ইউনিক ইনডেক্স) থাকলে conflict গোনা হয় """
+    try:
+        result = CATALOGUE_COLLECTIONS[name].bulk_write([ReplaceOne({"_id": d["_id"]}, d, upsert=True) for d in docs],
+                                                        ordered=False).bulk_api_result
+    except BulkWriteError as e:
+        result = e.details
+        errors = result.get("writeErrors", [])
+        if any(err.get("code") != 11000 for err in errors): raise
+        stats["conflicts"] += len(errors)
+    stats["upserted"] += result.get("nUpserted", 0)
+    stats["modified"] += result.get("nModified", 0)
+
+def import_catalogue(path, chunk_size=CATALOGUE_CHUNK, skip=0, on_chunk=None, stats=None):
+    """
+    skip: আগের রানে শেষ হওয়া লাইন সংখ্যা (রিজিউম)। প্রতি চাংক লেখার পর on_chunk(শেষ লাইন, stats) ডাকা হয়;
+    রিটার্ন: stats ('rows', 'upserted', 'modified', 'conflicts', 'skipped', 'seconds', 'rows_per_sec')
+    """
+    stats = stats or {"rows": 0, "upserted": 0, "modified": 0, "conflicts": 0, "skipped": 0}
+    started, rows_before = time.perf_counter(), stats["rows"]
+    pending, count, done = {}, 0, skip
+
+    def flush():
+        nonlocal pending, count
+        for name, docs in pending.items():
+            write_catalogue_chunk(name, docs, stats)
+        pending, count = {}, 0
+        if on_chunk: on_chunk(done, stats)
+
+    for lineno, name, doc in read_catalogue(path):
+        if lineno <= skip: continue
+        done = lineno
+        stats["rows"] += 1
+        if name not in CATALOGUE_COLLECTIONS:
+            stats["skipped"] += 1
+            continue
+        pending.setdefault(name, []).append(doc)
+        count += 1
+        if count >= chunk_size: flush()
+    flush()
+    seconds = time.perf_counter() - started
+    stats.update(seconds=round(seconds, 2), rows_per_sec=round((stats["rows"] - rows_before) / max(seconds, 1e-9)))
+    return stats
+
+@app.route('/admin/export')
+def admin_export():
+    """ পুরো ক্যাটালগ (বা ?collections=movies,categories) gzip NDJSON হিসেবে স্ট্রিম ডাউনলোড """
+    if not check_auth(): return Response('Login Required', 401, {'WWW-Authenticate': 'Basic realm="Login Required"'})
+    try:
+        names = catalogue_names([n.strip() for n in request.args.get('collections', '').split(',') if n.strip()])
+    except ValueError as e:
+        return str(e), 400
+    stats, started = {"rows": 0}, time.perf_counter()
+
+    def generate():
+        yield from gzip_chunks(catalogue_lines(names, stats=stats))
+        seconds = time.perf_counter() - started
+        print(f"📤 Catalogue export: {stats['rows']} rows in {seconds:.1f}s ({stats['rows'] / max(seconds, 1e-9):.0f} rows/s)")
+
+    filename = f"catalogue-{utc_now().strftime('%Y%m%d-%H%M')}.ndjson.gz"
+    return Response(generate(), mimetype="application/gzip",
+                    headers={"Content-Disposition": f'attachment; filename="{filename}"', "Cache-Control": "no-store"})
+
+# --- APP FACTORY & BACKGROUND SERVICES ---
+# ইমপোর্টে কোনো সাইড-ইফেক্ট নেই (কানেকশন, থ্রেড)। চালানোর উপায়:
+#     gunicorn --preload -w 4 'bot:create_app()'
+#     python bot.py
+# প্রতিটা প্রসেসের সার্ভিস সেই প্রসেসের প্রথম রিকোয়েস্টে চালু হয় (fork এর পরে, তাই থ্রেড হারায় না)।
+#   - প্রসেস-লোকাল: suggest ইনডেক্স sync (প্রতিটা ওয়ার্কারের নিজের মেমরির ইনডেক্স)
+#   - সিঙ্গেলটন: অটো-ইমপোর্ট, এনরিচমেন্ট retry, ইনজেস্ট ইনডেক্স; সব প্রসেস মিলিয়ে একটাই চালায়
+# BACKGROUND_SERVICES = auto (ডিফল্ট: Mongo লিজ যে প্রসেস পায় সে চালায়)
+#                     | on   (লিজ ছাড়াই এই প্রসেস চালায়, এক-প্রসেস ডিপ্লয়)
+#                     | off  (ওয়েব প্রসেস চালায় না; আলাদা `python bot.py services` চালাবে)
+BACKGROUND_SERVICES = os.getenv("BACKGROUND_SERVICES", "auto").lower()
+SERVICE_LEASE_TTL = int(os.getenv("SERVICE_LEASE_TTL", 60))
+
+class MongoLease:
+    """
+    locks কালেকশনে নাম অনুযায়ী একটা ডকুমেন্ট। owner মেয়াদ শেষ হওয়ার আগে রিনিউ না করলে অন্য প্রসেস নিতে পারে।
+    held লোকাল monotonic সময় দিয়ে হিসাব হয় (রিনিউ শুরুর সময় থেকে ttl), তাই সার্ভারের মেয়াদের আগেই শেষ হয়।
+    """
+    def __init__(self, name, ttl=SERVICE_LEASE_TTL):
+        self.name = name
+        self.ttl = ttl
+        self.expires = 0
+        self._pid = None
+        self._owner = None
+
+    @property
+    def owner(self):
+        # fork হওয়া চাইল্ড মাস্টারের owner পায় না
+        if self._pid != os.getpid():
+            self._pid, self._owner, self.expires = os.getpid(), f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}", 0
+        return self._owner
+
+    @property
+    def held(self):
+        return self._pid == os.getpid() and time.monotonic() < self.expires
+
+    def acquire(self):
+        """ নতুন করে নেয় বা রিনিউ করে; অন্য কারো মেয়াদি লিজ থাকলে False """
+        owner, started, now = self.owner, time.monotonic(), utc_now()
         try:
-            resp = requests.get(url)
-            if resp.status_code == 200:
-                data = resp.json()
-                data['media_type'] = m_type
-                return jsonify({'results': [data]})
-        except: pass
-
-    imdb_match = re.search(r'(tt\d+)', query)
-    if imdb_match:
-        imdb_id = imdb_match.group(1)
-        url = f"https://api.themoviedb.org/3/find/{imdb_id}?api_key={TMDB_API_KEY}&external_source=imdb_id"
+            locks.find_one_and_update(
+                {"_id": self.name, "$or": [{"owner": owner}, {"expires_at": {"$lt": now}}]},
+                {"$set": {"owner": owner, "expires_at": now + timedelta(seconds=self.ttl), "renewed_at": now}},
+                upsert=True)
+        except DuplicateKeyError:
+            # ফিল্টার মেলেনি (অন্যের লিজ), তাই upsert একই _id ঢোকাতে গিয়ে আটকে গেছে
+            self.expires = 0
+            return False
+        self.expires = started + self.ttl
+        return True
+
+    def release(self):
+        if self.held:
+            locks.delete_one({"_id": self.name, "owner": self.owner})
+        self.expires = 0
+
+service_lease = MongoLease("background_services")
+
+def singleton_active():
+    """ সিঙ্গেলটন সার্ভিসের লুপগুলো প্রতি রাউন্ডে এটা দেখে; লিজ হারালে কাজ থামে, আবার পেলে চলে """
+    return BACKGROUND_SERVICES == "on" or service_lease.held
+
+SINGLETON_SERVICES = (start_scheduler, start_enrich_retry, ensure_ingest_index, start_report_digest, start_file_checker,
+                      start_trending, start_media_group_sweeper, start_delete_sweeper)
+PROCESS_SERVICES = (start_suggest_sync, watch_ingest_index, start_rate_limit_sync, start_counter_flush)
+
+def run_singleton_services():
+    """ লিজ রিনিউ লুপ; প্রথমবার লিজ পেলে সিঙ্গেলটন থ্রেডগুলো চালু হয় (on মোডে লিজ ছাড়াই) """
+    started = False
+    while True:
         try:
-            data = requests.get(url).json()
-            results = []
-            if 'movie_results' in data and data['movie_results']: 
-                for item in data['movie_results']: item['media_type'] = 'movie'
-                results.extend(data['movie_results'])
-            if 'tv_results' in data and data['tv_results']:
-                for item in data['tv_results']: item['media_type'] = 'tv'
-                results.extend(data['tv_results'])
-            if results: return jsonify({'results': results})
-        except: pass
+            active = BACKGROUND_SERVICES == "on" or service_lease.acquire()
+        except Exception as e:
+            print(f"Service Lease Error: {e}")
+            active = False
+        if active and not started:
+            print(f"🛠️ Background services running in pid {os.getpid()}")
+            for target in SINGLETON_SERVICES:
+                threading.Thread(target=target, daemon=True).start()
+            started = True
+        if BACKGROUND_SERVICES == "on": return
+        time.sleep(SERVICE_LEASE_TTL / 3)
+
+_services = {"pid": None}
+_services_lock = threading.Lock()
+cold_start = {"started": PROCESS_STARTED, "import_ms": None, "first_request_ms": None}
+
+def start_services():
+    """ বর্তমান প্রসেসের সার্ভিসগুলো একবারই চালু করে (fork হওয়া প্রসেসে আবার); প্রথমবার হলে True """
+    pid = os.getpid()
+    if _services["pid"] == pid: return False
+    with _services_lock:
+        if _services["pid"] == pid: return False
+        _services["pid"] = pid
+    for target in PROCESS_SERVICES:
+        threading.Thread(target=target, daemon=True).start()
+    if BACKGROUND_SERVICES != "off":
+        threading.Thread(target=run_singleton_services, daemon=True).start()
+    return True
 
-    if query.isdigit():
-        tmdb_id = query
-        try:
-            url_movie = f"https://api.themoviedb.org/3/movie/{tmdb_id}?api_key={TMDB_API_KEY}"
-            resp = requests.get(url_movie)
-            if resp.status_code == 200:
-                data = resp.json()
-                data['media_type'] = 'movie'
-                return jsonify({'results': [data]})
-            url_tv = f"https://api.themoviedb.org/3/tv/{tmdb_id}?api_key={TMDB_API_KEY}"
-            resp = requests.get(url_tv)
-            if resp.status_code == 200:
-                data = resp.json()
-                data['media_type'] = 'tv'
-                return jsonify({'results': [data]})
-        except: pass
+def reset_after_fork():
+    # fork এর মুহূর্তে অন্য থ্রেড লক ধরে থাকলে চাইল্ডে সেটা কখনো ছাড়া হবে না
+    global _mongo_lock, _services_lock
+    _mongo_lock, _services_lock = threading.Lock(), threading.Lock()
+    cold_start.update(started=time.perf_counter(), first_request_ms=None)
 
-    url = f"https://api.themoviedb.org/3/search/multi?api_key={TMDB_API_KEY}&query={requests.utils.quote(query)}"
-    try:
-        data = requests.get(url).json()
-        return jsonify(data)
-    except: return jsonify({'error': 'Search Failed'})
+os.register_at_fork(after_in_child=reset_after_fork)
+
+@app.before_request
+def start_services_on_first_request():
+    if _services["pid"] != os.getpid() and start_services():
+        g.first_request = True
+
+@app.teardown_request
+def record_cold_start(exc=None):
+    if g.pop('first_request', False):
+        cold_start["first_request_ms"] = round((time.perf_counter() - cold_start["started"]) * 1000, 1)
+        print(f"🚀 pid {os.getpid()}: first request served {cold_start['first_request_ms']}ms after start "
+              f"(import {cold_start['import_ms']}ms)")
+
+def create_app():
+    """ WSGI এন্ট্রি পয়েন্ট; বারবার ডাকলেও একই app ফেরত দেয়, রুট একবারই যোগ হয় """
+    if BOT_TOKEN and 'telegram_webhook' not in app.view_functions:
+        app.add_url_rule(f'/webhook/{BOT_TOKEN}', 'telegram_webhook', telegram_webhook, methods=['POST'])
+    return app
+
+# ইমপোর্টেই রুট যোগ: পুরনো `gunicorn bot:app` ডিপ্লয়েও /webhook/<token> থাকে
+create_app()
 
-# --- START THREAD BEFORE APP RUN ---
-# অ্যাপ রান হওয়ার আগে ব্যাকগ্রাউন্ড প্রসেস চালু করা
-threading.Thread(target=start_scheduler, daemon=True).start()
+cold_start["import_ms"] = round((time.perf_counter() - PROCESS_STARTED) * 1000, 1)
 
 if __name__ == '__main__':
-    if WEBSITE_URL and BOT_TOKEN:
+    # python bot.py build-assets  ->  static/dist এ হ্যাশড + .gz/.br ফাইল এবং manifest.json লিখে
+    if len(sys.argv) > 1 and sys.argv[1] == 'build-assets':
+        for src, hashed in build_assets(write=True).items():
+            print(f"📦 {src} -> {hashed}")
+        sys.exit(0)
+
+    # python bot.py migrate-images  ->  পুরনো w500/w1280/w185 URL গুলোকে TMDB পাথ কি তে রূপান্তর
+    if len(sys.argv) > 1 and sys.argv[1] == 'migrate-images':
+        print(f"🖼️ Migrated {migrate_image_keys()} documents to image path keys")
+        sys.exit(0)
+
+    # python bot.py tmdb-index refresh [MM_DD_YYYY]           ->  TMDB ডেইলি এক্সপোর্ট থেকে লোকাল টাইটেল ইনডেক্স
+    # python bot.py tmdb-index build movie|tv FILE.json.gz    ->  ডাউনলোড করা এক্সপোর্ট ফাইল থেকে
+    # python bot.py tmdb-index lookup movie|tv "title" [year]
+    if len(sys.argv) > 2 and sys.argv[1] == 'tmdb-index':
+        action, args = sys.argv[2], sys.argv[3:]
+        if action == 'refresh':
+            for kind, count in refresh_tmdb_index(args[0] if args else None).items():
+                print(f"🎬 {kind}: {count} titles -> {TMDB_INDEX_DIR}")
+        elif action == 'build':
+            with gzip.open(args[1], "rt", encoding="utf-8") as f:
+                print(f"🎬 {args[0]}: {build_tmdb_index(args[0], f, source=os.path.basename(args[1]))} titles")
+        elif action == 'lookup':
+            started = time.perf_counter()
+            ids = local_tmdb_index.candidates(args[1], args[0])
+            print(f"🔎 {ids} ({(time.perf_counter() - started) * 1000:.2f}ms)")
+            if len(args) > 2 and ids:
+                print(local_tmdb_details(args[1], args[0], args[2]))
+        sys.exit(0)
+
+    # python bot.py services  ->  শুধু সিঙ্গেলটন ব্যাকগ্রাউন্ড সার্ভিস (ওয়েব প্রসেসে BACKGROUND_SERVICES=off হলে)
+    if len(sys.argv) > 1 and sys.argv[1] == 'services':
+        run_singleton_services()
+        # on মোডে থ্রেডগুলো চালু করেই ফেরে; ডেমন থ্রেড চলতে থাকার জন্য প্রসেস বন্ধ না হওয়া পর্যন্ত অপেক্ষা
+        while True: time.sleep(3600)
+
+    create_app()
+    if WEBSITE_URL and BOT_TOKEN and TELEGRAM_UPDATES == "webhook":
         hook_url = f"{WEBSITE_URL.rstrip('/')}/webhook/{BOT_TOKEN}"
-        try: requests.get(f"https://api.telegram.org/bot{BOT_TOKEN}/setWebhook?url={hook_url}")
+        try: requests.get(f"{TELEGRAM_API_URL}/setWebhook?url={hook_url}")
         except: pass
 
     port = int(os.environ.get("PORT", 5000))
@@ -0,0 +1,92 @@
+"""
+Catalogue export / import (gzip NDJSON)
+
+mongodump ছাড়াই movies, categories আর settings এর ব্যাকআপ নেওয়া বা অন্য ডেটাবেসে সরানো।
+অ্যাডমিন প্যানেলের /admin/export একই ফরম্যাটে ডাউনলোড দেয়।
+
+Usage:
+    python catalogue.py export backup.ndjson.gz
+    python catalogue.py export movies.ndjson.gz --collections movies --batch 1000
+    python catalogue.py import backup.ndjson.gz                 # চেকপয়েন্ট থাকলে সেখান থেকে
+    python catalogue.py import backup.ndjson.gz --chunk 2000 --restart
+
+- এক্সপোর্ট: সার্ভার-সাইড কার্সর (--batch) থেকে লাইন ধরে gzip এ লেখা, মেমরি স্থির থাকে।
+  .tmp ফাইলে লিখে শেষে নাম বদলায়, তাই অর্ধেক ফাইল কখনো আসল নামে থাকে না।
+- ইমপোর্ট: _id অনুযায়ী upsert (একই ফাইল আবার চালালেও ডুপ্লিকেট হয় না), কালেকশন প্রতি --chunk করে
+  unordered bulk_write। প্রতি চাংকের পর <source>.checkpoint.json এ শেষ লাইন লেখা হয়; মাঝপথে থামলে
+  আবার চালালে সেখান থেকে শুরু।
+- শেষে হোম ফিড রিবিল্ড হয় আর সব ওয়েব প্রসেসকে সাজেস্ট ইনডেক্স পুরো রিবিল্ডের সংকেত দেওয়া হয়
+  (admin_jobs "suggest_index"), কারণ ইমপোর্ট করা টাইটেলের updated_at পুরনো।
+- ডেটাবেসে একই টাইটেল অন্য _id তে থাকলে (ইনজেস্টের ইউনিক ইনডেক্স) সেটা conflict হিসেবে গোনা হয়, বদলায় না।
+"""
+import os
+import sys
+import time
+import argparse
+
+import bot
+
+
+# ================================
+#        COMMANDS
+# ================================
+
+def cmd_export(args):
+    names = [n.strip() for n in args.collections.split(",") if n.strip()] if args.collections else None
+    result = bot.export_catalogue(args.path, names, args.batch,
+                                  progress=lambda rows, s: print(f"  {rows} rows | {rows / max(s, 1e-9):.0f} rows/s", flush=True))
+    print(f"✅ Exported {result['rows']} rows to {args.path} in {result['seconds']}s "
+          f"({result['rows_per_sec']} rows/s, {result['bytes'] / 1024 / 1024:.1f} MiB)")
+    return 0
+
+def cmd_import(args):
+    ckpt = bot.checkpoint_path(args.path, args.checkpoint)
+    state = None if args.restart else bot.load_checkpoint(ckpt, args.path)
+    done = state["done"] if state else 0
+    if done: print(f"↩️  Resuming after line {done} ({ckpt})")
+    started, rows_before = time.perf_counter(), state["stats"]["rows"] if state else 0
+
+    def on_chunk(line, stats):
+        bot.save_checkpoint(ckpt, args.path, line, stats)
+        rate = (stats["rows"] - rows_before) / max(time.perf_counter() - started, 1e-9)
+        print(f"  line {line} | {stats['upserted']} new | {stats['modified']} updated | "
+              f"{stats['conflicts']} conflicts | {rate:.0f} rows/s", flush=True)
+
+    stats = bot.import_catalogue(args.path, args.chunk, done, on_chunk, state["stats"] if state else None)
+    if stats["upserted"] or stats["modified"]:
+        bot.ensure_ingest_index()
+        bot.rebuild_home_feed()
+        # ইমপোর্ট করা ডকুমেন্টের updated_at পুরনো, watermark সিঙ্কে আসে না; সব প্রসেসে পুরো রিবিল্ড
+        bot.request_suggest_rebuild()
+    print(f"✅ Import done in {stats['seconds']}s: {stats['rows']} rows ({stats['rows_per_sec']} rows/s), "
+          f"{stats['upserted']} new, {stats['modified']} updated, {stats['conflicts']} conflicts, "
+          f"{stats['skipped']} skipped")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream the catalogue to / from gzip NDJSON")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_export = sub.add_parser("export", help="write movies, categories and settings to a .ndjson.gz file")
+    p_export.add_argument("path")
+    p_export.add_argument("--collections", default=None, help=f"comma separated (default: {','.join(bot.CATALOGUE_COLLECTIONS)})")
+    p_export.add_argument("--batch", type=int, default=bot.CATALOGUE_BATCH, help="cursor batch size")
+    p_export.set_defaults(func=cmd_export)
+
+    p_import = sub.add_parser("import", help="upsert documents from an export file")
+    p_import.add_argument("path")
+    p_import.add_argument("--chunk", type=int, default=bot.CATALOGUE_CHUNK, help="documents per bulk write / checkpoint")
+    p_import.add_argument("--checkpoint", default=None, help="checkpoint file (default: <path>.checkpoint.json)")
+    p_import.add_argument("--restart", action="store_true", help="ignore an existing checkpoint")
+    p_import.set_defaults(func=cmd_import)
+
+    args = parser.parse_args(argv)
+    code = args.func(args)
+    sys.stdout.flush()
+    # bot.py এর ব্যাকগ্রাউন্ড থ্রেডগুলোর জন্য অপেক্ষা না করে বের হওয়া
+    os._exit(code)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,849 @@
+"""
+Offline load-test harness for bot.py
+
+লোকাল ফেক Telegram / TMDB / Shortener সার্ভার চালিয়ে bot.py এর বিভিন্ন রুট
+একসাথে অনেক রিকোয়েস্ট দিয়ে টেস্ট করে। কোনো রিয়েল API বা রিমোট DB লাগে না।
+
+Usage:
+    python loadtest.py run --name before                # সব সিনারিও, baseline সেভ
+    python loadtest.py run --scenario home,movie_detail --concurrency 32 --duration 20
+    python loadtest.py run --latency-ms 300 --error-rate 0.05 --name slow_upstream
+    python loadtest.py run --server asgi --mongo-uri mongodb://localhost/lt --name asgi   # ASGI মোড
+    python loadtest.py compare benchmarks/before.json benchmarks/after.json
+    python loadtest.py fakes                            # শুধু ফেক সার্ভার চালু রাখে (external target এর জন্য)
+    python loadtest.py suggest --titles 100000          # টাইপ-অ্যাহেড ইনডেক্সের বিল্ড টাইম ও কুয়েরি ল্যাটেন্সি
+    python loadtest.py tmdb-index --titles 1000000      # লোকাল TMDB টাইটেল ইনডেক্সের বিল্ড ও লুকআপ ল্যাটেন্সি
+    python loadtest.py coldstart --runs 5               # নতুন প্রসেসে ইমপোর্ট থেকে প্রথম রেসপন্স পর্যন্ত সময়
+    python loadtest.py poll --updates 2000 --workers 16 # getUpdates ওয়ার্কার (poller.py) দিয়ে আপলোড বার্স্ট ড্রেন
+
+Mongo: MONGO_URI (বা --mongo-uri) দিলে লোকাল Mongo ব্যবহার হবে, না দিলে mongomock
+(in-memory) দিয়ে চলবে।
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+import subprocess
+import tempfile
+import urllib.parse
+from datetime import datetime, timedelta
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+BOT_TOKEN = "123456:LOADTEST"
+SOURCE_CHANNEL_ID = "-100111"
+PUBLIC_CHANNEL_ID = "-100222"
+BENCH_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks")
+
+SCENARIOS = ["webhook_channel_post", "webhook_start", "home", "search", "suggest", "movie_detail", "shorten"]
+
+SAMPLE_TITLES = [
+    "The Last Kingdom", "Dark Waters", "Midnight Express", "Silent Hill", "Iron Harbor",
+    "Red Notice", "Blue Lagoon", "Cold Pursuit", "Hidden Figures", "Broken Arrow",
+    "Lost City", "Night Crawler", "Ocean Drive", "Stone Garden", "Golden Hour",
+    "Paper Towns", "Wild Tales", "Black Swan", "White Noise", "Green Room",
+]
+
+
+# ================================
+#        FAKE UPSTREAM SERVERS
+# ================================
+
+class FakeUpstream:
+    """ latency / error rate সহ একটি লোকাল HTTP সার্ভার। handler(path, query, body) -> (status, dict) """
+
+    def __init__(self, name, handler, latency_ms=0, jitter_ms=0, error_rate=0.0):
+        self.name = name
+        self.handler = handler
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.hits = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def address(self):
+        return f"127.0.0.1:{self.server.server_address[1]}"
+
+    @property
+    def url(self):
+        return f"http://{self.address}"
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _make_handler(self):
+        upstream = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _serve(self):
+                parsed = urllib.parse.urlparse(self.path)
+                query = dict(urllib.parse.parse_qsl(parsed.query))
+                length = int(self.headers.get("Content-Length") or 0)
+                body = {}
+                if length:
+                    try: body = json.loads(self.rfile.read(length) or b"{}")
+                    except ValueError: body = {}
+
+                delay = upstream.latency_ms + random.uniform(-upstream.jitter_ms, upstream.jitter_ms)
+                if delay > 0:
+                    time.sleep(delay / 1000.0)
+
+                with upstream._lock:
+                    upstream.hits += 1
+                    failed = random.random() < upstream.error_rate
+                    if failed: upstream.errors += 1
+
+                if failed:
+                    status, payload = 500, {"ok": False, "error": "injected failure"}
+                else:
+                    status, payload = upstream.handler(parsed.path, query, body)
+
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = _serve
+            do_POST = _serve
+
+        return Handler
+
+
+def _title_for(tmdb_id):
+    return f"{SAMPLE_TITLES[tmdb_id % len(SAMPLE_TITLES)]} {tmdb_id // len(SAMPLE_TITLES) or ''}".strip()
+
+
+def _tmdb_item(tmdb_id, media="movie"):
+    title_key = "name" if media == "tv" else "title"
+    date_key = "first_air_date" if media == "tv" else "release_date"
+    return {
+        "id": tmdb_id,
+        title_key: _title_for(tmdb_id),
+        "overview": "Synthetic overview for load testing. " * 4,
+        "poster_path": f"/poster{tmdb_id}.jpg",
+        "backdrop_path": f"/backdrop{tmdb_id}.jpg",
+        date_key: f"20{10 + tmdb_id % 15}-01-01",
+        "vote_average": round(5 + (tmdb_id % 50) / 10, 1),
+        "adult": False,
+        "original_language": "en",
+        "media_type": media,
+    }
+
+
+def tmdb_handler(path, query, body):
+    parts = [p for p in path.split("/") if p]
+    if parts and parts[0] == "3":
+        parts = parts[1:]
+    if not parts:
+        return 404, {"status_message": "not found"}
+
+    if parts[0] == "search":
+        q = query.get("query", "")
+        tmdb_id = (abs(hash(q.lower())) % 5000) + 1
+        media = "tv" if parts[-1] == "tv" else "movie"
+        return 200, {"page": 1, "results": [_tmdb_item(tmdb_id, media)], "total_results": 1}
+
+    if parts[0] in ("trending",) or parts[-1] in ("now_playing",):
+        return 200, {"page": 1, "results": [_tmdb_item(random.randint(1, 5000)) for _ in range(20)]}
+
+    if parts[0] == "find":
+        return 200, {"movie_results": [_tmdb_item(42)], "tv_results": []}
+
+    if parts[0] in ("movie", "tv") and len(parts) >= 2 and parts[1].isdigit():
+        media = parts[0]
+        item = _tmdb_item(int(parts[1]), media)
+        item["genres"] = [{"id": 18, "name": "Drama"}, {"id": 53, "name": "Thriller"}]
+        item["runtime"] = 120
+        item["episode_run_time"] = [45]
+        item["credits"] = {"cast": [{"name": f"Actor {i}", "profile_path": f"/p{i}.jpg"} for i in range(8)]}
+        item["videos"] = {"results": [{"type": "Trailer", "site": "YouTube", "key": "dQw4w9WgXcQ"}]}
+        return 200, item
+
+    return 404, {"status_message": "not found"}
+
+
+_tg_message_id = [1000]
+_tg_lock = threading.Lock()
+_tg_updates = []   # getUpdates কিউ (update_id অনুযায়ী সাজানো)
+
+
+def telegram_handler(path, query, body):
+    method = path.rsplit("/", 1)[-1]
+    if method == "getUpdates":
+        # লং পোলিং নেই: খালি থাকলে সাথে সাথে খালি লিস্ট
+        offset, limit = body.get("offset") or 0, body.get("limit") or 100
+        return 200, {"ok": True, "result": [u for u in _tg_updates if u["update_id"] >= offset][:limit]}
+    with _tg_lock:
+        _tg_message_id[0] += 1
+        msg_id = _tg_message_id[0]
+    if method == "getFile":
+        return 200, {"ok": True, "result": {"file_id": body.get("file_id") or query.get("file_id"), "file_size": 1024}}
+    if method in ("setWebhook", "deleteWebhook", "editMessageReplyMarkup", "deleteMessage"):
+        return 200, {"ok": True, "result": True}
+    return 200, {"ok": True, "result": {"message_id": msg_id, "chat": {"id": body.get("chat_id")}}}
+
+
+def shortener_handler(path, query, body):
+    url = query.get("url", "")
+    return 200, {"status": "success", "shortenedUrl": f"https://short.example/{abs(hash(url)) % 10**8:x}"}
+
+
+def start_fakes(latency_ms=0, jitter_ms=0, error_rate=0.0):
+    return {
+        "telegram": FakeUpstream("telegram", telegram_handler, latency_ms, jitter_ms, error_rate).start(),
+        "tmdb": FakeUpstream("tmdb", tmdb_handler, latency_ms, jitter_ms, error_rate).start(),
+        "shortener": FakeUpstream("shortener", shortener_handler, latency_ms, jitter_ms, error_rate).start(),
+    }
+
+
+def fake_env(fakes, mongo_uri=None):
+    """ bot.py কে ফেক সার্ভারে পয়েন্ট করার জন্য এনভায়রনমেন্ট ভেরিয়েবল """
+    env = {
+        "BOT_TOKEN": BOT_TOKEN,
+        "BOT_USERNAME": "LoadTestBot",
+        "TMDB_API_KEY": "loadtest",
+        "SOURCE_CHANNEL_ID": SOURCE_CHANNEL_ID,
+        "PUBLIC_CHANNEL_ID": PUBLIC_CHANNEL_ID,
+        "WEBSITE_URL": "http://127.0.0.1",
+        "TELEGRAM_API_BASE": fakes["telegram"].url,
+        "TMDB_API_URL": f"{fakes['tmdb'].url}/3",
+        "SHORTENER_SCHEME": "http",
+    }
+    if mongo_uri:
+        env["MONGO_URI"] = mongo_uri
+    return env
+
+
+# ================================
+#        APP UNDER TEST
+# ================================
+
+def load_bot(env, mongo_uri=None):
+    """ ফেক env সেট করে bot.py ইমপোর্ট করে। Mongo URI না থাকলে mongomock ব্যবহার হয়। """
+    os.environ.update(env)
+    if not mongo_uri:
+        try:
+            import mongomock
+        except ImportError:
+            sys.exit("❌ No MONGO_URI given and mongomock is not installed (pip install mongomock).")
+        import pymongo
+        pymongo.MongoClient = mongomock.MongoClient
+        print("ℹ️  Using in-memory mongomock database.")
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import bot
+    return bot
+
+
+def serve_app(app):
+    """ ইন-প্রসেস থ্রেডেড WSGI সার্ভার চালু করে base URL রিটার্ন করে """
+    import logging
+    from werkzeug.serving import make_server
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def serve_asgi():
+    """ asgi.py অ্যাপ uvicorn দিয়ে ব্যাকগ্রাউন্ড থ্রেডে চালায় """
+    import socket
+    import uvicorn
+    import asgi
+
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+
+    config = uvicorn.Config(asgi.app, host="127.0.0.1", port=port, log_level="warning", lifespan="on")
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+
+    class _Handle:
+        def shutdown(self):
+            server.should_exit = True
+
+    return _Handle(), f"http://127.0.0.1:{port}"
+
+
+def seed_catalogue(bot, count):
+    """ সিনারিওর জন্য সিন্থেটিক মুভি/সিরিজ ডকুমেন্ট ইনসার্ট করে """
+    bot.movies.delete_many({"loadtest": True})
+    now = datetime.utcnow()
+    docs = []
+    for i in range(count):
+        is_series = i % 3 == 0
+        files = []
+        for q in ("480p", "720p", "1080p"):
+            for ep in range(1, (6 if is_series else 2)):
+                label = f"S01 E{ep:02d}" if is_series else None
+                files.append({
+                    "file_id": f"FILE_{i}_{q}_{ep}",
+                    "unique_code": f"{i:05d}{q[:1]}{ep:02d}",
+                    "filename": f"{_title_for(i)} {'S01E%02d ' % ep if is_series else ''}{q}.mkv",
+                    "quality": {"480p": "480p SD", "720p": "720p HD", "1080p": "1080p FHD"}[q],
+                    "episode_label": label,
+                    "size": f"{random.randint(200, 2000)}.00 MB",
+                    "file_type": "video",
+                    "added_at": now,
+                })
+        docs.append({
+            "tmdb_id": 100000 + i,
+            "title": _title_for(i),
+            "overview": "Synthetic overview for load testing. " * 6,
+            "poster": f"/poster{i}.jpg",
+            "backdrop": f"https://image.tmdb.org/t/p/w1280/backdrop{i}.jpg" if i % 2 == 0 else None,
+            "release_date": f"20{10 + i % 15}-01-01",
+            "vote_average": round(5 + (i % 50) / 10, 1),
+            "genres": ["Drama", "Thriller"],
+            "runtime": 120,
+            "trailer": "dQw4w9WgXcQ",
+            "cast": [{"name": f"Actor {a}", "img": f"https://image.tmdb.org/t/p/w185/p{a}.jpg"} for a in range(6)],
+            "language": "English",
+            "type": "series" if is_series else "movie",
+            "category": "Uncategorized",
+            "is_adult": False,
+            "files": files,
+            "created_at": now - timedelta(minutes=i),
+            "updated_at": now - timedelta(minutes=i),
+            "loadtest": True,
+        })
+    if docs:
+        bot.movies.insert_many(docs)
+    ids = [str(d["_id"]) for d in docs]
+    codes = [f["unique_code"] for d in docs for f in d["files"]]
+    return ids, codes
+
+
+# ================================
+#        SCENARIOS
+# ================================
+
+class Scenario:
+    """ প্রতিটি কলে (method, path, kwargs) রিটার্ন করে এমন একটি রিকোয়েস্ট ফ্যাক্টরি """
+
+    def __init__(self, name, factory):
+        self.name = name
+        self.factory = factory
+
+
+def build_scenarios(ids, codes, shortener_address):
+    counter = {"n": 0}
+    lock = threading.Lock()
+
+    def next_n():
+        with lock:
+            counter["n"] += 1
+            return counter["n"]
+
+    def channel_post():
+        n = next_n()
+        title = SAMPLE_TITLES[n % len(SAMPLE_TITLES)]
+        series = n % 2 == 0
+        name = f"{title}.S01E{n % 24 + 1:02d}.720p.WEB-DL.mkv" if series else f"{title}.{2000 + n % 24}.1080p.BluRay.mkv"
+        update = {
+            "update_id": n,
+            "channel_post": {
+                "message_id": n,
+                "chat": {"id": int(SOURCE_CHANNEL_ID), "type": "channel"},
+                "date": int(time.time()),
+                "video": {"file_id": f"LT_{n}_{random.random()}", "file_name": name, "file_size": 734003200},
+            },
+        }
+        return "POST", f"/webhook/{BOT_TOKEN}", {"json": update}
+
+    def start_cmd():
+        n = next_n()
+        code = random.choice(codes) if codes else "missing"
+        update = {
+            "update_id": n,
+            "message": {"message_id": n, "chat": {"id": 5000 + n % 100, "type": "private"}, "text": f"/start {code}"},
+        }
+        return "POST", f"/webhook/{BOT_TOKEN}", {"json": update}
+
+    def home():
+        page = random.choice([1, 1, 1, 2, 3])
+        params = {"page": page}
+        if random.random() < 0.3:
+            params["type"] = random.choice(["movie", "series"])
+        return "GET", "/", {"params": params}
+
+    def search():
+        title = random.choice(SAMPLE_TITLES)
+        return "GET", "/", {"params": {"q": title.split()[random.randint(0, len(title.split()) - 1)]}}
+
+    def suggest():
+        title = random.choice(SAMPLE_TITLES)
+        return "GET", "/api/suggest", {"params": {"q": title[:random.randint(1, 6)]}}
+
+    def detail():
+        return "GET", f"/movie/{random.choice(ids)}", {}
+
+    def shorten():
+        code = random.choice(codes) if codes else "x"
+        return "GET", "/api/shorten", {"params": {
+            "url": f"https://t.me/LoadTestBot?start={code}",
+            "api": "loadtest-key",
+            "domain": shortener_address,
+        }}
+
+    return {
+        "webhook_channel_post": Scenario("webhook_channel_post", channel_post),
+        "webhook_start": Scenario("webhook_start", start_cmd),
+        "home": Scenario("home", home),
+        "search": Scenario("search", search),
+        "suggest": Scenario("suggest", suggest),
+        "movie_detail": Scenario("movie_detail", detail),
+        "shorten": Scenario("shorten", shorten),
+    }
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * (pct / 100.0)
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def run_scenario(base_url, scenario, concurrency, duration, max_requests=None, headers=None):
+    """ নির্দিষ্ট সময় ধরে concurrency সংখ্যক থ্রেড দিয়ে একটি সিনারিও চালায় """
+    latencies = []
+    statuses = {}
+    errors = 0
+    sent_bytes = 0
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+    issued = {"n": 0}
+
+    def worker():
+        nonlocal errors, sent_bytes
+        session = requests.Session()
+        if headers:
+            session.headers.update(headers)
+        while time.perf_counter() < deadline:
+            with lock:
+                if max_requests and issued["n"] >= max_requests:
+                    return
+                issued["n"] += 1
+            method, path, kwargs = scenario.factory()
+            start = time.perf_counter()
+            try:
+                resp = session.request(method, base_url + path, timeout=30, allow_redirects=False, stream=True, **kwargs)
+                size = len(resp.raw.read(decode_content=False))   # wire bytes (কম্প্রেসড সাইজ)
+                elapsed = time.perf_counter() - start
+                resp.close()
+                with lock:
+                    latencies.append(elapsed)
+                    statuses[resp.status_code] = statuses.get(resp.status_code, 0) + 1
+                    sent_bytes += size
+                    if resp.status_code >= 500: errors += 1
+            except requests.RequestException:
+                with lock:
+                    latencies.append(time.perf_counter() - start)
+                    errors += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(worker)
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    total = len(latencies)
+    return {
+        "requests": total,
+        "errors": errors,
+        "statuses": {str(k): v for k, v in sorted(statuses.items())},
+        "wall_seconds": round(wall, 3),
+        "throughput_rps": round(total / wall, 2) if wall else 0.0,
+        "latency_ms": {
+            "mean": round(1000 * sum(latencies) / total, 2) if total else 0.0,
+            "p50": round(1000 * percentile(latencies, 50), 2),
+            "p95": round(1000 * percentile(latencies, 95), 2),
+            "p99": round(1000 * percentile(latencies, 99), 2),
+            "max": round(1000 * latencies[-1], 2) if total else 0.0,
+        },
+        "avg_response_bytes": round(sent_bytes / total) if total else 0,
+    }
+
+
+# ================================
+#        BASELINE FILES
+# ================================
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except Exception:
+        return None
+
+
+def save_baseline(name, report):
+    os.makedirs(BENCH_DIR, exist_ok=True)
+    path = os.path.join(BENCH_DIR, f"{name}.json")
+    with open(path, "w") as fh:
+        json.dump(report, fh, indent=2, sort_keys=True)
+    return path
+
+
+def fetch_server_stats(base_url):
+    """ সার্ভারের /admin/api/stats (কম্প্রেশন রেশিও, CPU ইত্যাদি) """
+    try:
+        resp = requests.get(f"{base_url}/admin/api/stats",
+                            auth=(os.getenv("ADMIN_USERNAME", "admin"), os.getenv("ADMIN_PASSWORD", "admin")), timeout=10)
+        return resp.json() if resp.status_code == 200 else {}
+    except (requests.RequestException, ValueError):
+        return {}
+
+
+def print_report(report):
+    print(f"\n{'scenario':<22}{'reqs':>8}{'err':>6}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'bytes':>10}")
+    for name, r in report["scenarios"].items():
+        lat = r["latency_ms"]
+        print(f"{name:<22}{r['requests']:>8}{r['errors']:>6}{r['throughput_rps']:>10}{lat['p50']:>10}{lat['p95']:>10}{lat['p99']:>10}{r['avg_response_bytes']:>10}")
+    for encoding, row in (report.get("server_stats") or {}).get("compression", {}).items():
+        print(f"🗜️  {encoding}: {row['responses']} responses, ratio {row['ratio']}x, "
+              f"{row['cpu_ms_per_response']} ms CPU/response, {row['cache_hits']} cache hits")
+
+
+def compare(path_a, path_b):
+    a = json.load(open(path_a))
+    b = json.load(open(path_b))
+    print(f"A: {path_a} ({a['meta'].get('git')})  B: {path_b} ({b['meta'].get('git')})")
+    print(f"\n{'scenario':<22}{'metric':<10}{'A':>12}{'B':>12}{'change':>10}")
+    for name in sorted(set(a["scenarios"]) | set(b["scenarios"])):
+        ra, rb = a["scenarios"].get(name), b["scenarios"].get(name)
+        if not ra or not rb:
+            print(f"{name:<22}{'(missing in one run)':<10}")
+            continue
+        rows = [("rps", ra["throughput_rps"], rb["throughput_rps"])]
+        rows += [(p, ra["latency_ms"][p], rb["latency_ms"][p]) for p in ("p50", "p95", "p99")]
+        rows.append(("bytes", ra["avg_response_bytes"], rb["avg_response_bytes"]))
+        for metric, va, vb in rows:
+            change = f"{(vb - va) / va * 100:+.1f}%" if va else "n/a"
+            print(f"{name:<22}{metric:<10}{va:>12}{vb:>12}{change:>10}")
+
+
+# ================================
+#        CLI
+# ================================
+
+def cmd_run(args):
+    mongo_uri = args.mongo_uri or os.getenv("MONGO_URI")
+    if (args.target or args.server == "asgi") and not mongo_uri:
+        sys.exit("❌ --target / --server asgi need a shared --mongo-uri so the server sees the seeded data.")
+    fakes = start_fakes(args.latency_ms, args.jitter_ms, args.error_rate)
+    env = fake_env(fakes, mongo_uri)
+    bot = load_bot(env, mongo_uri)
+
+    print(f"🌱 Seeding {args.seed} documents...")
+    ids, codes = seed_catalogue(bot, args.seed)
+
+    server = None
+    if args.target:
+        base_url = args.target.rstrip('/')
+    elif args.server == "asgi":
+        server, base_url = serve_asgi()
+    else:
+        server, base_url = serve_app(bot.create_app())
+    print(f"🎯 Target: {base_url}")
+
+    names = [s.strip() for s in args.scenario.split(",") if s.strip()] if args.scenario else SCENARIOS
+    scenarios = build_scenarios(ids, codes, fakes["shortener"].address)
+    headers = {"Accept-Encoding": args.accept_encoding or "identity"}
+
+    report = {
+        "meta": {
+            "name": args.name,
+            "git": git_revision(),
+            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "target": "external" if args.target else f"{args.server}-inprocess",
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "seed": args.seed,
+            "upstream_latency_ms": args.latency_ms,
+            "upstream_jitter_ms": args.jitter_ms,
+            "upstream_error_rate": args.error_rate,
+            "accept_encoding": args.accept_encoding or "identity",
+            "mongo": "uri" if mongo_uri else "mongomock",
+        },
+        "scenarios": {},
+    }
+
+    for name in names:
+        if name not in scenarios:
+            sys.exit(f"❌ Unknown scenario '{name}'. Available: {', '.join(scenarios)}")
+        print(f"▶️  {name} ...")
+        if args.warmup:
+            run_scenario(base_url, scenarios[name], min(args.concurrency, 4), args.warmup, headers=headers)
+        report["scenarios"][name] = run_scenario(base_url, scenarios[name], args.concurrency, args.duration,
+                                                 args.max_requests, headers=headers)
+
+    report["meta"]["upstream_hits"] = {k: f.hits for k, f in fakes.items()}
+    report["server_stats"] = fetch_server_stats(base_url)
+    print_report(report)
+    if args.name:
+        print(f"\n💾 Baseline saved: {save_baseline(args.name, report)}")
+
+    if server:
+        server.shutdown()
+    for f in fakes.values():
+        f.stop()
+    # bot.py এর auto-delete থ্রেডগুলো (DELETE_TIMEOUT) শেষ হওয়ার জন্য অপেক্ষা না করে বের হওয়া
+    sys.stdout.flush()
+    os._exit(0)
+
+
+def cmd_fakes(args):
+    fakes = start_fakes(args.latency_ms, args.jitter_ms, args.error_rate)
+    for key, value in fake_env(fakes, args.mongo_uri or os.getenv("MONGO_URI")).items():
+        print(f"export {key}='{value}'")
+    print("# Fake upstreams running. Ctrl+C to stop.", flush=True)
+    try:
+        while True: time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+
+
+def cmd_suggest(args):
+    """ Mongo ছাড়াই সিন্থেটিক টাইটেল দিয়ে SuggestIndex এর বিল্ড টাইম, মেমরি আর কুয়েরি ল্যাটেন্সি মাপে """
+    bot = load_bot(fake_env(start_fakes()))
+    rnd = random.Random(args.titles)
+    words = [w for t in SAMPLE_TITLES for w in t.split()] + ["Amar", "Tumi", "Prem", "Pokémon", "Café"]
+    now = datetime.utcnow()
+    docs = [{
+        "_id": bot.ObjectId(),
+        "title": " ".join(rnd.choice(words) for _ in range(rnd.randint(1, 4))) + f" {i}",
+        "type": rnd.choice(["movie", "series"]),
+        "release_date": f"{rnd.randint(1990, 2025)}-01-01",
+        "vote_average": round(rnd.uniform(1, 9.5), 1),
+        "created_at": now - timedelta(days=rnd.randint(0, 720)),
+        "files": [{}] if i % 3 else [],
+    } for i in range(args.titles)]
+
+    index = bot.SuggestIndex()
+    index.rebuild(docs)
+    stats = index.snapshot()
+    print(f"build: {stats['build_ms']}ms for {stats['titles']} titles (target {bot.SUGGEST_BUILD_TARGET_MS}ms)")
+    print(f"entries: {stats['entries']} ({stats['entry_bytes'] / 1024:.0f} KiB), hot prefixes: {stats['hot_prefixes']}")
+
+    prefixes = [t[:n] for t in (rnd.choice(docs)["title"] for _ in range(args.queries)) for n in (1, 2, 3, 5, 8)]
+    latencies = []
+    for prefix in prefixes:
+        started = time.perf_counter()
+        index.search(prefix)
+        latencies.append((time.perf_counter() - started) * 1000)
+    latencies.sort()
+    print(f"query ms: p50 {percentile(latencies, 50):.3f}  p95 {percentile(latencies, 95):.3f}  "
+          f"p99 {percentile(latencies, 99):.3f}  max {latencies[-1]:.3f}  ({len(latencies)} queries)")
+    sys.stdout.flush()
+    os._exit(0)
+
+
+def cmd_tmdb_index(args):
+    """ সিন্থেটিক ডেইলি এক্সপোর্ট থেকে লোকাল TMDB ইনডেক্স বানিয়ে exact / fuzzy / miss লুকআপ মাপে """
+    bot = load_bot(fake_env(start_fakes()))
+    rnd = random.Random(args.titles)
+    words = [w for t in SAMPLE_TITLES for w in t.split()] + ["Amar", "Tumi", "Prem", "Pokémon", "Café", "Night", "Return"]
+    titles = [" ".join(rnd.choice(words) for _ in range(rnd.randint(1, 4))) + f" {rnd.choice(words)}{i}"
+              for i in range(args.titles)]
+    lines = (json.dumps({"adult": False, "id": i + 1, "original_title": title, "popularity": round(rnd.expovariate(0.2), 3)})
+             for i, title in enumerate(titles))
+
+    out_dir = tempfile.mkdtemp(prefix="tmdb_index_")
+    started = time.perf_counter()
+    count = bot.build_tmdb_index("movie", lines, out_dir)
+    build_s = time.perf_counter() - started
+    size = sum(os.path.getsize(bot.tmdb_index_path("movie", ext, out_dir)) for ext in ("keys", "recs"))
+    print(f"build: {build_s:.1f}s for {count} titles, {size / 1024 / 1024:.1f} MiB on disk ({out_dir})")
+
+    index = bot.LocalTmdbIndex(out_dir)
+    samples = [rnd.choice(titles) for _ in range(args.queries)]
+
+    def typo(title):
+        # প্রথম শব্দ ঠিক রেখে পরের অংশে একটা অক্ষর বদল (ফাইলনেমের ছোটখাটো বানান ভুলের মতো)
+        cut = title.index(" ") + 1 + rnd.randrange(len(title) - title.index(" ") - 1) if " " in title else len(title) - 1
+        return title[:cut] + "x" + title[cut + 1:]
+
+    for name, queries in (("exact", samples), ("fuzzy", [typo(t) for t in samples]),
+                          ("miss", [f"Zzqx Unknown {i}" for i in range(args.queries)])):
+        latencies, found = [], 0
+        for query in queries:
+            started = time.perf_counter()
+            found += bool(index.candidates(query, "movie"))
+            latencies.append((time.perf_counter() - started) * 1000)
+        latencies.sort()
+        print(f"{name:5} ms: p50 {percentile(latencies, 50):.3f}  p95 {percentile(latencies, 95):.3f}  "
+              f"p99 {percentile(latencies, 99):.3f}  max {latencies[-1]:.3f}  (found {found}/{len(queries)})")
+    sys.stdout.flush()
+    os._exit(0)
+
+
+def cmd_coldstart(args):
+    """
+    নতুন প্রসেসে bot.py ইমপোর্ট করে WSGI সার্ভার চালায় এবং প্রসেস শুরু থেকে প্রথম রেসপন্স পর্যন্ত সময় মাপে।
+    ইমপোর্টে কানেকশন বা থ্রেড নেই, তাই এটাই একটা (preload ছাড়া) gunicorn ওয়ার্কারের কোল্ড স্টার্ট।
+    """
+    if args.child:
+        bot = load_bot({}, os.getenv("MONGO_URI"))
+        _, base_url = serve_app(bot.create_app())
+        print(f"LISTENING {base_url}", flush=True)
+        while True: time.sleep(3600)
+    fakes = start_fakes()
+    env = dict(os.environ, **fake_env(fakes, args.mongo_uri or os.getenv("MONGO_URI")))
+    auth = (os.getenv("ADMIN_USERNAME", "admin"), os.getenv("ADMIN_PASSWORD", "admin"))
+    runs = []
+    for run in range(args.runs):
+        started = time.perf_counter()
+        child = subprocess.Popen([sys.executable, os.path.abspath(__file__), "coldstart", "--child"],
+                                 env=env, stdout=subprocess.PIPE, text=True)
+        try:
+            base_url = next(line.split()[1] for line in child.stdout if line.startswith("LISTENING "))
+            # বাকি আউটপুট ড্রেন না করলে পাইপ ভরে গিয়ে চাইল্ড আটকে যায়
+            threading.Thread(target=child.stdout.read, daemon=True).start()
+            listening = time.perf_counter() - started
+            requests.get(base_url + args.path, timeout=30)
+            first = time.perf_counter() - started
+            warm_started = time.perf_counter()
+            requests.get(base_url + args.path, timeout=30)
+            warm = time.perf_counter() - warm_started
+            inner = requests.get(base_url + "/admin/api/stats", auth=auth, timeout=30).json().get("cold_start", {})
+        finally:
+            child.kill()
+            child.wait()
+        runs.append((listening, first, warm))
+        print(f"run {run + 1}: listening {listening * 1000:.0f}ms  first response {first * 1000:.0f}ms  "
+              f"warm {warm * 1000:.1f}ms  (in-process: import {inner.get('import_ms')}ms, "
+              f"first request {inner.get('first_request_ms')}ms)", flush=True)
+    firsts = sorted(r[1] * 1000 for r in runs)
+    print(f"cold start to first response ({args.path}): p50 {percentile(firsts, 50):.0f}ms  max {firsts[-1]:.0f}ms")
+
+
+def cmd_poll(args):
+    """
+    ফেক Telegram এর getUpdates কিউতে একটা আপলোড বার্স্ট (চ্যানেল পোস্ট + /start) রেখে poller.Poller দিয়ে
+    পুরোটা ড্রেন করতে কত সময় লাগে আর ব্যাচপ্রতি ল্যাটেন্সি কেমন তা মাপে। webhook এর সাথে তুলনার জন্য:
+    run --scenario webhook_channel_post,webhook_start
+    """
+    mongo_uri = args.mongo_uri or os.getenv("MONGO_URI")
+    fakes = start_fakes(args.latency_ms, args.jitter_ms, args.error_rate)
+    bot = load_bot(fake_env(fakes, mongo_uri), mongo_uri)
+    ids, codes = seed_catalogue(bot, args.seed)
+    scenarios = build_scenarios(ids, codes, fakes["shortener"].address)
+    rnd = random.Random(args.updates)
+    for _ in range(args.updates):
+        name = "webhook_channel_post" if rnd.random() < args.channel_share else "webhook_start"
+        _tg_updates.append(scenarios[name].factory()[2]["json"])
+    last_id = _tg_updates[-1]["update_id"]
+
+    import poller
+    bot.admin_jobs.delete_one({"_id": poller.POLLER_JOB_ID})
+    worker = poller.Poller(args.workers, batch=100, poll_timeout=0)
+    batches = []
+    started = time.perf_counter()
+    while worker.offset is None or worker.offset <= last_id:
+        batch_started = time.perf_counter()
+        worker.run(once=True)
+        batches.append((time.perf_counter() - batch_started) * 1000)
+    elapsed = time.perf_counter() - started
+    batches.sort()
+    print(f"\n{args.updates} updates in {elapsed:.1f}s -> {args.updates / elapsed:.0f} updates/s "
+          f"({args.workers} workers, {worker.stats['failed']} retried, {worker.stats['skipped']} skipped)")
+    print(f"batch ms: p50 {percentile(batches, 50):.0f}  p95 {percentile(batches, 95):.0f}  max {batches[-1]:.0f}  "
+          f"({len(batches)} batches)")
+    sys.stdout.flush()
+    os._exit(0)
+
+
+def add_upstream_args(p):
+    p.add_argument("--latency-ms", type=float, default=0, help="fake upstream latency per call")
+    p.add_argument("--jitter-ms", type=float, default=0, help="+/- random jitter on the latency")
+    p.add_argument("--error-rate", type=float, default=0.0, help="fraction of upstream calls that return 500")
+    p.add_argument("--mongo-uri", default=None, help="local Mongo URI (default: in-memory mongomock)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline load-test harness for bot.py")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_run = sub.add_parser("run", help="run scenarios and report latency percentiles")
+    add_upstream_args(p_run)
+    p_run.add_argument("--scenario", default=None, help=f"comma separated, default all: {','.join(SCENARIOS)}")
+    p_run.add_argument("--concurrency", type=int, default=16)
+    p_run.add_argument("--duration", type=float, default=10, help="seconds per scenario")
+    p_run.add_argument("--warmup", type=float, default=1, help="warmup seconds per scenario (0 to disable)")
+    p_run.add_argument("--max-requests", type=int, default=None)
+    p_run.add_argument("--seed", type=int, default=500, help="synthetic documents to insert")
+    p_run.add_argument("--server", choices=["wsgi", "asgi"], default="wsgi", help="in-process server to benchmark")
+    p_run.add_argument("--target", default=None, help="benchmark an already running server instead of in-process one")
+    p_run.add_argument("--accept-encoding", default=None, help="Accept-Encoding header to send (default identity)")
+    p_run.add_argument("--name", default=None, help="save report as benchmarks/<name>.json")
+    p_run.set_defaults(func=cmd_run)
+
+    p_cmp = sub.add_parser("compare", help="compare two saved baseline files")
+    p_cmp.add_argument("a")
+    p_cmp.add_argument("b")
+    p_cmp.set_defaults(func=lambda a: compare(a.a, a.b))
+
+    p_fakes = sub.add_parser("fakes", help="only run the fake upstream servers and print the env to use")
+    add_upstream_args(p_fakes)
+    p_fakes.set_defaults(func=cmd_fakes)
+
+    p_suggest = sub.add_parser("suggest", help="benchmark the typeahead index build and query latency")
+    p_suggest.add_argument("--titles", type=int, default=100000)
+    p_suggest.add_argument("--queries", type=int, default=2000)
+    p_suggest.set_defaults(func=cmd_suggest)
+
+    p_tmdb = sub.add_parser("tmdb-index", help="benchmark the local TMDB title index build and lookup latency")
+    p_tmdb.add_argument("--titles", type=int, default=1000000)
+    p_tmdb.add_argument("--queries", type=int, default=2000)
+    p_tmdb.set_defaults(func=cmd_tmdb_index)
+
+    p_cold = sub.add_parser("coldstart", help="time from process start to first served request")
+    p_cold.add_argument("--runs", type=int, default=5)
+    p_cold.add_argument("--path", default="/", help="first request path")
+    p_cold.add_argument("--mongo-uri", default=None, help="local Mongo URI (default: in-memory mongomock)")
+    p_cold.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    p_cold.set_defaults(func=cmd_coldstart)
+
+    p_poll = sub.add_parser("poll", help="drain a burst of queued updates with the getUpdates worker")
+    add_upstream_args(p_poll)
+    p_poll.add_argument("--updates", type=int, default=2000)
+    p_poll.add_argument("--workers", type=int, default=16)
+    p_poll.add_argument("--channel-share", type=float, default=0.8, help="fraction of channel posts (rest /start)")
+    p_poll.add_argument("--seed", type=int, default=200, help="synthetic documents to insert")
+    p_poll.set_defaults(func=cmd_poll)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
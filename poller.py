@@ -0,0 +1,196 @@
+"""
+Long-polling update worker (webhook এর বিকল্প)
+
+পাবলিক URL ছাড়াই getUpdates দিয়ে আপডেট টেনে আনে এবং webhook এর মতোই bot.process_update
+(চ্যানেল ইনজেস্ট, /start ডেলিভারি) দিয়ে প্রসেস করে, তবে Flask রিকোয়েস্টের ভিতরে নয়।
+
+Usage:
+    python poller.py                          # webhook মুছে getUpdates লুপ
+    python poller.py --workers 16 --batch 100
+    python poller.py --once                   # একটা ব্যাচ প্রসেস করে বের হয়
+
+- একসাথে সর্বোচ্চ --batch (Telegram এ ১০০) আপডেট আসে, থ্রেড পুলে একসাথে প্রসেস হয়। আপলোড বার্স্টে
+  Telegram এর webhook ডেলিভারির (ধীর রেসপন্সে ব্যাকঅফ) উপর নির্ভর করতে হয় না।
+- অফসেট admin_jobs এ ("telegram_poller") রাখা হয় এবং শুধু সফল আপডেট পর্যন্ত এগোয়: প্রথম ব্যর্থ
+  আপডেটে থেমে যায়, পরের পোলে সেটা আবার আসে (--max-attempts বার ব্যর্থ হলে লগ করে বাদ)।
+  একই ব্যাচের যেগুলো আগেই সফল হয়েছে সেগুলো আবার প্রসেস হয় না।
+- একসাথে একটাই কনজিউমার: locks কালেকশনে লিজ। বাকি রেপ্লিকা স্ট্যান্ডবাই থাকে, লিজ ছাড়া পেলে শুরু করে।
+  লিজ হারালে (যেমন ব্যাচ অনেক দেরি হলে) অফসেট কমিট হয় না, নতুন কনজিউমার সেখান থেকে শুরু করে।
+- বন্ধ হওয়ার সময় যেসব ফাইলের অটো-ডিলিট বাকি সেগুলো scheduled_deletes এ যায়, পরে সুইপার মুছে দেয়।
+- webhook আর getUpdates একসাথে চলে না; বট শুরু হলে deleteWebhook করে। ওয়েব প্রসেসে
+  TELEGRAM_UPDATES=polling দিলে `python bot.py` আবার webhook সেট করে না।
+"""
+import os
+import sys
+import time
+import signal
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+import bot
+
+POLLER_LEASE = "telegram_poller"
+POLLER_JOB_ID = "telegram_poller"
+POLLER_LEASE_TTL = int(os.getenv("POLLER_LEASE_TTL", 90))
+ALLOWED_UPDATES = ["channel_post", "message"]   # bot.process_update এর বাইরে কিছু না আনা
+
+
+# ================================
+#        OFFSET
+# ================================
+
+def load_offset():
+    job = bot.admin_jobs.find_one({"_id": POLLER_JOB_ID}, {"offset": 1}) or {}
+    return job.get("offset")
+
+def commit_offset(offset, stats, owner):
+    # $max: পুরনো কনজিউমারের দেরিতে আসা কমিট অফসেট পিছিয়ে দেয় না
+    bot.admin_jobs.update_one({"_id": POLLER_JOB_ID},
+                              {"$max": {"offset": offset},
+                               "$set": {"committed_at": bot.utc_now(), "owner": owner, "stats": stats}},
+                              upsert=True)
+
+
+# ================================
+#        POLLER
+# ================================
+
+class Poller:
+    def __init__(self, workers=8, batch=100, poll_timeout=25, max_attempts=5):
+        self.batch = batch
+        self.poll_timeout = poll_timeout
+        self.max_attempts = max_attempts
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.session = requests.Session()
+        self.lease = bot.MongoLease(POLLER_LEASE, ttl=POLLER_LEASE_TTL)
+        self.stop = threading.Event()
+        self.offset = None
+        self.done = set()       # অফসেটের পরের যেগুলো ইতিমধ্যে সফল
+        self.attempts = {}
+        self.stats = {"updates": 0, "failed": 0, "skipped": 0, "batches": 0}
+
+    def fetch(self):
+        payload = {"limit": self.batch, "timeout": self.poll_timeout, "allowed_updates": ALLOWED_UPDATES}
+        if self.offset is not None: payload["offset"] = self.offset
+        resp = self.session.post(f"{bot.TELEGRAM_API_URL}/getUpdates", json=payload, timeout=self.poll_timeout + 10)
+        data = resp.json()
+        if not data.get("ok"):
+            # 409: webhook সেট করা আছে, অথবা লিজের বাইরে অন্য কেউ getUpdates চালাচ্ছে
+            raise RuntimeError(f"getUpdates {resp.status_code}: {data.get('description')}")
+        return sorted(data.get("result", []), key=lambda u: u["update_id"])
+
+    def handle(self, update):
+        """ সফল হলে (অথবা বারবার ব্যর্থ হয়ে বাদ দিলে) True """
+        update_id = update["update_id"]
+        try:
+            bot.process_update(update)
+            self.attempts.pop(update_id, None)
+            return True
+        except Exception as e:
+            attempts = self.attempts[update_id] = self.attempts.get(update_id, 0) + 1
+            if attempts >= self.max_attempts:
+                print(f"❌ Update {update_id} failed {attempts} times, skipping: {e}")
+                self.attempts.pop(update_id, None)
+                self.stats["skipped"] += 1
+                return True
+            print(f"⚠️ Update {update_id} failed (attempt {attempts}): {e}")
+            self.stats["failed"] += 1
+            return False
+
+    def process_batch(self, updates):
+        """ সব আপডেট একসাথে প্রসেস; রিটার্ন: নতুন অফসেট (প্রথম ব্যর্থ আপডেট, না থাকলে শেষটার পরেরটা) """
+        futures = {u["update_id"]: self.pool.submit(self.handle, u) for u in updates if u["update_id"] not in self.done}
+        next_offset = None
+        for update in updates:
+            update_id = update["update_id"]
+            if update_id in futures:
+                if futures[update_id].result():
+                    self.done.add(update_id)
+                    self.stats["updates"] += 1
+            if next_offset is None and update_id not in self.done:
+                next_offset = update_id
+        if next_offset is None: next_offset = updates[-1]["update_id"] + 1
+        self.done = {u for u in self.done if u >= next_offset}
+        return next_offset
+
+    def run(self, once=False):
+        standby = started = False
+        try:
+            while not self.stop.is_set():
+                if not self.lease.acquire():
+                    if not standby: print(f"⏸️  Another poller holds the lease, standing by (pid {os.getpid()})")
+                    standby = True
+                    self.stop.wait(POLLER_LEASE_TTL / 3)
+                    continue
+                if standby or not started:
+                    # নতুন করে লিজ পেলে আগের কনজিউমারের কমিট করা অফসেট থেকে
+                    standby, started = False, True
+                    self.offset, self.done = load_offset(), set()
+                    try: bot.tg_post("deleteWebhook", {"drop_pending_updates": False})
+                    except Exception as e: print(f"⚠️ deleteWebhook failed: {e}")
+                    print(f"▶️  Polling updates from offset {self.offset} (pid {os.getpid()})", flush=True)
+
+                try:
+                    updates = self.fetch()
+                except Exception as e:
+                    print(f"getUpdates Error: {e}")
+                    self.stop.wait(5)
+                    continue
+                if not updates:
+                    if once: return
+                    continue
+
+                batch_started = time.perf_counter()
+                next_offset = self.process_batch(updates)
+                elapsed = time.perf_counter() - batch_started
+                self.stats["batches"] += 1
+                if not self.lease.acquire():
+                    print("⚠️ Poller lease lost during the batch, offset not committed")
+                    standby = True
+                    continue
+                commit_offset(next_offset, self.stats, self.lease.owner)
+                self.offset = next_offset
+                print(f"  {len(updates)} updates in {elapsed:.2f}s ({len(updates) / max(elapsed, 1e-9):.0f}/s) | "
+                      f"offset {next_offset} | total {self.stats['updates']} ok, {self.stats['failed']} retried, "
+                      f"{self.stats['skipped']} skipped", flush=True)
+                if once: return
+                if next_offset <= updates[-1]["update_id"]:
+                    # ব্যর্থ আপডেট আবার আসবে; সাথে সাথে না টেনে একটু অপেক্ষা
+                    self.stop.wait(min(2 ** self.attempts.get(next_offset, 1), 30))
+        finally:
+            # --once বা সিগন্যালে বের হলেও স্ট্যান্ডবাই পোলার TTL এর অপেক্ষা ছাড়াই লিজ পায়
+            self.lease.release()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Consume Telegram updates with getUpdates long polling")
+    parser.add_argument("--workers", type=int, default=8, help="updates processed in parallel")
+    parser.add_argument("--batch", type=int, default=100, help="updates per getUpdates call (1-100)")
+    parser.add_argument("--poll-timeout", type=int, default=25, help="long polling timeout in seconds")
+    parser.add_argument("--max-attempts", type=int, default=5, help="give up on an update after this many failures")
+    parser.add_argument("--once", action="store_true", help="process one batch and exit")
+    args = parser.parse_args(argv)
+    if not bot.BOT_TOKEN:
+        sys.exit("❌ BOT_TOKEN is not set.")
+
+    # কাউন্টার ফ্লাশ, সাজেস্ট সিঙ্ক ইত্যাদি প্রসেস সার্ভিস (ওয়েব প্রসেসের মতোই)
+    bot.start_services()
+    poller = Poller(args.workers, min(max(args.batch, 1), 100), args.poll_timeout, args.max_attempts)
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: poller.stop.set())
+    poller.run(once=args.once)
+    poller.pool.shutdown(wait=True)
+    # পেন্ডিং ভিউ/ডাউনলোড কাউন্ট
+    bot.counters.flush()
+    # এখনো ঘুমিয়ে থাকা ফাইল অটো-ডিলিট: scheduled_deletes এ, সার্ভিস লিজধারী প্রসেসের সুইপার মুছবে
+    saved = bot.persist_pending_deletes()
+    if saved: print(f"🗑️  {saved} pending auto-deletes handed to the sweeper")
+    sys.stdout.flush()
+    # ব্যাকগ্রাউন্ড থ্রেডগুলোর (DELETE_TIMEOUT পর্যন্ত ঘুমায়) জন্য অপেক্ষা না করে বের হওয়া
+    os._exit(0)
+
+
+if __name__ == "__main__":
+    main()